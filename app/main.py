@@ -3,12 +3,27 @@
 Lanza la ventana principal y arranca el bucle de eventos de Tkinter.
 """
 
-from ui.main_window import MainWindow
+import time
+
+# Antes de cualquier import pesado: referencia para medir el arranque completo
+INICIO = time.perf_counter()
+
+import logging  # noqa: E402
+
+from decouple import config  # noqa: E402
+
+from ui.main_window import MainWindow  # noqa: E402
 
 
 def main() -> None:
-    """Crea la ventana principal y entra en `mainloop()`."""
-    app = MainWindow()
+    """Crea la ventana principal y entra en `mainloop()`.
+
+    Con ``MATEX_MEDIR_ARRANQUE`` activo se registra (en stderr, vía
+    `logging`) el tiempo desde el inicio del proceso hasta el primer frame.
+    """
+    if config("MATEX_MEDIR_ARRANQUE", default=False, cast=bool):
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s: %(message)s")
+    app = MainWindow(inicio=INICIO)
     app.mainloop()
 
 
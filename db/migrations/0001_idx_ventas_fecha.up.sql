@@ -0,0 +1,2 @@
+-- Filtros por rango de fechas en report_repository y ventas_repo.listar
+CREATE INDEX IF NOT EXISTS idx_ventas_fecha ON public.ventas (fecha);
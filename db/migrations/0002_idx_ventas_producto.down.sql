@@ -0,0 +1,2 @@
+DROP INDEX IF EXISTS public.idx_ventas_producto_id_producto;
+DROP INDEX IF EXISTS public.idx_ventas_producto_id_venta;
@@ -0,0 +1,5 @@
+-- Join ventas ↔ ventas_producto (reportes, detalle, eliminar_ventas)
+CREATE INDEX IF NOT EXISTS idx_ventas_producto_id_venta ON public.ventas_producto (id_venta);
+
+-- FK hacia productos (borrado de productos, reportes por producto)
+CREATE INDEX IF NOT EXISTS idx_ventas_producto_id_producto ON public.ventas_producto (id_producto);
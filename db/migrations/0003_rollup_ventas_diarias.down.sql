@@ -0,0 +1,2 @@
+DROP TABLE IF EXISTS public.ventas_diarias_producto;
+DROP TABLE IF EXISTS public.ventas_diarias;
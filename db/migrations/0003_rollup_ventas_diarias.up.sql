@@ -0,0 +1,27 @@
+-- Resumen diario incremental para report_repository (ver repository/rollup.py)
+CREATE TABLE IF NOT EXISTS public.ventas_diarias (
+    fecha date PRIMARY KEY,
+    cantidad_ventas integer NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS public.ventas_diarias_producto (
+    fecha date NOT NULL,
+    id_producto integer NOT NULL,
+    unidades bigint NOT NULL DEFAULT 0,
+    monto numeric NOT NULL DEFAULT 0,
+    ventas integer NOT NULL DEFAULT 0,
+    PRIMARY KEY (fecha, id_producto)
+);
+
+-- Carga inicial desde el historial existente
+INSERT INTO public.ventas_diarias (fecha, cantidad_ventas)
+SELECT fecha, COUNT(*) FROM public.ventas WHERE fecha IS NOT NULL GROUP BY fecha
+ON CONFLICT (fecha) DO NOTHING;
+
+INSERT INTO public.ventas_diarias_producto (fecha, id_producto, unidades, monto, ventas)
+SELECT v.fecha, vp.id_producto, COALESCE(SUM(vp.cantidad), 0), COALESCE(SUM(vp.monto_producto), 0), COUNT(DISTINCT v.id_venta)
+FROM public.ventas v
+JOIN public.ventas_producto vp ON vp.id_venta = v.id_venta
+WHERE v.fecha IS NOT NULL AND vp.id_producto IS NOT NULL
+GROUP BY v.fecha, vp.id_producto
+ON CONFLICT (fecha, id_producto) DO NOTHING;
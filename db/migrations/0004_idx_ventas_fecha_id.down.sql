@@ -0,0 +1 @@
+DROP INDEX IF EXISTS public.idx_ventas_fecha_id;
@@ -0,0 +1,2 @@
+-- Paginación por keyset del historial (ventas_repo.listar: ORDER BY fecha DESC, id_venta DESC)
+CREATE INDEX IF NOT EXISTS idx_ventas_fecha_id ON public.ventas (fecha, id_venta);
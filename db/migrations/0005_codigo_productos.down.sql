@@ -0,0 +1,8 @@
+DROP TRIGGER IF EXISTS precios_modificado ON public.precios;
+DROP TRIGGER IF EXISTS productos_modificado ON public.productos;
+DROP FUNCTION IF EXISTS public.precios_tocar_producto();
+DROP FUNCTION IF EXISTS public.productos_tocar();
+DROP INDEX IF EXISTS public.idx_productos_modificado;
+ALTER TABLE public.productos DROP COLUMN IF EXISTS modificado;
+DROP INDEX IF EXISTS public.idx_productos_codigo;
+ALTER TABLE public.productos DROP COLUMN IF EXISTS codigo;
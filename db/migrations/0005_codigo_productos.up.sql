@@ -0,0 +1,31 @@
+-- Código de barras / SKU para el modo escáner de ingreso de ventas
+ALTER TABLE public.productos ADD COLUMN IF NOT EXISTS codigo text;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_productos_codigo ON public.productos (codigo);
+
+-- Marca de última modificación (producto o su precio) para refrescos incrementales
+ALTER TABLE public.productos ADD COLUMN IF NOT EXISTS modificado timestamptz NOT NULL DEFAULT clock_timestamp();
+CREATE INDEX IF NOT EXISTS idx_productos_modificado ON public.productos (modificado);
+
+CREATE OR REPLACE FUNCTION public.productos_tocar() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.modificado := clock_timestamp();
+    RETURN NEW;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.precios_tocar_producto() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE public.productos SET modificado = clock_timestamp() WHERE id_producto = NEW.id_producto;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS productos_modificado ON public.productos;
+CREATE TRIGGER productos_modificado BEFORE UPDATE ON public.productos
+FOR EACH ROW EXECUTE FUNCTION public.productos_tocar();
+
+DROP TRIGGER IF EXISTS precios_modificado ON public.precios;
+CREATE TRIGGER precios_modificado AFTER INSERT OR UPDATE ON public.precios
+FOR EACH ROW EXECUTE FUNCTION public.precios_tocar_producto();
@@ -0,0 +1,3 @@
+-- La extensión pg_trgm se deja instalada: otras bases u objetos pueden usarla
+DROP INDEX IF EXISTS public.idx_productos_nombre_trgm;
+DROP INDEX IF EXISTS public.idx_productos_nombre_prefijo;
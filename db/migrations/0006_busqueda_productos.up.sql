@@ -0,0 +1,16 @@
+-- Búsqueda de productos por nombre (producto_repo.buscar)
+
+-- Prefijo y orden alfabético: btree sobre el nombre en minúsculas con
+-- colación "C", que admite LIKE 'abc%' en cualquier locale del servidor
+CREATE INDEX IF NOT EXISTS idx_productos_nombre_prefijo ON public.productos ((lower(nombre) COLLATE "C"));
+
+-- Subcadena y errores de tipeo: trigramas. pg_trgm es parte de contrib; si el
+-- servidor no lo trae, la búsqueda usa solo prefijo / subcadena sin índice
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS idx_productos_nombre_trgm ON public.productos USING gin (lower(nombre) gin_trgm_ops);
+    END IF;
+END;
+$$;
@@ -0,0 +1,3 @@
+DROP TRIGGER IF EXISTS precios_notificar ON public.precios;
+DROP TRIGGER IF EXISTS productos_notificar ON public.productos;
+DROP FUNCTION IF EXISTS public.notificar_producto();
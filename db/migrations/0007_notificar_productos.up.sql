@@ -0,0 +1,22 @@
+-- Aviso inmediato de cambios de productos (catálogo en memoria, services.catalogo)
+-- Payload: id_producto. Postgres entrega las notificaciones al confirmar la
+-- transacción y descarta las repetidas dentro de ella.
+CREATE OR REPLACE FUNCTION public.notificar_producto() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('productos', OLD.id_producto::text);
+    ELSE
+        PERFORM pg_notify('productos', NEW.id_producto::text);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS productos_notificar ON public.productos;
+CREATE TRIGGER productos_notificar AFTER INSERT OR UPDATE OR DELETE ON public.productos
+FOR EACH ROW EXECUTE FUNCTION public.notificar_producto();
+
+DROP TRIGGER IF EXISTS precios_notificar ON public.precios;
+CREATE TRIGGER precios_notificar AFTER INSERT OR UPDATE OR DELETE ON public.precios
+FOR EACH ROW EXECUTE FUNCTION public.notificar_producto();
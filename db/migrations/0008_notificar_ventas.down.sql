@@ -0,0 +1,2 @@
+DROP TRIGGER IF EXISTS ventas_notificar ON public.ventas;
+DROP FUNCTION IF EXISTS public.notificar_venta();
@@ -0,0 +1,24 @@
+-- Aviso inmediato de ventas registradas, modificadas o eliminadas (caché de
+-- reportes, services.report_cache). Payload: fecha de la venta (YYYY-MM-DD).
+-- Postgres entrega las notificaciones al confirmar la transacción y descarta
+-- las repetidas dentro de ella: una importación masiva avisa una vez por día.
+CREATE OR REPLACE FUNCTION public.notificar_venta() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        IF OLD.fecha IS NOT NULL THEN
+            PERFORM pg_notify('ventas', OLD.fecha::text);
+        END IF;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        IF NEW.fecha IS NOT NULL THEN
+            PERFORM pg_notify('ventas', NEW.fecha::text);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS ventas_notificar ON public.ventas;
+CREATE TRIGGER ventas_notificar AFTER INSERT OR UPDATE OR DELETE ON public.ventas
+FOR EACH ROW EXECUTE FUNCTION public.notificar_venta();
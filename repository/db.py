@@ -1,41 +1,109 @@
 """Manejo de conexiones PostgreSQL (capa *Repository*).
 
-Contiene un pool global de conexiones y un *context manager* `get_conn`
+Contiene un pool global de conexiones seguro entre hilos
+(:class:`repository.pool.ConnectionPool`) y un *context manager* `get_conn`
 que garantiza **commit/rollback** y la devolución segura al pool.
 """
 
 from __future__ import annotations
 
+import threading
 from contextlib import contextmanager
-from typing import Generator, Optional
+from typing import Any, Callable, Generator, Optional
 
+import psycopg2
 from decouple import config
-from psycopg2.extensions import connection
-from psycopg2.pool import SimpleConnectionPool
+from psycopg2.extensions import QueryCanceledError, connection
+
+from repository.pool import ConnectionPool
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+_local = threading.local()
+# Se llaman al cerrar el pool: olvidan lo averiguado sobre el servidor
+_al_cerrar: list[Callable[[], None]] = []
+
+
+class CancelToken:
+    """Permite abortar en el servidor las consultas de otro hilo.
+
+    Las conexiones que `get_conn` entrega dentro de un `cancel_scope` con
+    este token quedan registradas; :meth:`cancel` envía ``pg_cancel`` a las
+    que estén en curso y hace fallar las siguientes solicitudes.
+    """
+
+    def __init__(self) -> None:
+        """Crea un token sin cancelar."""
+        self._lock = threading.Lock()
+        self._conns: set[connection] = set()
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        """Cancela las consultas en curso y las futuras de este token.
+
+        ``pg_cancel`` se envía con el lock tomado: así ninguna conexión puede
+        volver al pool (ver :meth:`_detach`) y recibir la cancelación
+        mientras ya atiende a otro hilo.
+        """
+        with self._lock:
+            self.cancelled = True
+            for conn in self._conns:
+                try:
+                    conn.cancel()
+                except Exception:
+                    pass
+
+    def _attach(self, conn: connection) -> None:
+        with self._lock:
+            if self.cancelled:
+                raise QueryCanceledError("Operación cancelada")
+            self._conns.add(conn)
+
+    def _detach(self, conn: connection) -> bool:
+        """Desregistra *conn*; devuelve ``True`` si el token fue cancelado."""
+        with self._lock:
+            self._conns.discard(conn)
+            return self.cancelled
+
+
+@contextmanager
+def cancel_scope(token: CancelToken) -> Generator[CancelToken, None, None]:
+    """Asocia *token* a las conexiones que pida el hilo actual dentro del bloque."""
+    previo = getattr(_local, "token", None)
+    _local.token = token
+    try:
+        yield token
+    finally:
+        _local.token = previo
+
 
 # -------------------------------------------------------------------------
 # Configuración de la cadena de conexión
 # -------------------------------------------------------------------------
-_DB_URL: dict[str, str | int] = {
-    "dbname": config("DB_NAME", default="matex_db"),
-    "user": config("DB_USER", default="postgres"),
-    "password": config("DB_PASSWORD", default=""),
-    "host": config("DB_HOST", default="localhost"),
-    "port": config("DB_PORT", cast=int, default=5432),
-}
-
-_pool: Optional[SimpleConnectionPool] = None
+def _db_url() -> dict[str, str | int]:
+    """Lee los parámetros de conexión desde el entorno / ``.env``."""
+    return {
+        "dbname": config("DB_NAME", default="matex_db"),
+        "user": config("DB_USER", default="postgres"),
+        "password": config("DB_PASSWORD", default=""),
+        "host": config("DB_HOST", default="localhost"),
+        "port": config("DB_PORT", cast=int, default=5432),
+    }
 
 
 # -------------------------------------------------------------------------
 # API pública
 # -------------------------------------------------------------------------
-def init_pool(minconn: int = 1, maxconn: int = 10) -> None:
+def init_pool(minconn: int = 1, maxconn: int = 10, **options: Any) -> None:
     """Inicializa el pool global de conexiones.
 
     Args:
         minconn: Conexiones mínimas a mantener.
         maxconn: Conexiones máximas permitidas.
+        **options: Parámetros extra de :class:`~repository.pool.ConnectionPool`
+            (``timeout``, ``max_waiters``, ``max_idle``, ``max_uses``,
+            ``check_after``). Por defecto se leen de ``DB_POOL_TIMEOUT``,
+            ``DB_POOL_MAX_WAITERS``, ``DB_POOL_MAX_IDLE`` y ``DB_POOL_MAX_USES``.
 
     Side effects:
         Crea la variable global ``_pool`` si aún no existe.
@@ -44,25 +112,83 @@ def init_pool(minconn: int = 1, maxconn: int = 10) -> None:
         psycopg2.Error: Si la conexión a la BD falla.
     """
     global _pool
+    with _pool_lock:
+        if _pool is not None:
+            return
+        params = _db_url()
+        options.setdefault("timeout", config("DB_POOL_TIMEOUT", cast=float, default=30.0))
+        options.setdefault("max_waiters", config("DB_POOL_MAX_WAITERS", cast=int, default=64))
+        options.setdefault("max_idle", config("DB_POOL_MAX_IDLE", cast=float, default=600.0))
+        options.setdefault("max_uses", config("DB_POOL_MAX_USES", cast=int, default=5000))
+        _pool = ConnectionPool(lambda: psycopg2.connect(**params), minconn=minconn, maxconn=maxconn, **options)
+
+
+def conectar() -> connection:
+    """Abre una conexión nueva fuera del pool (p. ej. para ``LISTEN``); la cierra quien la pide."""
+    return psycopg2.connect(**_db_url())
+
+
+def close_pool() -> None:
+    """Cierra el pool global; el próximo `get_conn` creará uno nuevo."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+    for fn in _al_cerrar:
+        fn()
+
+
+def al_cerrar_pool(fn: Callable[[], None]) -> Callable[[], None]:
+    """Registra *fn* para que se llame en cada `close_pool` (usable como decorador).
+
+    Sirve para descartar lo que se averiguó del servidor (p. ej. qué
+    extensiones tiene), ya que el próximo pool puede apuntar a otro.
+    """
+    _al_cerrar.append(fn)
+    return fn
+
+
+def pool_stats() -> dict[str, Any]:
+    """Devuelve las estadísticas en vivo del pool global (ver `ConnectionPool.stats`)."""
     if _pool is None:
-        _pool = SimpleConnectionPool(minconn, maxconn, **_DB_URL)
+        init_pool()
+    assert _pool is not None, "El pool de conexiones no está inicializado"
+    return _pool.stats()
 
 
 @contextmanager
-def get_conn() -> Generator[connection, None, None]:
-    """Context manager que entrega una conexión del pool."""
+def get_conn(timeout: float | None = None) -> Generator[connection, None, None]:
+    """Context manager que entrega una conexión del pool.
+
+    Args:
+        timeout: Segundos máximos de espera por una conexión libre; por
+            defecto el ``timeout`` del pool.
+
+    Raises:
+        repository.pool.PoolTimeout: Si no se liberó una conexión a tiempo.
+        repository.pool.PoolExhausted: Si la cola de espera está llena.
+        psycopg2.extensions.QueryCanceledError: Si el `CancelToken` activo
+            (ver `cancel_scope`) fue cancelado.
+    """
     if _pool is None:
         init_pool()
 
     # Garantiza al type-checker que _pool ya no es None
-    assert _pool is not None, "El pool de conexiones no está inicializado"
+    pool = _pool
+    assert pool is not None, "El pool de conexiones no está inicializado"
 
-    conn = _pool.getconn()
+    token: CancelToken | None = getattr(_local, "token", None)
+    conn = pool.getconn(timeout)
     try:
+        if token is not None:
+            token._attach(conn)
         yield conn
         conn.commit()
     except Exception:
         conn.rollback()
         raise
     finally:
-        _pool.putconn(conn)
+        # Una cancelación pudo llegar tarde al servidor: esa conexión no se reutiliza
+        descartar = token is not None and token._detach(conn)
+        pool.putconn(conn, close=descartar)
@@ -0,0 +1,105 @@
+"""Notificaciones ``LISTEN/NOTIFY`` de PostgreSQL (capa *Repository*).
+
+`Escucha` mantiene una conexión dedicada (fuera del pool y en
+*autocommit*) suscrita a un canal y entrega los *payloads* recibidos, por
+lotes, desde un hilo propio. Si la conexión se cae reintenta cada
+``reintento`` segundos; lo notificado mientras tanto se pierde, por eso
+``on_conectado`` avisa cada (re)conexión para que el consumidor se
+resincronice.
+"""
+
+from __future__ import annotations
+
+import select
+import threading
+from typing import Callable
+
+from psycopg2 import sql
+
+from repository.db import conectar
+
+#: Segundos máximos que el hilo espera notificaciones antes de revisar si debe detenerse.
+ESPERA = 0.5
+
+
+class Escucha:
+    """Hilo que escucha un canal y entrega lotes de *payloads*.
+
+    Args:
+        canal: Canal de ``NOTIFY``.
+        on_lote: Recibe el conjunto de *payloads* llegados juntos (en el
+            hilo de la escucha).
+        on_conectado: Se llama tras cada ``LISTEN`` exitoso, antes de
+            entregar lotes.
+        reintento: Segundos entre intentos de reconexión.
+    """
+
+    def __init__(
+        self,
+        canal: str,
+        on_lote: Callable[[set[str]], None],
+        *,
+        on_conectado: Callable[[], None] | None = None,
+        reintento: float = 5.0,
+    ) -> None:
+        """Prepara la escucha (no conecta hasta :meth:`iniciar`)."""
+        self.canal = canal
+        self.on_lote = on_lote
+        self.on_conectado = on_conectado
+        self.reintento = reintento
+        #: Última excepción que cortó la escucha (diagnóstico).
+        self.ultimo_error: BaseException | None = None
+        self._conectado = False
+        self._detener = threading.Event()
+        self._hilo: threading.Thread | None = None
+
+    @property
+    def conectado(self) -> bool:
+        """Indica si el ``LISTEN`` está activo (y ``on_conectado`` ya terminó)."""
+        return self._conectado
+
+    def iniciar(self) -> None:
+        """Arranca el hilo de escucha (no hace nada si ya corre)."""
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._run, name=f"listen-{self.canal}", daemon=True)
+        self._hilo.start()
+
+    def detener(self, timeout: float | None = None) -> None:
+        """Pide al hilo que termine y espera hasta *timeout* segundos."""
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+            self._hilo = None
+
+    # ---------------------------------------------------------------- internos
+    def _run(self) -> None:
+        while not self._detener.is_set():
+            try:
+                self._escuchar()
+            except Exception as exc:  # noqa: BLE001 - la escucha no debe morir; se reintenta
+                self.ultimo_error = exc
+            self._conectado = False
+            self._detener.wait(self.reintento)
+
+    def _escuchar(self) -> None:
+        conn = conectar()
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.canal)))
+            if self.on_conectado is not None:
+                self.on_conectado()
+            self._conectado = True
+            while not self._detener.is_set():
+                if not select.select([conn], [], [], ESPERA)[0]:
+                    continue
+                conn.poll()
+                # Lo que notificó una misma transacción llega junto: un solo lote
+                payloads = {n.payload for n in conn.notifies}
+                conn.notifies.clear()
+                if payloads:
+                    self.on_lote(payloads)
+        finally:
+            conn.close()
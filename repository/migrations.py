@@ -0,0 +1,179 @@
+"""Migraciones versionadas del esquema (capa *Repository*).
+
+Cada migración es un par de archivos en ``db/migrations``::
+
+    0001_idx_ventas_fecha.up.sql
+    0001_idx_ventas_fecha.down.sql
+
+El número inicial define el orden. Las versiones aplicadas se registran en
+la tabla ``schema_migrations``; cada migración corre en su propia
+transacción protegida por un *advisory lock*, de modo que dos terminales no
+puedan migrar a la vez.
+
+Uso desde consola::
+
+    python -m repository.migrations status
+    python -m repository.migrations apply [--to N]
+    python -m repository.migrations rollback [--steps N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Sequence
+
+from psycopg2.extensions import cursor
+
+from repository.db import get_conn
+
+#: Carpeta por defecto con los archivos ``NNNN_nombre.{up,down}.sql``.
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "db" / "migrations"
+
+_FILE_RE = re.compile(r"^(\d+)_(\w+)\.(up|down)\.sql$")
+_LOCK_KEY = 7_318_001  # clave arbitraria para pg_advisory_xact_lock
+
+
+@dataclass(frozen=True)
+class Migration:
+    """Una migración descubierta en disco."""
+
+    version: int
+    nombre: str
+    up: Path
+    down: Path | None
+
+
+def descubrir(directorio: Path = MIGRATIONS_DIR) -> list[Migration]:
+    """Lista las migraciones de *directorio* ordenadas por versión.
+
+    Raises:
+        ValueError: Si hay versiones duplicadas o falta el ``.up.sql``.
+    """
+    ups: dict[int, Path] = {}
+    downs: dict[int, Path] = {}
+    nombres: dict[int, str] = {}
+    for path in directorio.glob("*.sql"):
+        m = _FILE_RE.match(path.name)
+        if not m:
+            continue
+        version, nombre = int(m.group(1)), m.group(2)
+        destino = ups if m.group(3) == "up" else downs
+        if nombres.setdefault(version, nombre) != nombre or version in destino:
+            raise ValueError(f"Migración {version:04d} duplicada en {directorio}")
+        destino[version] = path
+
+    faltantes = nombres.keys() - ups.keys()
+    if faltantes:
+        v = min(faltantes)
+        raise ValueError(f"Falta {v:04d}_{nombres[v]}.up.sql")
+    return [Migration(v, nombres[v], ups[v], downs.get(v)) for v in sorted(ups)]
+
+
+def _preparar(cur: cursor) -> None:
+    """Toma el lock de migración y crea la tabla de control si falta."""
+    cur.execute("SELECT pg_advisory_xact_lock(%s)", (_LOCK_KEY,))
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS public.schema_migrations (
+            version integer PRIMARY KEY,
+            nombre text NOT NULL,
+            aplicada timestamptz NOT NULL DEFAULT now()
+        )
+        """
+    )
+
+
+def _aplicadas(cur: cursor) -> list[int]:
+    """Versiones ya registradas en ``schema_migrations``, en orden."""
+    cur.execute("SELECT version FROM public.schema_migrations ORDER BY version")
+    return [r[0] for r in cur.fetchall()]
+
+
+def estado(directorio: Path = MIGRATIONS_DIR) -> list[dict[str, object]]:
+    """Devuelve cada migración conocida con su marca ``aplicada``."""
+    with get_conn() as conn, conn.cursor() as cur:
+        _preparar(cur)
+        hechas = set(_aplicadas(cur))
+    return [{"version": m.version, "nombre": m.nombre, "aplicada": m.version in hechas} for m in descubrir(directorio)]
+
+
+def aplicar(hasta: int | None = None, directorio: Path = MIGRATIONS_DIR) -> list[int]:
+    """Aplica en orden las migraciones pendientes (hasta la versión *hasta*).
+
+    Returns:
+        Versiones aplicadas en esta llamada.
+    """
+    aplicadas: list[int] = []
+    for mig in descubrir(directorio):
+        if hasta is not None and mig.version > hasta:
+            break
+        with get_conn() as conn, conn.cursor() as cur:
+            _preparar(cur)
+            if mig.version in _aplicadas(cur):
+                continue
+            cur.execute(mig.up.read_text(encoding="utf-8"))
+            cur.execute(
+                "INSERT INTO public.schema_migrations (version, nombre) VALUES (%s, %s)",
+                (mig.version, mig.nombre),
+            )
+        aplicadas.append(mig.version)
+    return aplicadas
+
+
+def revertir(pasos: int = 1, directorio: Path = MIGRATIONS_DIR) -> list[int]:
+    """Revierte las últimas *pasos* migraciones aplicadas.
+
+    Returns:
+        Versiones revertidas, de la más nueva a la más antigua.
+
+    Raises:
+        ValueError: Si alguna no tiene ``.down.sql`` o no está en disco.
+    """
+    por_version = {m.version: m for m in descubrir(directorio)}
+    revertidas: list[int] = []
+    for _ in range(pasos):
+        with get_conn() as conn, conn.cursor() as cur:
+            _preparar(cur)
+            hechas = _aplicadas(cur)
+            if not hechas:
+                break
+            mig = por_version.get(hechas[-1])
+            if mig is None or mig.down is None:
+                raise ValueError(f"La migración {hechas[-1]:04d} no se puede revertir")
+            cur.execute(mig.down.read_text(encoding="utf-8"))
+            cur.execute("DELETE FROM public.schema_migrations WHERE version = %s", (mig.version,))
+        revertidas.append(mig.version)
+    return revertidas
+
+
+# -------------------------------------------------------------------------
+# CLI
+# -------------------------------------------------------------------------
+def main(argv: Sequence[str] | None = None) -> None:
+    """Punto de entrada de ``python -m repository.migrations``."""
+    parser = argparse.ArgumentParser(prog="python -m repository.migrations", description="Migraciones del esquema Matex")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("status", help="Lista migraciones y su estado")
+    p_apply = sub.add_parser("apply", help="Aplica migraciones pendientes")
+    p_apply.add_argument("--to", type=int, default=None, help="Versión máxima a aplicar")
+    p_back = sub.add_parser("rollback", help="Revierte las últimas migraciones")
+    p_back.add_argument("--steps", type=int, default=1, help="Cantidad de migraciones a revertir")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "status":
+        for fila in estado():
+            marca = "x" if fila["aplicada"] else " "
+            print(f"[{marca}] {fila['version']:04d} {fila['nombre']}")
+    elif args.cmd == "apply":
+        hechas = aplicar(args.to)
+        print("Aplicadas: " + (", ".join(f"{v:04d}" for v in hechas) or "ninguna"))
+    else:
+        hechas = revertir(args.steps)
+        print("Revertidas: " + (", ".join(f"{v:04d}" for v in hechas) or "ninguna"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""Pool de conexiones *thread-safe* y observable (capa *Repository*).
+
+Sustituye a ``psycopg2.pool.SimpleConnectionPool``, que no es seguro entre
+hilos y lanza ``PoolError`` en cuanto se agota ``maxconn``. Este pool:
+
+- Bloquea al solicitante hasta ``timeout`` segundos cuando no hay
+  conexiones libres, con una cola de espera acotada (``max_waiters``).
+- Verifica la salud de la conexión al entregarla (``SELECT 1`` si estuvo
+  ociosa más de ``check_after`` segundos).
+- Recicla conexiones ociosas demasiado tiempo (``max_idle``) o usadas
+  demasiadas veces (``max_uses``).
+- Expone estadísticas en vivo mediante :meth:`ConnectionPool.stats`.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable
+
+from psycopg2 import extensions
+from psycopg2.extensions import connection
+from psycopg2.pool import PoolError
+
+#: Límites superiores (ms) de los buckets del histograma de espera.
+LATENCY_BUCKETS_MS: tuple[float, ...] = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class PoolTimeout(PoolError):
+    """No se obtuvo una conexión dentro del ``timeout`` indicado."""
+
+
+class PoolExhausted(PoolError):
+    """La cola de espera del pool está llena; se rechaza la solicitud."""
+
+
+class _Slot:
+    """Metadatos de una conexión física administrada por el pool."""
+
+    __slots__ = ("conn", "last_used", "uses")
+
+    def __init__(self, conn: connection) -> None:
+        self.conn = conn
+        self.last_used = time.monotonic()
+        self.uses = 0
+
+
+class ConnectionPool:
+    """Pool de conexiones psycopg2 seguro entre hilos.
+
+    Args:
+        connect: Callable sin argumentos que abre una conexión nueva.
+        minconn: Conexiones que se abren al crear el pool.
+        maxconn: Conexiones simultáneas máximas (en uso + ociosas).
+        timeout: Segundos máximos de espera por una conexión libre.
+        max_waiters: Hilos que pueden esperar a la vez; el siguiente recibe
+            :class:`PoolExhausted` de inmediato.
+        max_idle: Segundos de inactividad tras los que se recicla una conexión.
+        max_uses: Préstamos tras los que se recicla una conexión.
+        check_after: Segundos de inactividad a partir de los que se hace un
+            ``SELECT 1`` antes de entregar la conexión.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], connection],
+        *,
+        minconn: int = 1,
+        maxconn: int = 10,
+        timeout: float = 30.0,
+        max_waiters: int = 64,
+        max_idle: float = 600.0,
+        max_uses: int = 5000,
+        check_after: float = 5.0,
+    ) -> None:
+        """Crea el pool y abre ``minconn`` conexiones."""
+        if maxconn < 1 or minconn < 0 or minconn > maxconn:
+            raise ValueError("Se requiere 0 <= minconn <= maxconn y maxconn >= 1")
+        self._connect = connect
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_waiters = max_waiters
+        self.max_idle = max_idle
+        self.max_uses = max_uses
+        self.check_after = check_after
+
+        self._cond = threading.Condition(threading.Lock())
+        self._idle: list[_Slot] = []
+        self._used: dict[int, _Slot] = {}
+        self._opening = 0
+        # Tomadas de _idle que se validan fuera del lock (siguen contando)
+        self._checking = 0
+        self._waiters = 0
+        self._closed = False
+
+        # Métricas acumuladas
+        self._hist = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self._acquired = 0
+        self._timeouts = 0
+        self._rejected = 0
+        self._recycled = 0
+        self._broken = 0
+
+        for _ in range(minconn):
+            self._idle.append(_Slot(self._connect()))
+
+    # ------------------------------------------------------------ internos
+    def _size(self) -> int:
+        """Conexiones físicas abiertas, en apertura o en validación (requiere el lock)."""
+        return len(self._idle) + len(self._used) + self._opening + self._checking
+
+    def _expired(self, slot: _Slot, now: float) -> bool:
+        """Indica si la conexión debe reciclarse por uso o inactividad."""
+        return slot.uses >= self.max_uses or now - slot.last_used > self.max_idle
+
+    def _healthy(self, slot: _Slot, now: float) -> bool:
+        """Hace un ``SELECT 1`` si la conexión lleva ociosa más de ``check_after``."""
+        if slot.conn.closed:
+            return False
+        if now - slot.last_used <= self.check_after:
+            return True
+        try:
+            with slot.conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            slot.conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _discard(slot: _Slot) -> None:
+        """Cierra la conexión física ignorando errores."""
+        try:
+            slot.conn.close()
+        except Exception:
+            pass
+
+    def _record_wait(self, elapsed: float) -> None:
+        """Anota la latencia de adquisición en el histograma (requiere el lock)."""
+        self._hist[bisect_left(LATENCY_BUCKETS_MS, elapsed * 1000)] += 1
+        self._acquired += 1
+
+    # ------------------------------------------------------------ API
+    def getconn(self, timeout: float | None = None) -> connection:
+        """Entrega una conexión sana, esperando si el pool está lleno.
+
+        Args:
+            timeout: Segundos de espera; por defecto ``self.timeout``.
+
+        Raises:
+            PoolExhausted: Si la cola de espera está llena.
+            PoolTimeout: Si no se liberó ninguna conexión a tiempo.
+            PoolError: Si el pool está cerrado.
+            psycopg2.Error: Si falla la apertura de una conexión nueva.
+        """
+        wait = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + wait
+
+        while True:
+            slot: _Slot | None = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolError("El pool de conexiones está cerrado")
+                    if self._idle:
+                        slot = self._idle.pop()
+                        self._checking += 1
+                        break
+                    if self._size() < self.maxconn:
+                        self._opening += 1
+                        break
+                    if self._waiters >= self.max_waiters:
+                        self._rejected += 1
+                        raise PoolExhausted(f"Cola de espera llena ({self.max_waiters} hilos)")
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(f"Sin conexiones libres tras {wait:.1f}s")
+                    self._waiters += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiters -= 1
+
+            # Fuera del lock: abrir, validar o reciclar la conexión
+            if slot is None:
+                try:
+                    slot = _Slot(self._connect())
+                except Exception:
+                    with self._cond:
+                        self._opening -= 1
+                        self._cond.notify()
+                    raise
+                nueva = True
+            else:
+                now = time.monotonic()
+                reason = "recycled" if self._expired(slot, now) else None
+                if reason is None and not self._healthy(slot, now):
+                    reason = "broken"
+                if reason is not None:
+                    self._discard(slot)
+                    with self._cond:
+                        self._checking -= 1
+                        if reason == "broken":
+                            self._broken += 1
+                        else:
+                            self._recycled += 1
+                        self._cond.notify()
+                    continue
+                nueva = False
+
+            # La conexión sigue contada (apertura / validación) hasta pasar a _used
+            with self._cond:
+                if nueva:
+                    self._opening -= 1
+                else:
+                    self._checking -= 1
+                cerrado = self._closed
+                if cerrado:
+                    self._cond.notify()
+                else:
+                    self._used[id(slot.conn)] = slot
+                    slot.uses += 1
+                    self._record_wait(time.monotonic() - start)
+            if cerrado:
+                # closeall() corrió mientras tanto: no se entrega ni vuelve al pool
+                self._discard(slot)
+                raise PoolError("El pool de conexiones está cerrado")
+            return slot.conn
+
+    def putconn(self, conn: connection, close: bool = False) -> None:
+        """Devuelve *conn* al pool (o la cierra si está rota o se pide *close*)."""
+        with self._cond:
+            slot = self._used.pop(id(conn), None)
+        if slot is None:
+            raise PoolError("La conexión no pertenece a este pool")
+
+        if not close and not conn.closed:
+            status = conn.info.transaction_status
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                close = True
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except Exception:
+                    close = True
+
+        with self._cond:
+            if close or conn.closed or self._closed:
+                self._discard(slot)
+            else:
+                slot.last_used = time.monotonic()
+                self._idle.append(slot)
+            self._cond.notify()
+
+    def closeall(self) -> None:
+        """Cierra las conexiones ociosas y marca el pool como cerrado.
+
+        Las conexiones en uso se cierran al devolverse con :meth:`putconn`.
+        """
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for slot in idle:
+            self._discard(slot)
+
+    def stats(self) -> dict[str, Any]:
+        """Devuelve una instantánea de uso del pool.
+
+        Returns:
+            Dict con ``in_use``, ``idle``, ``opening``, ``checking``
+            (validándose), ``waiters``, ``maxconn``,
+            contadores acumulados (``acquired``, ``timeouts``, ``rejected``,
+            ``recycled``, ``broken``) y ``acquire_ms``: histograma
+            ``{límite_superior_ms: cantidad}`` (``inf`` para el último bucket).
+        """
+        with self._cond:
+            bounds = [*LATENCY_BUCKETS_MS, float("inf")]
+            return {
+                "in_use": len(self._used),
+                "idle": len(self._idle),
+                "opening": self._opening,
+                "checking": self._checking,
+                "waiters": self._waiters,
+                "maxconn": self.maxconn,
+                "acquired": self._acquired,
+                "timeouts": self._timeouts,
+                "rejected": self._rejected,
+                "recycled": self._recycled,
+                "broken": self._broken,
+                "acquire_ms": dict(zip(bounds, self._hist)),
+            }
@@ -7,11 +7,40 @@ mínimas a tipos *dict* / *list*.
 from __future__ import annotations
 
 import os
-from typing import Any, Sequence
+import threading
+import time
+from datetime import datetime
+from typing import Any, Iterable, Sequence
 
-import pandas as pd
+from psycopg2 import errors
 
-from repository.db import get_conn
+from repository import streaming
+from repository.db import al_cerrar_pool, get_conn
+from repository.streaming import Progreso
+
+#: Segundos que un precio permanece en la caché en memoria.
+PRECIOS_TTL: float = 60.0
+#: Stock a partir del cual (inclusive) un producto se considera con stock bajo.
+STOCK_BAJO = 30
+
+# id_producto → (precio_neto, instante de expiración)
+_precios_cache: dict[int, tuple[int, float]] = {}
+_precios_lock = threading.Lock()
+# Se incrementa en cada invalidación; evita guardar lecturas previas a ella.
+_precios_gen = 0
+
+#: Valor por defecto de los parámetros donde ``None`` ya significa algo
+#: (p. ej. quitar el código): indica que el dato no se modifica.
+SIN_CAMBIO: Any = object()
+
+
+class CodigoDuplicado(ValueError):
+    """El código de barras ya está asignado a otro producto."""
+
+    def __init__(self, codigo: str) -> None:
+        """Guarda el código en conflicto."""
+        self.codigo = codigo
+        super().__init__(f"El código {codigo!r} ya está asignado a otro producto")
 
 
 # -------------------------------------------------------------------------
@@ -34,9 +63,63 @@ def obtener_productos() -> list[tuple[int, str, int]]:
 
 def obtener_precio(id_prod: int) -> int:
     """Devuelve el precio neto de un producto (o 0 si no existe)."""
-    query = "SELECT precio_neto " "FROM precios " "WHERE id_producto = %s"
-    res = _fetch_all(query, (id_prod,))
-    return int(res[0][0]) if res else 0
+    return obtener_precios([id_prod])[id_prod]
+
+
+def obtener_precios(ids: Iterable[int], *, usar_cache: bool = True) -> dict[int, int]:
+    """Devuelve los precios netos de varios productos con una sola consulta.
+
+    Los precios se sirven desde una caché en memoria con TTL
+    (``PRECIOS_TTL``); solo los ids ausentes o vencidos van a la BD.
+
+    Args:
+        ids: IDs de producto (se ignoran duplicados).
+        usar_cache: Si es ``False`` consulta siempre la BD.
+
+    Returns:
+        Dict ``{id_producto: precio_neto}``; 0 para productos sin precio.
+    """
+    pedidos = set(ids)
+    precios: dict[int, int] = {}
+    ahora = time.monotonic()
+
+    with _precios_lock:
+        gen = _precios_gen
+        if usar_cache:
+            for id_prod in pedidos:
+                hit = _precios_cache.get(id_prod)
+                if hit is not None and hit[1] > ahora:
+                    precios[id_prod] = hit[0]
+
+    faltantes = list(pedidos - precios.keys())
+    if not faltantes:
+        return precios
+
+    rows = _fetch_all(
+        "SELECT id_producto, precio_neto FROM precios WHERE id_producto = ANY(%s::int[])",
+        (faltantes,),
+    )
+    leidos = dict.fromkeys(faltantes, 0)
+    leidos.update({r[0]: int(r[1] or 0) for r in rows})
+    precios.update(leidos)
+
+    with _precios_lock:
+        if gen == _precios_gen:
+            vence = time.monotonic() + PRECIOS_TTL
+            _precios_cache.update({k: (v, vence) for k, v in leidos.items()})
+    return precios
+
+
+def invalidar_precios(ids: Iterable[int] | None = None) -> None:
+    """Descarta de la caché los precios de *ids* (o todos si es ``None``)."""
+    global _precios_gen
+    with _precios_lock:
+        _precios_gen += 1
+        if ids is None:
+            _precios_cache.clear()
+        else:
+            for id_prod in ids:
+                _precios_cache.pop(id_prod, None)
 
 
 def obtener_stock(id_prod: int) -> int:
@@ -46,28 +129,43 @@ def obtener_stock(id_prod: int) -> int:
     return int(res[0][0]) if res else 0
 
 
-def descontar_stock(id_prod: int, cantidad: int) -> None:
-    """Resta *cantidad* al stock del producto indicado."""
+def descontar_stock(id_prod: int, cantidad: int) -> bool:
+    """Resta *cantidad* al stock del producto indicado si alcanza.
+
+    Returns:
+        ``True`` si se descontó; ``False`` si el stock no alcanzaba.
+    """
     with get_conn() as conn, conn.cursor() as cur:
         cur.execute(
-            "UPDATE productos SET stock = stock - %s WHERE id_producto = %s",
-            (cantidad, id_prod),
+            "UPDATE productos SET stock = stock - %s WHERE id_producto = %s AND stock >= %s",
+            (cantidad, id_prod, cantidad),
         )
+        return cur.rowcount == 1
 
 
 # ----- CRUD --------------------------------------------------------------
-def crear(nombre: str, precio: int, stock: int) -> None:
-    """Crea un nuevo producto con su precio inicial."""
+def crear(nombre: str, precio: int, stock: int, codigo: str | None = None) -> None:
+    """Crea un nuevo producto con su precio inicial (y opcionalmente su código de barras).
+
+    Raises:
+        CodigoDuplicado: Si otro producto ya usa *codigo*.
+    """
     with get_conn() as conn, conn.cursor() as cur:
-        cur.execute(
-            "INSERT INTO productos (nombre, stock) VALUES (%s, %s) RETURNING id_producto",
-            (nombre, stock),
-        )
+        try:
+            cur.execute(
+                "INSERT INTO productos (nombre, stock, codigo) VALUES (%s, %s, %s) RETURNING id_producto",
+                (nombre, stock, codigo),
+            )
+        except errors.UniqueViolation as exc:
+            if exc.diag.constraint_name != "idx_productos_codigo":
+                raise
+            raise CodigoDuplicado(codigo or "") from exc
         id_prod = cur.fetchone()[0]
         cur.execute(
             "INSERT INTO precios (id_producto, precio_neto) VALUES (%s, %s)",
             (id_prod, precio),
         )
+    invalidar_precios([id_prod])
 
 
 def eliminar(id_prod: int) -> None:
@@ -75,19 +173,252 @@ def eliminar(id_prod: int) -> None:
     with get_conn() as conn, conn.cursor() as cur:
         cur.execute("DELETE FROM precios WHERE id_producto=%s", (id_prod,))
         cur.execute("DELETE FROM productos WHERE id_producto=%s", (id_prod,))
+    invalidar_precios([id_prod])
 
 
-def actualizar(id_prod: int, precio: int, stock: int) -> None:
-    """Actualiza precio y stock de un producto existente."""
+def actualizar(id_prod: int, precio: int, stock: int, codigo: str | None = SIN_CAMBIO) -> None:
+    """Actualiza precio, stock y opcionalmente el código de un producto, en una transacción.
+
+    Args:
+        codigo: Nuevo código de barras (``None`` lo quita); si se omite no cambia.
+
+    Raises:
+        CodigoDuplicado: Si otro producto ya usa *codigo* (no se aplica nada).
+    """
     with get_conn() as conn, conn.cursor() as cur:
         cur.execute(
             "UPDATE precios SET precio_neto=%s WHERE id_producto=%s",
             (precio, id_prod),
         )
+        try:
+            if codigo is SIN_CAMBIO:
+                cur.execute("UPDATE productos SET stock=%s WHERE id_producto=%s", (stock, id_prod))
+            else:
+                cur.execute(
+                    "UPDATE productos SET stock=%s, codigo=%s WHERE id_producto=%s",
+                    (stock, codigo, id_prod),
+                )
+        except errors.UniqueViolation as exc:
+            raise CodigoDuplicado(codigo or "") from exc
+    invalidar_precios([id_prod])
+
+
+# ----- Códigos de barras / SKU ------------------------------------------
+#: Fila del catálogo: ``(id, codigo, nombre, precio, stock)``.
+FilaCatalogo = tuple[int, str | None, str, int | None, int]
+
+_CATALOGO_SQL = """
+    SELECT p.id_producto, p.codigo, p.nombre, pr.precio_neto, p.stock
+    FROM productos p
+    LEFT JOIN precios pr ON pr.id_producto = p.id_producto
+"""
+
+
+def _fila_catalogo(row: tuple) -> FilaCatalogo:
+    """Convierte ``precio_neto`` (``numeric``, llega como ``Decimal``) a ``int``."""
+    id_prod, codigo, nombre, precio, stock = row
+    return id_prod, codigo, nombre, None if precio is None else int(precio), stock
+
+
+def asignar_codigo(id_prod: int, codigo: str | None) -> None:
+    """Asigna (o quita, con ``None``) el código de barras de un producto.
+
+    Raises:
+        CodigoDuplicado: Si otro producto ya usa *codigo*.
+    """
+    with get_conn() as conn, conn.cursor() as cur:
+        try:
+            cur.execute("UPDATE productos SET codigo=%s WHERE id_producto=%s", (codigo, id_prod))
+        except errors.UniqueViolation as exc:
+            raise CodigoDuplicado(codigo or "") from exc
+
+
+def buscar_por_codigo(codigo: str) -> dict[str, Any] | None:
+    """Busca un producto por código de barras (índice único ``idx_productos_codigo``).
+
+    Returns:
+        Dict con ``id``, ``codigo``, ``nombre``, ``precio`` y ``stock`` o
+        ``None`` si no existe.
+    """
+    rows = _fetch_all(_CATALOGO_SQL + " WHERE p.codigo = %s", (codigo,))
+    if not rows:
+        return None
+    id_prod, cod, nombre, precio, stock = _fila_catalogo(rows[0])
+    return {"id": id_prod, "codigo": cod, "nombre": nombre, "precio": precio or 0, "stock": stock}
+
+
+# ----- Catálogo en memoria ---------------------------------------------
+#: Canal de ``NOTIFY`` por el que la migración 0007 avisa cada producto
+#: insertado, modificado o eliminado (payload: ``id_producto``).
+CANAL_PRODUCTOS = "productos"
+
+
+def productos_modificados(desde: datetime | None = None) -> tuple[list[FilaCatalogo], datetime]:
+    """Todos los productos, o solo los modificados después de *desde*.
+
+    La marca ``modificado`` la actualizan triggers ante cualquier cambio
+    del producto o de su precio.
+
+    Returns:
+        ``(filas, marca)``: filas ``(id, codigo, nombre, precio, stock)``
+        (``precio`` ``None`` si no tiene) y la hora del servidor al leer,
+        para pasarla como *desde* la próxima vez.
+    """
+    with get_conn() as conn, conn.cursor() as cur:
+        if desde is None:
+            cur.execute(_CATALOGO_SQL)
+        else:
+            cur.execute(_CATALOGO_SQL + " WHERE p.modificado > %s", (desde,))
+        filas = [_fila_catalogo(r) for r in cur.fetchall()]
+        cur.execute("SELECT now()")
+        return filas, cur.fetchone()[0]
+
+
+def productos_por_id(ids: Iterable[int]) -> list[FilaCatalogo]:
+    """Filas ``(id, codigo, nombre, precio, stock)`` de *ids*; los que no existen se omiten."""
+    return [_fila_catalogo(r) for r in _fetch_all(_CATALOGO_SQL + " WHERE p.id_producto = ANY(%s)", (list(ids),))]
+
+
+# ----- Importación masiva -----------------------------------------------
+def importar_lote(filas: Iterable[tuple[str, int, int]]) -> dict[str, int]:
+    """Crea o actualiza productos en bloque, identificados por ``nombre``.
+
+    Las filas se cargan con ``COPY`` en una tabla temporal y luego una sola
+    sentencia hace el *upsert* de ``productos`` (stock) y ``precios``
+    (``precio_neto``). Todo ocurre en una transacción: o entra el lote
+    completo o nada.
+
+    Args:
+        filas: ``(nombre, precio, stock)`` ya validadas y sin nombres
+            repetidos; se consumen en streaming.
+
+    Returns:
+        Dict con ``insertados`` y ``actualizados``.
+    """
+    with get_conn() as conn, conn.cursor() as cur:
         cur.execute(
-            "UPDATE productos SET stock=%s WHERE id_producto=%s",
-            (stock, id_prod),
+            """
+            CREATE TEMP TABLE import_productos (
+                nombre text    NOT NULL,
+                precio numeric NOT NULL,
+                stock  integer NOT NULL
+            ) ON COMMIT DROP
+            """
         )
+        streaming.copiar_filas(cur, "import_productos", ["nombre", "precio", "stock"], filas)
+        cur.execute(
+            """
+            WITH prod AS (
+                INSERT INTO productos AS p (nombre, stock)
+                SELECT nombre, stock FROM import_productos
+                ON CONFLICT (nombre) DO UPDATE SET stock = EXCLUDED.stock
+                RETURNING p.id_producto, p.nombre, (p.xmax = 0) AS nuevo
+            ), prec AS (
+                INSERT INTO precios AS pr (id_producto, precio_neto)
+                SELECT prod.id_producto, i.precio
+                FROM prod JOIN import_productos i ON i.nombre = prod.nombre
+                ON CONFLICT (id_producto) DO UPDATE SET precio_neto = EXCLUDED.precio_neto
+            )
+            SELECT COUNT(*) FILTER (WHERE nuevo), COUNT(*) FILTER (WHERE NOT nuevo) FROM prod
+            """
+        )
+        insertados, actualizados = cur.fetchone()
+    invalidar_precios()
+    return {"insertados": insertados, "actualizados": actualizados}
+
+
+# ----- Búsqueda por nombre ----------------------------------------------
+#: Largo mínimo del texto para buscar por subcadena y similitud (trigramas);
+#: con menos caracteres solo se busca por prefijo.
+MIN_TRIGRAMA = 3
+#: Similitud mínima (``word_similarity`` de pg_trgm) para aceptar errores de tipeo.
+UMBRAL_SIMILITUD = 0.5
+
+_BUSCAR_SQL = """
+    SELECT p.id_producto, p.nombre, pr.precio_neto, p.stock, p.codigo
+    FROM productos p
+    LEFT JOIN precios pr ON p.id_producto = pr.id_producto
+"""
+# Misma expresión que idx_productos_nombre_prefijo (prefijo y orden alfabético)
+_NOMBRE_C = 'lower(p.nombre) COLLATE "C"'
+_SUBCADENA_SQL = _BUSCAR_SQL + f"""
+    WHERE lower(p.nombre) LIKE %(sub)s
+    ORDER BY {_NOMBRE_C} LIKE %(prefijo)s DESC, {_NOMBRE_C}, p.id_producto
+"""
+_TRIGRAMA_SQL = _BUSCAR_SQL + f"""
+    WHERE lower(p.nombre) LIKE %(sub)s OR %(q)s <%% lower(p.nombre)
+    ORDER BY {_NOMBRE_C} LIKE %(prefijo)s DESC,
+             lower(p.nombre) LIKE %(sub)s DESC,
+             word_similarity(%(q)s, lower(p.nombre)) DESC,
+             {_NOMBRE_C}, p.id_producto
+"""
+_PAGINA_SQL = " LIMIT %(limite)s OFFSET %(offset)s"
+
+# ¿El servidor tiene pg_trgm? Se consulta una vez por pool (ver `_olvidar_trigramas`).
+_trigramas: bool | None = None
+
+
+def _usa_trigramas(cur) -> bool:
+    global _trigramas
+    if _trigramas is None:
+        cur.execute("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+        _trigramas = bool(cur.fetchone()[0])
+    return _trigramas
+
+
+@al_cerrar_pool
+def _olvidar_trigramas() -> None:
+    """Vuelve a consultar pg_trgm en la próxima búsqueda (el servidor pudo cambiar)."""
+    global _trigramas
+    _trigramas = None
+
+
+def _escapar_like(texto: str) -> str:
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def buscar(texto: str = "", *, limite: int = 50, offset: int = 0) -> list[dict[str, Any]]:
+    """Busca productos por nombre, sin distinguir mayúsculas, ordenados por relevancia.
+
+    Primero los nombres que empiezan con *texto*, luego los que lo
+    contienen y por último (si el servidor tiene pg_trgm) los parecidos,
+    para tolerar errores de tipeo. Textos de menos de ``MIN_TRIGRAMA``
+    caracteres solo buscan por prefijo; un texto vacío lista todo por
+    nombre. Cada caso usa un índice de la migración 0006.
+
+    Args:
+        texto: Texto a buscar.
+        limite: Cantidad máxima de resultados (tamaño de página).
+        offset: Resultados a saltar (página siguiente).
+
+    Returns:
+        Lista de dicts con ``id``, ``nombre``, ``precio`` (``None`` si no
+        tiene), ``stock`` y ``codigo``.
+    """
+    q = texto.strip().lower()
+    patron = _escapar_like(q)
+    params = {"q": q, "prefijo": patron + "%", "sub": "%" + patron + "%", "limite": limite, "offset": offset}
+    with get_conn() as conn, conn.cursor() as cur:
+        if not q:
+            sql = _BUSCAR_SQL + f"ORDER BY {_NOMBRE_C}, p.id_producto"
+        elif len(q) < MIN_TRIGRAMA:
+            sql = _BUSCAR_SQL + f"WHERE {_NOMBRE_C} LIKE %(prefijo)s ORDER BY {_NOMBRE_C}, p.id_producto"
+        elif _usa_trigramas(cur):
+            cur.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)", (str(UMBRAL_SIMILITUD),))
+            sql = _TRIGRAMA_SQL
+        else:
+            sql = _SUBCADENA_SQL
+        try:
+            cur.execute(sql + _PAGINA_SQL, params)
+        except errors.UndefinedFunction:
+            if sql is not _TRIGRAMA_SQL:
+                raise
+            # Quitaron pg_trgm del servidor: subcadena por ahora, se vuelve a consultar después
+            conn.rollback()
+            _olvidar_trigramas()
+            cur.execute(_SUBCADENA_SQL + _PAGINA_SQL, params)
+        rows = cur.fetchall()
+    return [{"id": r[0], "nombre": r[1], "precio": r[2], "stock": r[3], "codigo": r[4]} for r in rows]
 
 
 # ----- Listado y exportación --------------------------------------------
@@ -95,23 +426,26 @@ def listar(*, stock_bajo: bool = False, sin_precio: bool = False) -> list[dict[s
     """Devuelve los productos filtrados.
 
     Args:
-        stock_bajo: Solo productos con stock ≤ 30.
+        stock_bajo: Solo productos con stock ≤ ``STOCK_BAJO``.
         sin_precio: Solo productos sin precio asignado.
 
     Returns:
-        Lista de dicts con ``id``, ``nombre``, ``precio`` y ``stock``.
+        Lista de dicts con ``id``, ``nombre``, ``precio`` (``None`` si no
+        tiene), ``stock`` y ``codigo``.
     """
+    params: tuple = ()
     if stock_bajo:
         sql = """
-            SELECT p.id_producto, p.nombre, pr.precio_neto, p.stock
+            SELECT p.id_producto, p.nombre, pr.precio_neto, p.stock, p.codigo
             FROM productos p
             LEFT JOIN precios pr ON p.id_producto = pr.id_producto
-            WHERE p.stock <= 30
+            WHERE p.stock <= %s
             ORDER BY p.id_producto
         """
+        params = (STOCK_BAJO,)
     elif sin_precio:
         sql = """
-            SELECT p.id_producto, p.nombre, pr.precio_neto, p.stock
+            SELECT p.id_producto, p.nombre, pr.precio_neto, p.stock, p.codigo
             FROM productos p
             LEFT JOIN precios pr ON p.id_producto = pr.id_producto
             WHERE pr.precio_neto IS NULL
@@ -119,23 +453,67 @@ def listar(*, stock_bajo: bool = False, sin_precio: bool = False) -> list[dict[s
         """
     else:
         sql = """
-            SELECT p.id_producto, p.nombre, pr.precio_neto, p.stock
+            SELECT p.id_producto, p.nombre, pr.precio_neto, p.stock, p.codigo
             FROM productos p
             LEFT JOIN precios pr ON p.id_producto = pr.id_producto
             ORDER BY p.id_producto
         """
-    rows = _fetch_all(sql)
-    return [{"id": r[0], "nombre": r[1], "precio": r[2] or 0, "stock": r[3]} for r in rows]
+    rows = _fetch_all(sql, params)
+    return [{"id": r[0], "nombre": r[1], "precio": r[2], "stock": r[3], "codigo": r[4]} for r in rows]
+
+
+# Inventario para exportar; los alias de columna son el encabezado del archivo
+_EXPORT_SQL = """
+    SELECT p.id_producto AS id, p.nombre, COALESCE(pr.precio_neto, 0) AS precio, p.stock
+    FROM productos p
+    LEFT JOIN precios pr ON p.id_producto = pr.id_producto
+    ORDER BY p.id_producto
+"""
+
+
+def _ruta_export(path: str | None, ext: str) -> str:
+    """Ruta absoluta de destino; por defecto *data/inventario_exportado.<ext>*."""
+    if path is None:
+        os.makedirs("data", exist_ok=True)
+        path = f"data/inventario_exportado.{ext}"
+    return os.path.abspath(path)
+
+
+def exportar_excel(path: str | None = None, *, progreso: Progreso | None = None) -> str:
+    """Exporta el inventario a Excel en streaming (memoria constante).
+
+    Args:
+        path: Archivo de destino; por defecto *data/inventario_exportado.xlsx*.
+        progreso: Callback ``(filas_escritas, total)`` llamado tras cada bloque.
+
+    Returns:
+        Ruta absoluta del archivo generado.
+    """
+    path = _ruta_export(path, "xlsx")
+    streaming.exportar_xlsx(path, ["id", "nombre", "precio", "stock"], _EXPORT_SQL, progreso=progreso)
+    return path
+
 
+def exportar_csv(path: str | None = None) -> str:
+    """Exporta el inventario a CSV con ``COPY … TO STDOUT``.
 
-def exportar_excel() -> str:
-    """Exporta el inventario a *data/inventario_exportado.xlsx*.
+    Returns:
+        Ruta absoluta del archivo generado.
+    """
+    path = _ruta_export(path, "csv")
+    streaming.exportar_csv(path, _EXPORT_SQL)
+    return path
+
+
+def exportar_parquet(path: str | None = None, *, progreso: Progreso | None = None) -> str:
+    """Exporta el inventario a Parquet.
 
     Returns:
         Ruta absoluta del archivo generado.
+
+    Raises:
+        ImportError: Si *pyarrow* no está instalado.
     """
-    df = pd.DataFrame(listar())
-    os.makedirs("data", exist_ok=True)
-    path = os.path.abspath("data/inventario_exportado.xlsx")
-    df.to_excel(path, index=False)
+    path = _ruta_export(path, "parquet")
+    streaming.exportar_parquet(path, _EXPORT_SQL, progreso=progreso)
     return path
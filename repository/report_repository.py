@@ -1,98 +1,345 @@
-"""Operaciones de acceso a datos para generación de reportes de ventas."""
+"""Operaciones de acceso a datos para generación de reportes de ventas.
+
+Por defecto los reportes leen del resumen diario ``ventas_diarias*``
+(ver `repository.rollup`), que se mantiene al insertar y eliminar ventas. Con
+``USE_ROLLUP = False`` se agregan directamente las tablas crudas.
+"""
 
 from datetime import date
-from typing import Dict, List
+from typing import Any, Dict, List, Sequence, Tuple
 
 from psycopg2.extras import RealDictCursor
 
 from repository.db import get_conn
 
+#: Si es ``True`` los reportes leen del resumen diario en vez de ``ventas_producto``.
+USE_ROLLUP = True
+
+# Unidades vendidas por producto en el rango: (id_producto, unidades)
+_LINEAS_CRUDO = """
+    SELECT vp.id_producto, vp.cantidad AS unidades
+    FROM ventas_producto vp
+    JOIN ventas v ON v.id_venta = vp.id_venta
+    WHERE v.fecha BETWEEN %(desde)s AND %(hasta)s
+"""
+_LINEAS_ROLLUP = """
+    SELECT id_producto, unidades
+    FROM ventas_diarias_producto
+    WHERE fecha BETWEEN %(desde)s AND %(hasta)s AND unidades <> 0
+"""
+
+# Cantidad de ventas en el rango: una fila con la columna n
+_CONTEO_CRUDO = "SELECT COUNT(*) AS n FROM ventas WHERE fecha BETWEEN %(desde)s AND %(hasta)s"
+_CONTEO_ROLLUP = "SELECT COALESCE(SUM(cantidad_ventas), 0) AS n FROM ventas_diarias WHERE fecha BETWEEN %(desde)s AND %(hasta)s"
+
+
+def _lineas() -> str:
+    """Subconsulta de unidades por producto según ``USE_ROLLUP``."""
+    return _LINEAS_ROLLUP if USE_ROLLUP else _LINEAS_CRUDO
+
+
+def _conteo() -> str:
+    """Subconsulta del número de ventas según ``USE_ROLLUP``."""
+    return _CONTEO_ROLLUP if USE_ROLLUP else _CONTEO_CRUDO
+
 
 def fetch_summary(start_date: date, end_date: date) -> Dict[str, float]:
-    """Devuelve el total de ventas netas, la cantidad de ventas y el ticket promedio en el rango de fechas indicado."""
-    sql = """
+    """Devuelve el total de ventas netas, la cantidad de ventas y el ticket promedio en el rango de fechas indicado.
+
+    Sobre las tablas crudas se calcula en una sola pasada: cada venta del
+    rango se une a sus líneas (``LEFT JOIN``, para contar también ventas sin
+    detalle) y se agrega una única vez.
+    """
+    if USE_ROLLUP:
+        sql = f"""
+            SELECT
+                t.ventas_netas,
+                t.cantidad_ventas,
+                CASE WHEN t.cantidad_ventas = 0 THEN 0.0 ELSE t.ventas_netas / t.cantidad_ventas END AS ticket_promedio
+            FROM (
+                SELECT
+                    (SELECT COALESCE(SUM(l.unidades * pr.precio_neto), 0)::numeric
+                     FROM ({_LINEAS_ROLLUP}) l JOIN precios pr ON pr.id_producto = l.id_producto) AS ventas_netas,
+                    (SELECT n FROM ({_CONTEO_ROLLUP}) c) AS cantidad_ventas
+            ) t;
+        """
+    else:
+        sql = """
+            SELECT
+                t.ventas_netas,
+                t.cantidad_ventas,
+                CASE WHEN t.cantidad_ventas = 0 THEN 0.0 ELSE t.ventas_netas / t.cantidad_ventas END AS ticket_promedio
+            FROM (
+                SELECT
+                    COALESCE(SUM(vp.cantidad * pr.precio_neto), 0)::numeric AS ventas_netas,
+                    COUNT(DISTINCT v.id_venta) AS cantidad_ventas
+                FROM ventas v
+                LEFT JOIN ventas_producto vp ON vp.id_venta    = v.id_venta
+                LEFT JOIN precios pr         ON pr.id_producto = vp.id_producto
+                WHERE v.fecha BETWEEN %(desde)s AND %(hasta)s
+            ) t;
+        """
+    with get_conn() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(sql, {"desde": start_date, "hasta": end_date})
+        return cur.fetchone()
+
+
+# Métricas por día: (fecha, ventas_netas, unidades, utilidad, cantidad_ventas)
+_DIARIO_CRUDO = """
+    SELECT v.fecha,
+           COALESCE(SUM(vp.cantidad * pr.precio_neto), 0)   AS ventas_netas,
+           COALESCE(SUM(vp.cantidad), 0)                    AS unidades,
+           COALESCE(SUM(vp.cantidad * pr.utilidad_neta), 0) AS utilidad,
+           COUNT(DISTINCT v.id_venta)                       AS cantidad_ventas
+    FROM ventas v
+    LEFT JOIN ventas_producto vp ON vp.id_venta    = v.id_venta
+    LEFT JOIN precios pr         ON pr.id_producto = vp.id_producto
+    WHERE v.fecha BETWEEN %(desde)s AND %(hasta)s
+    GROUP BY v.fecha
+"""
+_DIARIO_ROLLUP = """
+    SELECT fecha,
+           COALESCE(SUM(ventas_netas), 0) AS ventas_netas,
+           SUM(unidades)                  AS unidades,
+           COALESCE(SUM(utilidad), 0)     AS utilidad,
+           SUM(cantidad_ventas)           AS cantidad_ventas
+    FROM (
+        SELECT fecha, 0 AS ventas_netas, 0 AS unidades, 0 AS utilidad, cantidad_ventas
+        FROM ventas_diarias
+        WHERE fecha BETWEEN %(desde)s AND %(hasta)s
+        UNION ALL
+        SELECT d.fecha, d.unidades * pr.precio_neto, d.unidades, d.unidades * pr.utilidad_neta, 0
+        FROM ventas_diarias_producto d
+        LEFT JOIN precios pr ON pr.id_producto = d.id_producto
+        WHERE d.fecha BETWEEN %(desde)s AND %(hasta)s
+    ) t
+    GROUP BY fecha
+"""
+
+#: Granularidades aceptadas por `fetch_sales_series` (unidades de ``date_trunc``).
+BUCKETS = ("day", "week", "month")
+
+
+def _diario() -> str:
+    """Subconsulta de métricas diarias según ``USE_ROLLUP``."""
+    return _DIARIO_ROLLUP if USE_ROLLUP else _DIARIO_CRUDO
+
+
+def fetch_period_summaries(periods: Sequence[Tuple[date, date]]) -> List[Dict[str, Any]]:
+    """Devuelve el resumen de varios periodos con una sola consulta.
+
+    Agrega por día una única vez el rango que cubre todos los periodos y
+    luego suma esos días dentro de cada periodo, así N periodos cuestan un
+    solo recorrido en vez de N llamadas a `fetch_summary`.
+
+    Args:
+        periods: Pares ``(desde, hasta)`` inclusivos; pueden solaparse.
+
+    Returns:
+        Un dict por periodo, en el mismo orden, con las claves de
+        `fetch_summary`.
+    """
+    if not periods:
+        return []
+    sql = f"""
+        WITH per AS (
+            SELECT * FROM unnest(%(desdes)s::date[], %(hastas)s::date[]) WITH ORDINALITY AS p(desde, hasta, idx)
+        ), diario AS ({_diario()}),
+        t AS (
+            SELECT
+                p.idx,
+                COALESCE(SUM(d.ventas_netas), 0)::numeric  AS ventas_netas,
+                COALESCE(SUM(d.cantidad_ventas), 0)::bigint AS cantidad_ventas
+            FROM per p
+            LEFT JOIN diario d ON d.fecha BETWEEN p.desde AND p.hasta
+            GROUP BY p.idx
+        )
         SELECT
-            COALESCE(SUM(vp.cantidad * pr.precio_neto), 0)::numeric AS ventas_netas,
-            (SELECT COUNT(*) FROM ventas WHERE fecha BETWEEN %s AND %s) AS cantidad_ventas,
-            CASE
-                WHEN (SELECT COUNT(*) FROM ventas
-                    WHERE fecha BETWEEN %s AND %s) = 0
-                THEN 0.0
-                ELSE COALESCE(SUM(vp.cantidad * pr.precio_neto), 0)::numeric / (SELECT COUNT(*) FROM ventas WHERE fecha BETWEEN %s AND %s)
-            END AS ticket_promedio
-            FROM ventas_producto vp
-            JOIN ventas v   ON vp.id_venta    = v.id_venta
-            JOIN precios pr ON vp.id_producto = pr.id_producto
-            WHERE v.fecha BETWEEN %s AND %s;
+            ventas_netas,
+            cantidad_ventas,
+            CASE WHEN cantidad_ventas = 0 THEN 0.0 ELSE ventas_netas / cantidad_ventas END AS ticket_promedio
+        FROM t
+        ORDER BY idx;
     """
-    params = (
-        start_date,
-        end_date,  # para COUNT ventas
-        start_date,
-        end_date,  # para CASE … COUNT ventas
-        start_date,
-        end_date,  # para cálculo ticket_promedio
-        start_date,
-        end_date,  # para la suma neta en el FROM
-    )
+    params = {
+        "desdes": [d for d, _ in periods],
+        "hastas": [h for _, h in periods],
+        "desde": min(d for d, _ in periods),
+        "hasta": max(h for _, h in periods),
+    }
     with get_conn() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
         cur.execute(sql, params)
-        return cur.fetchone()
+        return cur.fetchall()
+
+
+def fetch_sales_series(start_date: date, end_date: date, bucket: str = "day") -> List[Dict[str, Any]]:
+    """Devuelve la serie temporal de ventas del rango agrupada por día, semana o mes.
+
+    Los periodos sin ventas aparecen con ceros (``generate_series``). Las
+    semanas empiezan el lunes y cada periodo se rotula con su primer día,
+    aunque el primero y el último se recortan al rango pedido.
+
+    Args:
+        start_date: Fecha inicial (inclusive).
+        end_date: Fecha final (inclusive).
+        bucket: ``"day"``, ``"week"`` o ``"month"``.
+
+    Returns:
+        Un dict por periodo, en orden, con ``periodo`` (date), ``ventas_netas``,
+        ``unidades``, ``utilidad``, ``cantidad_ventas`` y ``ticket_promedio``.
+
+    Raises:
+        ValueError: Si *bucket* no es una granularidad soportada.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"Granularidad no soportada: {bucket!r} (usar {', '.join(BUCKETS)})")
+    sql = f"""
+        WITH diario AS ({_diario()}),
+        agregado AS (
+            SELECT
+                date_trunc(%(bucket)s, fecha::timestamp)::date AS periodo,
+                SUM(ventas_netas)    AS ventas_netas,
+                SUM(unidades)        AS unidades,
+                SUM(utilidad)        AS utilidad,
+                SUM(cantidad_ventas) AS cantidad_ventas
+            FROM diario
+            GROUP BY 1
+        ), periodos AS (
+            SELECT g::date AS periodo
+            FROM generate_series(
+                date_trunc(%(bucket)s, %(desde)s::timestamp),
+                %(hasta)s::timestamp,
+                ('1 ' || %(bucket)s)::interval
+            ) g
+        )
+        SELECT
+            p.periodo,
+            COALESCE(a.ventas_netas, 0)::numeric   AS ventas_netas,
+            COALESCE(a.unidades, 0)::bigint        AS unidades,
+            COALESCE(a.utilidad, 0)::numeric       AS utilidad,
+            COALESCE(a.cantidad_ventas, 0)::bigint AS cantidad_ventas,
+            CASE WHEN COALESCE(a.cantidad_ventas, 0) = 0 THEN 0.0 ELSE a.ventas_netas / a.cantidad_ventas END AS ticket_promedio
+        FROM periodos p
+        LEFT JOIN agregado a ON a.periodo = p.periodo
+        ORDER BY p.periodo;
+    """
+    with get_conn() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(sql, {"desde": start_date, "hasta": end_date, "bucket": bucket})
+        return cur.fetchall()
+
+
+def fetch_report_bundle(start_date: date, end_date: date, limit: int = 5) -> Dict[str, Any]:
+    """Devuelve el resumen y los tres rankings del rango en un solo viaje a la BD.
+
+    Filtra una única vez las líneas de venta del rango, las agrega por
+    producto y arma con ese conjunto el resumen y los *top* como JSON.
+
+    Args:
+        start_date: Fecha inicial (inclusive).
+        end_date: Fecha final (inclusive).
+        limit: Largo de los rankings de cantidad e ingresos (el de utilidad
+            devuelve todos los productos, como `fetch_top_profit`).
+
+    Returns:
+        Dict con ``resumen`` (mismas claves que `fetch_summary`),
+        ``top_cantidad``, ``top_ingresos`` y ``top_utilidad`` (mismas claves
+        que las funciones ``fetch_top_*``).
+    """
+    sql = f"""
+        WITH lineas AS ({_lineas()}),
+        por_producto AS (
+            SELECT
+                p.nombre,
+                SUM(l.unidades)                    AS cantidad,
+                SUM(l.unidades * pr.precio_neto)   AS ingresos,
+                SUM(l.unidades * pr.utilidad_neta) AS utilidad,
+                bool_or(pr.id_producto IS NOT NULL) AS con_precio
+            FROM lineas l
+            JOIN productos p     ON p.id_producto  = l.id_producto
+            LEFT JOIN precios pr ON pr.id_producto = l.id_producto
+            GROUP BY p.nombre
+        ), resumen AS (
+            SELECT
+                (SELECT COALESCE(SUM(ingresos), 0) FROM por_producto) AS ventas_netas,
+                (SELECT n FROM ({_conteo()}) c)                       AS cantidad_ventas
+        )
+        SELECT json_build_object(
+            'resumen', (
+                SELECT json_build_object(
+                    'ventas_netas', ventas_netas,
+                    'cantidad_ventas', cantidad_ventas,
+                    'ticket_promedio', CASE WHEN cantidad_ventas = 0 THEN 0.0 ELSE ventas_netas / cantidad_ventas END
+                ) FROM resumen
+            ),
+            'top_cantidad', (
+                SELECT COALESCE(json_agg(json_build_object('nombre', nombre, 'total_cantidad', cantidad) ORDER BY cantidad DESC, nombre), '[]')
+                FROM (SELECT nombre, cantidad FROM por_producto ORDER BY cantidad DESC, nombre LIMIT %(limite)s) t
+            ),
+            'top_ingresos', (
+                SELECT COALESCE(json_agg(json_build_object('nombre', nombre, 'total_ingresos', ingresos) ORDER BY ingresos DESC, nombre), '[]')
+                FROM (
+                    SELECT nombre, COALESCE(ingresos, 0) AS ingresos FROM por_producto
+                    WHERE con_precio ORDER BY 2 DESC, nombre LIMIT %(limite)s
+                ) t
+            ),
+            'top_utilidad', (
+                SELECT COALESCE(json_agg(json_build_object('nombre', nombre, 'utilidad_total', utilidad) ORDER BY utilidad DESC, nombre), '[]')
+                FROM (SELECT nombre, COALESCE(utilidad, 0) AS utilidad FROM por_producto WHERE con_precio) t
+            )
+        ) AS bundle;
+    """
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute(sql, {"desde": start_date, "hasta": end_date, "limite": limit})
+        return cur.fetchone()[0]
 
 
 def fetch_top_quantity(start_date: date, end_date: date) -> List[Dict[str, int]]:
     """Devuelve los 5 productos con mayor cantidad vendida en el rango de fechas indicado."""
-    sql = """
+    sql = f"""
         SELECT
             p.nombre,
-            SUM(vp.cantidad)::INT AS total_cantidad
-        FROM ventas_producto vp
-        JOIN ventas v ON vp.id_venta = v.id_venta
-        JOIN productos p ON vp.id_producto = p.id_producto
-        WHERE v.fecha BETWEEN %s AND %s
+            SUM(l.unidades)::INT AS total_cantidad
+        FROM ({_lineas()}) l
+        JOIN productos p ON l.id_producto = p.id_producto
         GROUP BY p.nombre
-        ORDER BY total_cantidad DESC
+        ORDER BY total_cantidad DESC, p.nombre
         LIMIT 5;
     """
     with get_conn() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(sql, (start_date, end_date))
+        cur.execute(sql, {"desde": start_date, "hasta": end_date})
         return cur.fetchall()
 
 
 def fetch_top_revenue(start_date: date, end_date: date) -> List[Dict[str, float]]:
     """Devuelve los 5 productos que generaron mayores ingresos netos en el rango de fechas indicado."""
-    sql = """
+    sql = f"""
         SELECT
             p.nombre,
-            COALESCE(SUM(vp.cantidad * pr.precio_neto), 0) AS total_ingresos
-        FROM ventas_producto vp
-        JOIN ventas v ON vp.id_venta = v.id_venta
-        JOIN precios pr ON vp.id_producto = pr.id_producto
-        JOIN productos p ON vp.id_producto = p.id_producto
-        WHERE v.fecha BETWEEN %s AND %s
+            COALESCE(SUM(l.unidades * pr.precio_neto), 0) AS total_ingresos
+        FROM ({_lineas()}) l
+        JOIN precios pr ON l.id_producto = pr.id_producto
+        JOIN productos p ON l.id_producto = p.id_producto
         GROUP BY p.nombre
-        ORDER BY total_ingresos DESC
+        ORDER BY total_ingresos DESC, p.nombre
         LIMIT 5;
     """
     with get_conn() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(sql, (start_date, end_date))
+        cur.execute(sql, {"desde": start_date, "hasta": end_date})
         return cur.fetchall()
 
 
 def fetch_top_profit(start_date: date, end_date: date) -> List[Dict[str, float]]:
     """Devuelve los productos ordenados por utilidad neta total (cantidad * utilidad_neta) en el rango de fechas indicado."""
-    sql = """
+    sql = f"""
         SELECT
             p.nombre,
-            COALESCE(SUM(vp.cantidad * pr.utilidad_neta), 0) AS utilidad_total
-        FROM ventas_producto vp
-        JOIN ventas v ON vp.id_venta = v.id_venta
-        JOIN productos p ON vp.id_producto = p.id_producto
+            COALESCE(SUM(l.unidades * pr.utilidad_neta), 0) AS utilidad_total
+        FROM ({_lineas()}) l
+        JOIN productos p ON l.id_producto = p.id_producto
         JOIN precios pr ON p.id_producto = pr.id_producto
-        WHERE v.fecha BETWEEN %s AND %s
         GROUP BY p.nombre
-        ORDER BY utilidad_total DESC;
+        ORDER BY utilidad_total DESC, p.nombre;
     """
     with get_conn() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(sql, (start_date, end_date))
+        cur.execute(sql, {"desde": start_date, "hasta": end_date})
         return cur.fetchall()
@@ -0,0 +1,173 @@
+"""Resumen diario de ventas mantenido incrementalmente (capa *Repository*).
+
+Tablas (migración ``0003``):
+
+- ``ventas_diarias``: cantidad de ventas por día.
+- ``ventas_diarias_producto``: por día y producto, unidades vendidas, monto
+  cobrado (``monto_producto``) y cantidad de ventas que lo incluyen.
+
+Los reportes valorizan las unidades con la lista de precios **actual**
+(``precios.precio_neto`` / ``utilidad_neta``), así que el resumen guarda
+unidades y los ingresos/utilidad se obtienen multiplicando por el precio
+vigente al consultar: un cambio de precio no invalida el resumen.
+
+`ventas_repo` llama a :func:`sumar_ventas` / :func:`restar_ventas` dentro de
+la misma transacción que inserta o elimina ventas. Para reparar desvíos
+(p. ej. cambios hechos a mano en la BD)::
+
+    python -m repository.rollup check   [--desde AAAA-MM-DD] [--hasta AAAA-MM-DD]
+    python -m repository.rollup rebuild [--desde AAAA-MM-DD] [--hasta AAAA-MM-DD]
+"""
+
+from __future__ import annotations
+
+import argparse
+from typing import Any, Sequence
+
+from psycopg2.extensions import cursor
+from psycopg2.extras import RealDictCursor
+
+from repository.db import get_conn
+
+_AJUSTE_SQL = """
+    WITH dia AS (
+        INSERT INTO ventas_diarias AS r (fecha, cantidad_ventas)
+        SELECT fecha, %(signo)s * COUNT(*)
+        FROM ventas
+        WHERE id_venta = ANY(%(ids)s::int[]) AND fecha IS NOT NULL
+        GROUP BY fecha
+        ON CONFLICT (fecha) DO UPDATE SET cantidad_ventas = r.cantidad_ventas + EXCLUDED.cantidad_ventas
+    )
+    INSERT INTO ventas_diarias_producto AS r (fecha, id_producto, unidades, monto, ventas)
+    SELECT
+        v.fecha,
+        vp.id_producto,
+        %(signo)s * COALESCE(SUM(vp.cantidad), 0),
+        %(signo)s * COALESCE(SUM(vp.monto_producto), 0),
+        %(signo)s * COUNT(DISTINCT v.id_venta)
+    FROM ventas v
+    JOIN ventas_producto vp ON vp.id_venta = v.id_venta
+    WHERE v.id_venta = ANY(%(ids)s::int[]) AND v.fecha IS NOT NULL AND vp.id_producto IS NOT NULL
+    GROUP BY v.fecha, vp.id_producto
+    ON CONFLICT (fecha, id_producto) DO UPDATE SET
+        unidades = r.unidades + EXCLUDED.unidades,
+        monto    = r.monto    + EXCLUDED.monto,
+        ventas   = r.ventas   + EXCLUDED.ventas
+"""
+
+# Agregados "de verdad" calculados desde las tablas crudas
+_CRUDO_DIA_SQL = """
+    SELECT fecha, COUNT(*) AS cantidad_ventas
+    FROM ventas
+    WHERE fecha IS NOT NULL AND fecha BETWEEN %(desde)s AND %(hasta)s
+    GROUP BY fecha
+"""
+_CRUDO_PRODUCTO_SQL = """
+    SELECT v.fecha, vp.id_producto,
+           COALESCE(SUM(vp.cantidad), 0) AS unidades,
+           COALESCE(SUM(vp.monto_producto), 0) AS monto,
+           COUNT(DISTINCT v.id_venta) AS ventas
+    FROM ventas v
+    JOIN ventas_producto vp ON vp.id_venta = v.id_venta
+    WHERE v.fecha IS NOT NULL AND vp.id_producto IS NOT NULL AND v.fecha BETWEEN %(desde)s AND %(hasta)s
+    GROUP BY v.fecha, vp.id_producto
+"""
+
+_MIN_FECHA = "-infinity"
+_MAX_FECHA = "infinity"
+
+
+# -------------------------------------------------------------------------
+# Mantenimiento incremental (dentro de la transacción del llamador)
+# -------------------------------------------------------------------------
+def sumar_ventas(cur: cursor, ids: Sequence[int]) -> None:
+    """Suma al resumen las ventas *ids* (ya insertadas con su detalle)."""
+    cur.execute(_AJUSTE_SQL, {"ids": list(ids), "signo": 1})
+
+
+def restar_ventas(cur: cursor, ids: Sequence[int]) -> None:
+    """Resta del resumen las ventas *ids*; llamar **antes** de borrarlas."""
+    cur.execute(_AJUSTE_SQL, {"ids": list(ids), "signo": -1})
+
+
+# -------------------------------------------------------------------------
+# Reconstrucción y verificación
+# -------------------------------------------------------------------------
+def reconstruir(desde: str | None = None, hasta: str | None = None) -> None:
+    """Recalcula el resumen del rango desde las tablas crudas.
+
+    Bloquea las escrituras sobre ``ventas`` mientras dura (``SHARE MODE``),
+    así ninguna venta concurrente queda fuera o contada dos veces.
+    """
+    params = {"desde": desde or _MIN_FECHA, "hasta": hasta or _MAX_FECHA}
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("LOCK TABLE ventas, ventas_producto IN SHARE MODE")
+        cur.execute("DELETE FROM ventas_diarias WHERE fecha BETWEEN %(desde)s AND %(hasta)s", params)
+        cur.execute("DELETE FROM ventas_diarias_producto WHERE fecha BETWEEN %(desde)s AND %(hasta)s", params)
+        cur.execute("INSERT INTO ventas_diarias (fecha, cantidad_ventas) " + _CRUDO_DIA_SQL, params)
+        cur.execute("INSERT INTO ventas_diarias_producto (fecha, id_producto, unidades, monto, ventas) " + _CRUDO_PRODUCTO_SQL, params)
+
+
+def verificar(desde: str | None = None, hasta: str | None = None) -> list[dict[str, Any]]:
+    """Compara el resumen con las tablas crudas en el rango indicado.
+
+    Returns:
+        Lista de diferencias; cada una con ``fecha``, ``id_producto``
+        (``None`` para el conteo diario) y los pares ``esperado`` / ``resumen``.
+        Las filas del resumen en cero se consideran equivalentes a ausentes.
+    """
+    params = {"desde": desde or _MIN_FECHA, "hasta": hasta or _MAX_FECHA}
+    sql = f"""
+        WITH crudo_dia AS ({_CRUDO_DIA_SQL}),
+        crudo_prod AS ({_CRUDO_PRODUCTO_SQL}),
+        r_dia AS (
+            SELECT fecha, cantidad_ventas FROM ventas_diarias
+            WHERE fecha BETWEEN %(desde)s AND %(hasta)s AND cantidad_ventas <> 0
+        ),
+        r_prod AS (
+            SELECT fecha, id_producto, unidades, monto, ventas FROM ventas_diarias_producto
+            WHERE fecha BETWEEN %(desde)s AND %(hasta)s AND (unidades <> 0 OR monto <> 0 OR ventas <> 0)
+        )
+        SELECT COALESCE(c.fecha, r.fecha) AS fecha, NULL::int AS id_producto,
+               json_build_object('cantidad_ventas', c.cantidad_ventas) AS esperado,
+               json_build_object('cantidad_ventas', r.cantidad_ventas) AS resumen
+        FROM crudo_dia c FULL JOIN r_dia r ON r.fecha = c.fecha
+        WHERE c.cantidad_ventas IS DISTINCT FROM r.cantidad_ventas
+        UNION ALL
+        SELECT COALESCE(c.fecha, r.fecha), COALESCE(c.id_producto, r.id_producto),
+               json_build_object('unidades', c.unidades, 'monto', c.monto, 'ventas', c.ventas),
+               json_build_object('unidades', r.unidades, 'monto', r.monto, 'ventas', r.ventas)
+        FROM crudo_prod c FULL JOIN r_prod r ON r.fecha = c.fecha AND r.id_producto = c.id_producto
+        WHERE (c.unidades, c.monto, c.ventas) IS DISTINCT FROM (r.unidades, r.monto, r.ventas)
+        ORDER BY 1, 2
+    """
+    with get_conn() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(sql, params)
+        return [dict(r) for r in cur.fetchall()]
+
+
+# -------------------------------------------------------------------------
+# CLI
+# -------------------------------------------------------------------------
+def main(argv: Sequence[str] | None = None) -> int:
+    """Punto de entrada de ``python -m repository.rollup``; devuelve el código de salida."""
+    parser = argparse.ArgumentParser(prog="python -m repository.rollup", description="Resumen diario de ventas")
+    parser.add_argument("cmd", choices=["check", "rebuild"])
+    parser.add_argument("--desde", default=None, help="Fecha inicial AAAA-MM-DD")
+    parser.add_argument("--hasta", default=None, help="Fecha final AAAA-MM-DD")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "rebuild":
+        reconstruir(args.desde, args.hasta)
+        print("Resumen reconstruido")
+        return 0
+
+    diferencias = verificar(args.desde, args.hasta)
+    for d in diferencias:
+        print(f"{d['fecha']} producto={d['id_producto']} esperado={d['esperado']} resumen={d['resumen']}")
+    print(f"{len(diferencias)} diferencias")
+    return 1 if diferencias else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,251 @@
+"""Lectura por bloques con cursores del lado del servidor y exportación en streaming.
+
+Las exportaciones de tablas grandes no cargan el resultado completo en
+memoria:
+
+- **Excel**: un cursor con nombre (``DECLARE … CURSOR``) entrega las filas
+  en bloques de ``chunk_size`` y se escriben con el modo ``constant_memory``
+  de *xlsxwriter*, que vuelca cada fila a disco al pasar a la siguiente.
+- **CSV**: ``COPY (…) TO STDOUT`` copia el resultado directo al archivo, sin
+  crear objetos Python por fila.
+- **Parquet**: cada bloque del cursor se escribe como un *row group* con
+  *pyarrow* (dependencia opcional, se importa al usarla).
+
+En sentido inverso, :func:`copiar_filas` carga un iterable de filas con
+``COPY … FROM STDIN`` sin materializarlo: las filas se serializan a CSV a
+medida que PostgreSQL pide datos.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import itertools
+from decimal import Decimal
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Sequence
+
+from psycopg2 import sql as pgsql
+from psycopg2.extensions import cursor
+
+from repository.db import get_conn
+
+#: Filas pedidas al servidor por viaje.
+CHUNK_SIZE = 2000
+
+#: Firma de los callbacks de progreso: ``(filas_escritas, total)``.
+Progreso = Callable[[int, int], None]
+
+_nombres = itertools.count(1)
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+# OID de tipos PostgreSQL → nombre del tipo pyarrow; el resto se exporta como texto
+_TIPOS_ARROW = {
+    16: "bool_",  # boolean
+    20: "int64",  # bigint
+    21: "int64",  # smallint
+    23: "int64",  # integer
+    700: "float64",  # real
+    701: "float64",  # double precision
+    1700: "float64",  # numeric
+    1082: "date32",  # date
+}
+
+
+def contar(sql: str, params: Sequence[Any] | dict[str, Any] = ()) -> int:
+    """Cantidad de filas que devolvería *sql*."""
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute(f"SELECT COUNT(*) FROM ({sql}) t", params)
+        return cur.fetchone()[0]
+
+
+def iter_chunks(sql: str, params: Sequence[Any] | dict[str, Any] = (), *, chunk_size: int = CHUNK_SIZE) -> Iterator[list[tuple]]:
+    """Recorre el resultado de *sql* en bloques mediante un cursor del servidor.
+
+    La conexión queda tomada del pool hasta agotar (o cerrar) el iterador.
+
+    Yields:
+        Listas de hasta *chunk_size* tuplas.
+    """
+    with get_conn() as conn, conn.cursor(name=f"stream_{next(_nombres)}") as cur:
+        cur.itersize = chunk_size
+        cur.execute(sql, params)
+        while True:
+            filas = cur.fetchmany(chunk_size)
+            if not filas:
+                return
+            yield filas
+
+
+def exportar_xlsx(
+    path: str,
+    encabezados: Sequence[str],
+    sql: str,
+    params: Sequence[Any] | dict[str, Any] = (),
+    *,
+    hoja: str = "Sheet1",
+    progreso: Progreso | None = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> int:
+    """Escribe el resultado de *sql* en un ``.xlsx`` con memoria constante.
+
+    Args:
+        path: Archivo de destino.
+        encabezados: Títulos de la primera fila, uno por columna de *sql*.
+        sql: Consulta cuyas filas se exportan, en el orden que devuelva.
+        params: Parámetros de *sql*.
+        hoja: Nombre de la hoja.
+        progreso: Se llama tras cada bloque con ``(filas_escritas, total)``;
+            si se indica, se hace antes un ``COUNT(*)`` para conocer el total.
+        chunk_size: Filas por bloque leído del servidor.
+
+    Returns:
+        Cantidad de filas de datos escritas.
+    """
+    import xlsxwriter  # diferido: solo lo necesita la exportación
+
+    total = contar(sql, params) if progreso else 0
+    wb = xlsxwriter.Workbook(path, {"constant_memory": True, "default_date_format": "yyyy-mm-dd"})
+    try:
+        ws = wb.add_worksheet(hoja)
+        ws.write_row(0, 0, encabezados)
+        fila = 0
+        for bloque in iter_chunks(sql, params, chunk_size=chunk_size):
+            for registro in bloque:
+                fila += 1
+                ws.write_row(fila, 0, registro)
+            if progreso:
+                progreso(fila, max(total, fila))
+    finally:
+        wb.close()
+    return fila
+
+
+def exportar_csv(path: str, sql: str, params: Sequence[Any] | dict[str, Any] = ()) -> int:
+    """Copia el resultado de *sql* a un CSV (con encabezado) vía ``COPY … TO STDOUT``.
+
+    Los datos pasan del servidor al archivo en bloques sin convertirse en
+    tuplas Python; los nombres de columna de *sql* forman el encabezado.
+
+    Returns:
+        Cantidad de filas copiadas.
+    """
+    with get_conn() as conn, conn.cursor() as cur:
+        consulta = cur.mogrify(sql, params).decode()
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            cur.copy_expert(f"COPY ({consulta}) TO STDOUT WITH (FORMAT csv, HEADER true)", f)
+        return cur.rowcount
+
+
+def _schema_arrow(description) -> "pa.Schema":
+    """Arma el esquema pyarrow desde ``cursor.description``."""
+    import pyarrow as pa
+
+    return pa.schema([(col.name, getattr(pa, _TIPOS_ARROW.get(col.type_code, "string"))()) for col in description])
+
+
+def exportar_parquet(
+    path: str,
+    sql: str,
+    params: Sequence[Any] | dict[str, Any] = (),
+    *,
+    progreso: Progreso | None = None,
+    chunk_size: int = 50_000,
+) -> int:
+    """Escribe el resultado de *sql* en Parquet, un *row group* por bloque leído.
+
+    El esquema sale de los tipos de las columnas de *sql* (enteros, reales,
+    ``numeric`` como ``float64``, fechas y booleanos; lo demás como texto).
+
+    Args:
+        path: Archivo de destino.
+        sql: Consulta cuyas filas se exportan.
+        params: Parámetros de *sql*.
+        progreso: Callback ``(filas_escritas, total)`` tras cada *row group*.
+        chunk_size: Filas por bloque / *row group*.
+
+    Returns:
+        Cantidad de filas escritas.
+
+    Raises:
+        ImportError: Si *pyarrow* no está instalado.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    total = contar(sql, params) if progreso else 0
+    escritas = 0
+    with get_conn() as conn, conn.cursor(name=f"stream_{next(_nombres)}") as cur:
+        cur.itersize = chunk_size
+        cur.execute(sql, params)
+        bloque = cur.fetchmany(chunk_size)
+        schema = _schema_arrow(cur.description)
+        with pq.ParquetWriter(path, schema) as writer:
+            while bloque:
+                columnas = [pa.array([_a_arrow(v) for v in col], type=campo.type) for col, campo in zip(zip(*bloque), schema)]
+                writer.write_table(pa.Table.from_arrays(columnas, schema=schema))
+                escritas += len(bloque)
+                if progreso:
+                    progreso(escritas, max(total, escritas))
+                bloque = cur.fetchmany(chunk_size)
+    return escritas
+
+
+def _a_arrow(valor: Any) -> Any:
+    """Convierte ``Decimal`` a ``float`` (``numeric`` se exporta como ``float64``)."""
+    return float(valor) if isinstance(valor, Decimal) else valor
+
+
+class _FilasCSV(io.TextIOBase):
+    """Archivo de solo lectura que serializa un iterable de filas a CSV bajo demanda."""
+
+    def __init__(self, filas: Iterable[Sequence[Any]]) -> None:
+        self._filas = iter(filas)
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator="\n")
+        self._pendiente = ""
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int | None = -1) -> str:
+        """Devuelve hasta *size* caracteres (todo lo que quede si es negativo)."""
+        limite = size if size is not None and size >= 0 else float("inf")
+        while len(self._pendiente) < limite:
+            lote = list(itertools.islice(self._filas, 500))
+            if not lote:
+                break
+            self._writer.writerows(lote)
+            self._pendiente += self._buffer.getvalue()
+            self._buffer.seek(0)
+            self._buffer.truncate()
+        if limite == float("inf"):
+            datos, self._pendiente = self._pendiente, ""
+        else:
+            datos, self._pendiente = self._pendiente[: int(limite)], self._pendiente[int(limite) :]
+        return datos
+
+    readline = read
+
+
+def copiar_filas(cur: cursor, tabla: str, columnas: Sequence[str], filas: Iterable[Sequence[Any]]) -> int:
+    """Carga *filas* en *tabla* con ``COPY … FROM STDIN`` (dentro de la transacción de *cur*).
+
+    ``None`` y las cadenas vacías se cargan como ``NULL``.
+
+    Args:
+        cur: Cursor cuya transacción recibe los datos.
+        tabla: Tabla destino (p. ej. una tabla temporal de *staging*).
+        columnas: Columnas destino, en el orden de cada fila.
+        filas: Iterable de filas; se consume una sola vez y en orden.
+
+    Returns:
+        Cantidad de filas cargadas.
+    """
+    copy = pgsql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(
+        pgsql.Identifier(tabla),
+        pgsql.SQL(", ").join(map(pgsql.Identifier, columnas)),
+    )
+    cur.copy_expert(copy, _FilasCSV(filas))
+    return cur.rowcount
@@ -3,18 +3,51 @@
 from __future__ import annotations
 
 import os
-from typing import Any, Dict, Sequence
+from datetime import date
+from typing import Any, Collection, Dict, Iterable, Sequence
 
-import pandas as pd
+from psycopg2.extensions import cursor
 
+from repository import rollup, streaming
 from repository.db import get_conn
+from repository.streaming import Progreso
+
+
+class StockInsuficiente(Exception):
+    """Una o más líneas de la venta superan el stock disponible en la BD.
+
+    Attributes:
+        faltantes: Lista de dicts con ``id_producto``, ``nombre``,
+            ``solicitado`` y ``disponible`` por cada producto sin stock.
+    """
+
+    def __init__(self, faltantes: list[dict[str, Any]]) -> None:
+        """Guarda el detalle de faltantes y arma un mensaje legible."""
+        self.faltantes = faltantes
+        detalle = ", ".join(f"{f['nombre'] or f['id_producto']} (pedido {f['solicitado']}, hay {f['disponible']})" for f in faltantes)
+        super().__init__(f"Stock insuficiente: {detalle}")
+
+
+#: Canal de ``NOTIFY`` por el que la migración 0008 avisa cada venta
+#: registrada, modificada o eliminada (payload: fecha ``YYYY-MM-DD``).
+CANAL_VENTAS = "ventas"
 
 
 # -------------------------------------------------------------------------
 # CRUD
 # -------------------------------------------------------------------------
 def insertar_venta(venta: Dict[str, Any], items: Sequence[Dict[str, Any]]) -> int:
-    """Inserta cabecera y detalle de una venta.
+    """Inserta cabecera y detalle de una venta y descuenta el stock.
+
+    Todo ocurre en una única transacción con un número fijo de sentencias,
+    sin importar cuántas líneas tenga la venta:
+
+    1. Bloquea las filas de ``productos`` involucradas **ordenadas por id**
+       (``FOR UPDATE``), de modo que terminales concurrentes no se bloqueen
+       mutuamente, y verifica el stock real.
+    2. Inserta la cabecera y el detalle (vía ``unnest``).
+    3. Descuenta el stock con un único ``UPDATE`` por conjunto y suma la venta al
+       resumen diario (`repository.rollup`).
 
     Args:
         venta: Dict con fecha, forma_pago, monto_total, total_productos.
@@ -22,8 +55,16 @@ def insertar_venta(venta: Dict[str, Any], items: Sequence[Dict[str, Any]]) -> in
 
     Returns:
         id_venta generado.
+
+    Raises:
+        StockInsuficiente: Si algún producto no alcanza; no se escribe nada.
     """
+    ids = [it["id_producto"] for it in items]
+    cantidades = [it["cantidad"] for it in items]
+    montos = [it["monto_producto"] for it in items]
+
     with get_conn() as conn, conn.cursor() as cur:
+        _reservar_stock(cur, ids, cantidades)
         cur.execute(
             """
             INSERT INTO ventas (fecha, forma_pago, monto_total, total_productos)
@@ -33,55 +74,329 @@ def insertar_venta(venta: Dict[str, Any], items: Sequence[Dict[str, Any]]) -> in
             venta,
         )
         id_venta: int = cur.fetchone()[0]
-        detalle = [(id_venta, it["id_producto"], it["cantidad"], it["monto_producto"]) for it in items]
-        cur.executemany(
+        cur.execute(
             """
             INSERT INTO ventas_producto
             (id_venta, id_producto, cantidad, monto_producto)
-            VALUES (%s, %s, %s, %s)
+            SELECT %s, d.id_producto, d.cantidad, d.monto_producto
+            FROM unnest(%s::int[], %s::int[], %s::numeric[]) AS d(id_producto, cantidad, monto_producto)
             """,
-            detalle,
+            (id_venta, ids, cantidades, montos),
         )
+        _descontar_stock(cur, ids, cantidades)
+        rollup.sumar_ventas(cur, [id_venta])
         return id_venta
 
 
-def eliminar_venta(id_venta: int) -> None:
-    """Elimina una venta y restaura el stock de sus productos."""
+def _reservar_stock(cur: cursor, ids: list[int], cantidades: list[int]) -> None:
+    """Bloquea en orden de id las filas de *ids* y verifica que alcance el stock.
+
+    Raises:
+        StockInsuficiente: Con el detalle por producto si algo no alcanza.
+    """
+    pedido: dict[int, int] = {}
+    for id_prod, cant in zip(ids, cantidades):
+        pedido[id_prod] = pedido.get(id_prod, 0) + cant
+
+    cur.execute(
+        """
+        SELECT id_producto, nombre, COALESCE(stock, 0)
+        FROM productos
+        WHERE id_producto = ANY(%s::int[])
+        ORDER BY id_producto
+        FOR UPDATE
+        """,
+        (list(pedido),),
+    )
+    disponibles = {r[0]: (r[1], r[2]) for r in cur.fetchall()}
+
+    faltantes = []
+    for id_prod in sorted(pedido):
+        nombre, stock = disponibles.get(id_prod, (None, 0))
+        if pedido[id_prod] > stock:
+            faltantes.append({"id_producto": id_prod, "nombre": nombre, "solicitado": pedido[id_prod], "disponible": stock})
+    if faltantes:
+        raise StockInsuficiente(faltantes)
+
+
+def _descontar_stock(cur: cursor, ids: list[int], cantidades: list[int]) -> None:
+    """Resta en un solo ``UPDATE`` las cantidades agregadas por producto."""
+    cur.execute(
+        """
+        UPDATE productos p
+        SET stock = p.stock - d.cantidad
+        FROM (
+            SELECT id_producto, SUM(cantidad) AS cantidad
+            FROM unnest(%s::int[], %s::int[]) AS t(id_producto, cantidad)
+            GROUP BY id_producto
+        ) d
+        WHERE p.id_producto = d.id_producto
+        """,
+        (ids, cantidades),
+    )
+
+
+def eliminar_venta(id_venta: int) -> list[date]:
+    """Elimina una venta y restaura el stock de sus productos.
+
+    Returns:
+        ``[fecha]`` de la venta eliminada, o lista vacía si no existía.
+    """
+    return eliminar_ventas([id_venta])
+
+
+def eliminar_ventas(ids: Sequence[int] | None = None, *, rango: tuple[str, str] | None = None) -> list[date]:
+    """Anula muchas ventas a la vez y restaura el stock en una sola pasada.
+
+    Usa un número fijo de sentencias sin importar cuántas ventas o líneas
+    se borren: bloquea los productos afectados en orden de id (igual que
+    `insertar_venta`, para no generar *deadlocks*), descuenta las ventas del
+    resumen diario y luego borra detalle y cabeceras mientras suma las
+    cantidades agregadas por producto.
+
+    Args:
+        ids: IDs de venta a eliminar.
+        rango: Tupla ``(desde, hasta)`` en formato *YYYY-MM-DD*; se eliminan
+            las ventas cuya fecha cae en el rango. Se combina con *ids* (AND)
+            si se indican ambos.
+
+    Returns:
+        Fecha de cada venta eliminada (una por venta, sin orden garantizado);
+        su largo es la cantidad eliminada.
+
+    Raises:
+        ValueError: Si no se indica ni *ids* ni *rango*.
+    """
+    if ids is None and rango is None:
+        raise ValueError("Indique ids o rango de fechas")
+
+    conds: list[str] = []
+    params: list[Any] = []
+    if ids is not None:
+        conds.append("id_venta = ANY(%s::int[])")
+        params.append(list(ids))
+    if rango is not None:
+        conds.append("fecha BETWEEN %s AND %s")
+        params.extend(rango)
+
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute(f"SELECT id_venta FROM ventas WHERE {' AND '.join(conds)} FOR UPDATE", params)
+        borrar = [r[0] for r in cur.fetchall()]
+        if not borrar:
+            return []
+
+        cur.execute(
+            """
+            SELECT 1 FROM productos
+            WHERE id_producto IN (SELECT id_producto FROM ventas_producto WHERE id_venta = ANY(%s::int[]))
+            ORDER BY id_producto
+            FOR UPDATE
+            """,
+            (borrar,),
+        )
+        rollup.restar_ventas(cur, borrar)
+        cur.execute(
+            """
+            WITH lineas AS (
+                DELETE FROM ventas_producto
+                WHERE id_venta = ANY(%(ids)s::int[])
+                RETURNING id_producto, cantidad
+            ), repuesto AS (
+                UPDATE productos p
+                SET stock = p.stock + d.cantidad
+                FROM (SELECT id_producto, SUM(cantidad) AS cantidad FROM lineas GROUP BY id_producto) d
+                WHERE p.id_producto = d.id_producto
+            )
+            DELETE FROM ventas WHERE id_venta = ANY(%(ids)s::int[])
+            RETURNING fecha
+            """,
+            {"ids": borrar},
+        )
+        return [r[0] for r in cur.fetchall()]
+
+
+# -------------------------------------------------------------------------
+# Importación masiva
+# -------------------------------------------------------------------------
+_IMPORT_COLUMNAS = ["fila", "clave", "fecha", "forma_pago", "producto", "cantidad", "monto"]
+
+
+def importar_lote(
+    lineas: Iterable[Sequence[Any]],
+    *,
+    excluir: Collection[str] = (),
+    descontar_stock: bool = False,
+) -> dict[str, Any]:
+    """Importa ventas históricas en bloque (una transacción, sentencias fijas).
+
+    1. Carga *lineas* con ``COPY`` en una tabla temporal.
+    2. Descarta las ventas con productos inexistentes (por ``nombre``) o
+       cuya clave esté en *excluir*, informando cada fila.
+    3. Reserva en una sola consulta un ``id_venta`` por venta desde
+       ``ventas_id_seq`` (en el orden del archivo).
+    4. Inserta cabeceras y detalle por conjunto; los montos faltantes se
+       calculan con el precio vigente más IVA, como en el ingreso manual.
+    5. Opcionalmente descuenta el stock (sin validar disponibilidad: son
+       ventas ya ocurridas) y suma las ventas al resumen diario.
+
+    Args:
+        lineas: ``(fila, clave, fecha, forma_pago, producto, cantidad, monto)``
+            por línea; ``clave`` agrupa las líneas de una misma venta, que
+            toma ``fecha`` / ``forma_pago`` de su primera fila. ``monto`` puede
+            ser ``None``. Se consumen en streaming.
+        excluir: Claves de venta a descartar; se consulta **después** de
+            consumir *lineas*, así el llamador puede completarla mientras
+            valida.
+        descontar_stock: Si es ``True`` resta las cantidades del stock.
+
+    Returns:
+        Dict con ``ventas`` y ``lineas`` insertadas, ``fechas`` (distintas)
+        de las ventas insertadas y ``errores``: ``{"fila", "clave", "error"}``
+        por cada línea descartada.
+    """
     with get_conn() as conn, conn.cursor() as cur:
         cur.execute(
-            "SELECT id_producto, cantidad FROM ventas_producto WHERE id_venta = %s",
-            (id_venta,),
+            """
+            CREATE TEMP TABLE import_lineas (
+                fila       integer,
+                clave      text    NOT NULL,
+                fecha      date    NOT NULL,
+                forma_pago text,
+                producto   text    NOT NULL,
+                cantidad   integer NOT NULL,
+                monto      numeric
+            ) ON COMMIT DROP
+            """
         )
-        for id_prod, cant in cur.fetchall():
+        streaming.copiar_filas(cur, "import_lineas", _IMPORT_COLUMNAS, lineas)
+
+        cur.execute(
+            """
+            WITH desconocidas AS (
+                SELECT DISTINCT l.clave
+                FROM import_lineas l
+                WHERE NOT EXISTS (SELECT 1 FROM productos p WHERE p.nombre = l.producto)
+                   OR l.clave = ANY(%s::text[])
+            )
+            DELETE FROM import_lineas l
+            USING desconocidas d
+            WHERE l.clave = d.clave
+            RETURNING l.fila, l.clave, l.producto, EXISTS (SELECT 1 FROM productos p WHERE p.nombre = l.producto)
+            """,
+            (list(excluir),),
+        )
+        errores = [
+            {
+                "fila": fila,
+                "clave": clave,
+                "error": "venta descartada por errores en otras filas" if conocido else f"producto desconocido: {producto!r}",
+            }
+            for fila, clave, producto, conocido in cur.fetchall()
+        ]
+        errores.sort(key=lambda e: e["fila"])
+
+        # Un id por venta, tomado de la secuencia en orden de aparición
+        cur.execute(
+            """
+            CREATE TEMP TABLE import_ventas ON COMMIT DROP AS
+            SELECT clave, nextval('ventas_id_seq')::int AS id_venta, fecha, forma_pago
+            FROM (
+                SELECT DISTINCT ON (clave) clave, fecha, forma_pago, fila
+                FROM import_lineas
+                ORDER BY clave, fila
+            ) primera
+            ORDER BY fila
+            """
+        )
+        # IVA 19 % sobre el precio vigente, igual que VentasService.preparar_items_venta
+        cur.execute(
+            """
+            CREATE TEMP TABLE import_detalle ON COMMIT DROP AS
+            SELECT v.id_venta, p.id_producto, l.cantidad,
+                   COALESCE(l.monto, round(COALESCE(pr.precio_neto, 0) * 1.19 * l.cantidad)) AS monto
+            FROM import_lineas l
+            JOIN import_ventas v ON v.clave   = l.clave
+            JOIN productos p     ON p.nombre  = l.producto
+            LEFT JOIN precios pr ON pr.id_producto = p.id_producto
+            """
+        )
+        cur.execute(
+            """
+            INSERT INTO ventas (id_venta, fecha, forma_pago, monto_total, total_productos)
+            SELECT v.id_venta, v.fecha, v.forma_pago, t.monto, t.cantidad
+            FROM import_ventas v
+            JOIN (
+                SELECT id_venta, SUM(monto) AS monto, SUM(cantidad) AS cantidad
+                FROM import_detalle
+                GROUP BY id_venta
+            ) t ON t.id_venta = v.id_venta
+            """
+        )
+        n_ventas = cur.rowcount
+        cur.execute("INSERT INTO ventas_producto (id_venta, id_producto, cantidad, monto_producto) SELECT id_venta, id_producto, cantidad, monto FROM import_detalle")
+        n_lineas = cur.rowcount
+
+        if descontar_stock:
+            cur.execute("SELECT 1 FROM productos WHERE id_producto IN (SELECT id_producto FROM import_detalle) ORDER BY id_producto FOR UPDATE")
             cur.execute(
-                "UPDATE productos SET stock = stock + %s WHERE id_producto = %s",
-                (cant, id_prod),
+                """
+                UPDATE productos p
+                SET stock = p.stock - d.cantidad
+                FROM (SELECT id_producto, SUM(cantidad) AS cantidad FROM import_detalle GROUP BY id_producto) d
+                WHERE p.id_producto = d.id_producto
+                """
             )
-        cur.execute("DELETE FROM ventas_producto WHERE id_venta = %s", (id_venta,))
-        cur.execute("DELETE FROM ventas WHERE id_venta = %s", (id_venta,))
+
+        cur.execute("SELECT id_venta FROM import_ventas")
+        rollup.sumar_ventas(cur, [r[0] for r in cur.fetchall()])
+        cur.execute("SELECT DISTINCT fecha FROM import_ventas ORDER BY fecha")
+        fechas = [r[0] for r in cur.fetchall()]
+
+    return {"ventas": n_ventas, "lineas": n_lineas, "fechas": fechas, "errores": errores}
 
 
 # -------------------------------------------------------------------------
 # Lecturas y exportación
 # -------------------------------------------------------------------------
-def listar(rango: tuple[str, str] | None = None) -> list[dict[str, Any]]:
-    """Lista ventas opcionalmente filtradas por rango de fechas.
+def listar(
+    rango: tuple[str, str] | None = None,
+    *,
+    limite: int | None = None,
+    despues: tuple[date | str, int] | None = None,
+) -> list[dict[str, Any]]:
+    """Lista ventas de la más reciente a la más antigua (``fecha, id_venta``).
+
+    Con *limite* devuelve una página; la siguiente se pide pasando en
+    *despues* la clave ``(fecha, id)`` de la última fila recibida
+    (paginación por *keyset*: cada página es un recorrido corto del índice
+    ``idx_ventas_fecha_id``, sin ``OFFSET``).
 
     Args:
         rango: Tupla ``(desde, hasta)`` en formato *YYYY-MM-DD*.
+        limite: Tamaño de página; ``None`` devuelve todas las filas.
+        despues: Clave de la última fila de la página anterior.
 
     Returns:
         Lista de dicts con id, fecha, forma, total_prod, monto.
     """
+    condiciones: list[str] = []
+    params: list[Any] = []
+    if rango:
+        condiciones.append("fecha BETWEEN %s AND %s")
+        params.extend(rango)
+    if despues:
+        condiciones.append("(fecha, id_venta) < (%s::date, %s)")
+        params.extend(despues)
     sql = """
         SELECT id_venta, fecha, forma_pago, total_productos, monto_total
         FROM ventas
     """
-    params: tuple[Any, ...] = ()
-    if rango:
-        sql += " WHERE fecha BETWEEN %s AND %s"
-        params = rango
-    sql += " ORDER BY fecha DESC"
+    if condiciones:
+        sql += " WHERE " + " AND ".join(condiciones)
+    sql += " ORDER BY fecha DESC, id_venta DESC"
+    if limite is not None:
+        sql += " LIMIT %s"
+        params.append(limite)
 
     with get_conn() as conn, conn.cursor() as cur:
         cur.execute(sql, params)
@@ -110,14 +425,112 @@ def detalle(id_venta: int) -> list[dict[str, Any]]:
         return [{"nombre": r[0], "cantidad": r[1], "monto": r[2]} for r in cur.fetchall()]
 
 
-def exportar_excel() -> str:
-    """Exporta la tabla de ventas a *data/ventas_exportadas.xlsx*.
+# Consultas de exportación; los alias de columna son el encabezado del archivo
+_EXPORT_SQL = {
+    "ventas": """
+        SELECT id_venta AS id, fecha, forma_pago AS forma, total_productos AS total_prod, monto_total AS monto
+        FROM ventas v
+        {where}
+        ORDER BY fecha DESC, id_venta DESC
+    """,
+    "detalle": """
+        SELECT vp.id_venta, v.fecha, vp.id_producto, p.nombre, vp.cantidad, vp.monto_producto AS monto
+        FROM ventas_producto vp
+        JOIN ventas v ON v.id_venta = vp.id_venta
+        LEFT JOIN productos p ON p.id_producto = vp.id_producto
+        {where}
+        ORDER BY v.fecha DESC, vp.id_venta DESC, vp.id_producto
+    """,
+}
+_EXPORT_NOMBRE = {"ventas": "ventas_exportadas", "detalle": "ventas_detalle_exportado"}
+
+
+def _consulta_export(tabla: str, rango: tuple[str, str] | None) -> tuple[str, tuple[Any, ...]]:
+    """SQL y parámetros para exportar *tabla* (``"ventas"`` o ``"detalle"``)."""
+    if tabla not in _EXPORT_SQL:
+        raise ValueError(f"Tabla de exportación desconocida: {tabla!r}")
+    if rango:
+        return _EXPORT_SQL[tabla].format(where="WHERE v.fecha BETWEEN %s AND %s"), tuple(rango)
+    return _EXPORT_SQL[tabla].format(where=""), ()
+
+
+def _ruta_export(path: str | None, tabla: str, ext: str) -> str:
+    """Ruta absoluta de destino; por defecto en *data/*."""
+    if path is None:
+        os.makedirs("data", exist_ok=True)
+        path = f"data/{_EXPORT_NOMBRE[tabla]}.{ext}"
+    return os.path.abspath(path)
+
+
+def exportar_excel(
+    path: str | None = None,
+    *,
+    rango: tuple[str, str] | None = None,
+    progreso: Progreso | None = None,
+) -> str:
+    """Exporta la tabla de ventas a Excel en streaming (memoria constante).
+
+    Las filas se leen del servidor por bloques y se escriben a medida que
+    llegan, así que el uso de memoria no depende de la cantidad de ventas.
+
+    Args:
+        path: Archivo de destino; por defecto *data/ventas_exportadas.xlsx*.
+        rango: Tupla ``(desde, hasta)`` en formato *YYYY-MM-DD*.
+        progreso: Callback ``(filas_escritas, total)`` llamado tras cada bloque.
+
+    Returns:
+        Ruta absoluta del archivo generado.
+    """
+    sql, params = _consulta_export("ventas", rango)
+    path = _ruta_export(path, "ventas", "xlsx")
+    streaming.exportar_xlsx(path, ["id", "fecha", "forma", "total_prod", "monto"], sql, params, progreso=progreso)
+    return path
+
+
+def exportar_csv(path: str | None = None, *, tabla: str = "ventas", rango: tuple[str, str] | None = None) -> str:
+    """Exporta ventas o su detalle a CSV con ``COPY … TO STDOUT``.
+
+    Args:
+        path: Archivo de destino; por defecto *data/ventas_exportadas.csv*
+            o *data/ventas_detalle_exportado.csv*.
+        tabla: ``"ventas"`` (cabeceras) o ``"detalle"`` (``ventas_producto``).
+        rango: Tupla ``(desde, hasta)`` en formato *YYYY-MM-DD*.
 
     Returns:
         Ruta absoluta del archivo generado.
+
+    Raises:
+        ValueError: Si *tabla* no es válida.
+    """
+    sql, params = _consulta_export(tabla, rango)
+    path = _ruta_export(path, tabla, "csv")
+    streaming.exportar_csv(path, sql, params)
+    return path
+
+
+def exportar_parquet(
+    path: str | None = None,
+    *,
+    tabla: str = "ventas",
+    rango: tuple[str, str] | None = None,
+    progreso: Progreso | None = None,
+) -> str:
+    """Exporta ventas o su detalle a Parquet (un *row group* por bloque leído).
+
+    Args:
+        path: Archivo de destino; por defecto en *data/* con extensión ``.parquet``.
+        tabla: ``"ventas"`` (cabeceras) o ``"detalle"`` (``ventas_producto``).
+        rango: Tupla ``(desde, hasta)`` en formato *YYYY-MM-DD*.
+        progreso: Callback ``(filas_escritas, total)``.
+
+    Returns:
+        Ruta absoluta del archivo generado.
+
+    Raises:
+        ValueError: Si *tabla* no es válida.
+        ImportError: Si *pyarrow* no está instalado.
     """
-    df = pd.DataFrame(listar())
-    os.makedirs("data", exist_ok=True)
-    path = os.path.abspath("data/ventas_exportadas.xlsx")
-    df.to_excel(path, index=False)
+    sql, params = _consulta_export(tabla, rango)
+    path = _ruta_export(path, tabla, "parquet")
+    streaming.exportar_parquet(path, sql, params, progreso=progreso)
     return path
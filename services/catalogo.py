@@ -0,0 +1,228 @@
+"""Catálogo de productos en memoria, compartido por todo el proceso.
+
+Guarda id, código de barras, nombre, precio y stock de cada producto en
+registros con ``__slots__``, indexados por id y por código, así el modo
+escáner, el inventario y el armado de ventas no consultan la BD.
+
+Cómo se mantiene al día:
+
+- :meth:`Catalogo.escuchar` abre un ``LISTEN`` (`repository.eventos.Escucha`)
+  en ``producto_repo.CANAL_PRODUCTOS``. Triggers sobre ``productos`` y
+  ``precios`` avisan cada cambio, de esta u otra terminal, y el catálogo
+  relee solo esos productos. En cada (re)conexión se recarga completo. Si
+  cambió algún precio se invalida `services.report_cache`.
+- Sin escucha, :meth:`Catalogo.refrescar` trae los productos cuya marca
+  ``modificado`` cambió desde el refresco anterior, releyendo ``margen``
+  segundos para tolerar transacciones que confirman tarde; las bajas hechas
+  en otras terminales se ven en la recarga completa que ocurre cada
+  ``recarga`` segundos.
+
+:attr:`Catalogo.al_dia` indica si la escucha está activa: solo entonces
+los servicios leen del catálogo en lugar de la BD.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timedelta
+from operator import attrgetter
+from typing import Any, Iterable, Mapping
+
+from repository import producto_repo
+from repository.eventos import Escucha
+from services import report_cache
+
+#: Productos avisados juntos a partir de los cuales conviene recargar todo.
+LOTE_MAXIMO = 1000
+
+
+class ProductoCache:
+    """Producto tal como lo guarda el catálogo (``precio`` ``None`` si no tiene)."""
+
+    __slots__ = ("id", "codigo", "nombre", "precio", "stock")
+
+    def __init__(self, id: int, codigo: str | None, nombre: str, precio: int | None, stock: int) -> None:  # noqa: A002
+        """Crea el registro."""
+        self.id = id
+        self.codigo = codigo
+        self.nombre = nombre
+        self.precio = precio
+        self.stock = stock
+
+    def como_dict(self) -> dict[str, Any]:
+        """Devuelve el producto con el formato de `producto_repo.listar`."""
+        return {"id": self.id, "nombre": self.nombre, "precio": self.precio, "stock": self.stock, "codigo": self.codigo}
+
+
+class Catalogo:
+    """Productos en memoria, seguro entre hilos.
+
+    Args:
+        margen: Segundos que cada refresco incremental relee hacia atrás.
+        recarga: Segundos entre recargas completas de :meth:`refrescar`.
+    """
+
+    def __init__(self, margen: float = 30.0, recarga: float = 600.0) -> None:
+        """Crea un catálogo vacío (se carga en el primer :meth:`refrescar`)."""
+        self.margen = timedelta(seconds=margen)
+        self.recarga = recarga
+        self._por_id: dict[int, ProductoCache] = {}
+        self._por_codigo: dict[str, ProductoCache] = {}
+        self._lock = threading.Lock()
+        self._marca: datetime | None = None
+        self._ultima_carga = 0.0
+        self._version = 0
+        self._escucha: Escucha | None = None
+
+    # ------------------------------------------------------------ Lectura
+    def por_codigo(self, codigo: str) -> ProductoCache | None:
+        """Devuelve el producto con *codigo* (sin espacios extremos) o ``None``."""
+        return self._por_codigo.get(codigo.strip())
+
+    def producto(self, id_prod: int) -> ProductoCache | None:
+        """Devuelve el producto *id_prod* o ``None``."""
+        return self._por_id.get(id_prod)
+
+    def productos(self) -> list[ProductoCache]:
+        """Copia de todos los productos, ordenados por id."""
+        with self._lock:
+            registros = list(self._por_id.values())
+        return sorted(registros, key=attrgetter("id"))
+
+    def precios(self, ids: Iterable[int]) -> dict[int, int]:
+        """Precios netos (0 si no tiene) de los *ids* conocidos; vacío si no está :attr:`al_dia`."""
+        if not self.al_dia:
+            return {}
+        return {i: r.precio or 0 for i in ids if (r := self._por_id.get(i)) is not None}
+
+    @property
+    def cargado(self) -> bool:
+        """Indica si ya hubo una carga (las escrituras locales solo refrescan entonces)."""
+        return self._marca is not None
+
+    @property
+    def al_dia(self) -> bool:
+        """Indica si la escucha de cambios está activa (y la carga hecha)."""
+        return self._escucha is not None and self._escucha.conectado
+
+    @property
+    def version(self) -> int:
+        """Contador que aumenta con cada cambio aplicado (para detectar si hay novedades)."""
+        return self._version
+
+    def __len__(self) -> int:
+        """Cantidad de productos en memoria."""
+        return len(self._por_id)
+
+    # ------------------------------------------------------------ Actualización
+    def refrescar(self, *, completo: bool = False) -> int:
+        """Trae de la BD los cambios desde el refresco anterior.
+
+        Args:
+            completo: Fuerza una recarga completa (también ocurre la primera
+                vez y cada ``recarga`` segundos).
+
+        Returns:
+            Cantidad de productos leídos.
+        """
+        completo = completo or self._marca is None or time.monotonic() - self._ultima_carga > self.recarga
+        desde = None if completo else self._marca - self.margen  # type: ignore[operator]
+        filas, marca = producto_repo.productos_modificados(desde)
+        with self._lock:
+            if completo:
+                self._por_id, self._por_codigo = {}, {}
+                self._ultima_carga = time.monotonic()
+            for fila in filas:
+                self._poner(*fila)
+            self._marca = marca
+            self._version += 1
+        return len(filas)
+
+    def actualizar(self, ids: Iterable[int]) -> None:
+        """Relee de la BD los productos *ids*; los que ya no existen se quitan."""
+        ids = set(ids)
+        filas = producto_repo.productos_por_id(ids)
+        with self._lock:
+            for id_prod in ids - {f[0] for f in filas}:
+                self._quitar(id_prod)
+            for fila in filas:
+                self._poner(*fila)
+            self._version += 1
+
+    def descontar(self, cantidades: Mapping[int, int]) -> None:
+        """Resta del stock en memoria lo vendido por esta terminal (``{id: cantidad}``).
+
+        Con la escucha activa no hace nada: el aviso de la BD trae el stock real.
+        """
+        if self.al_dia:
+            return
+        with self._lock:
+            for id_prod, cantidad in cantidades.items():
+                registro = self._por_id.get(id_prod)
+                if registro is not None:
+                    registro.stock -= cantidad
+            self._version += 1
+
+    def quitar(self, id_prod: int) -> None:
+        """Saca un producto del catálogo (p. ej. tras eliminarlo)."""
+        with self._lock:
+            self._quitar(id_prod)
+            self._version += 1
+
+    def clear(self) -> None:
+        """Vacía el catálogo; el próximo :meth:`refrescar` recarga todo."""
+        with self._lock:
+            self._por_id, self._por_codigo = {}, {}
+            self._marca = None
+            self._version += 1
+
+    # ------------------------------------------------------------ Escucha
+    def escuchar(self) -> None:
+        """Carga el catálogo y lo mantiene al día con ``LISTEN/NOTIFY`` (en segundo plano)."""
+        if self._escucha is None:
+            self._escucha = Escucha(
+                producto_repo.CANAL_PRODUCTOS,
+                self._on_lote,
+                on_conectado=lambda: self.refrescar(completo=True),
+            )
+        self._escucha.iniciar()
+
+    def detener(self) -> None:
+        """Detiene la escucha; el catálogo conserva lo cargado."""
+        if self._escucha is not None:
+            self._escucha.detener(timeout=2.0)
+            self._escucha = None
+
+    def _on_lote(self, payloads: set[str]) -> None:
+        ids = {int(p) for p in payloads if p.isdigit()}
+        if len(ids) > LOTE_MAXIMO:
+            self.refrescar(completo=True)  # p. ej. una importación masiva
+            report_cache.invalidar()
+        elif ids:
+            antes = self._precios_de(ids)
+            self.actualizar(ids)
+            # Los reportes valorizan con el precio vigente; los cambios de stock no los tocan
+            if self._precios_de(ids) != antes:
+                report_cache.invalidar()
+
+    # ------------------------------------------------------------ internos
+    def _precios_de(self, ids: Iterable[int]) -> dict[int, int | None]:
+        return {i: r.precio if (r := self._por_id.get(i)) else None for i in ids}
+
+    def _poner(self, id_prod: int, codigo: str | None, nombre: str, precio: int | None, stock: int) -> None:
+        self._quitar(id_prod)
+        registro = ProductoCache(id_prod, codigo, nombre, precio, stock)
+        self._por_id[id_prod] = registro
+        if codigo:
+            self._por_codigo[codigo] = registro
+
+    def _quitar(self, id_prod: int) -> None:
+        registro = self._por_id.pop(id_prod, None)
+        # El código pudo pasar a otro producto en el mismo lote
+        if registro is not None and registro.codigo and self._por_codigo.get(registro.codigo) is registro:
+            del self._por_codigo[registro.codigo]
+
+
+#: Catálogo compartido por todo el proceso.
+catalogo = Catalogo()
@@ -0,0 +1,143 @@
+"""Lectura en streaming de archivos CSV / XLSX para importaciones masivas.
+
+Cada fila se entrega como ``(número de fila, {columna: valor})`` con los
+encabezados normalizados (minúsculas, sin espacios extremos). El número de
+fila es el del archivo (la fila 1 es el encabezado), para que los reportes
+de errores apunten a la línea que el usuario ve en su planilla.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+from datetime import date, datetime
+from typing import Any, Iterable, Iterator, Sequence
+
+from utils.validation_utils import is_int, is_valid_date
+
+#: Extensiones soportadas por :func:`leer_filas`.
+EXTENSIONES = (".csv", ".xlsx")
+
+
+class ArchivoInvalido(ValueError):
+    """El archivo no se puede importar (formato o encabezados inválidos)."""
+
+
+def a_entero(valor: Any, minimo: int = 0) -> int | None:
+    """Convierte *valor* a ``int`` ≥ *minimo* o devuelve ``None`` si no es válido.
+
+    Usa la regla de `utils.validation_utils.is_int` y además rechaza celdas
+    vacías y números con decimales (``10.5``), que ``int()`` truncaría.
+    """
+    if valor is None or (isinstance(valor, str) and not valor.strip()) or not is_int(valor):
+        return None
+    if isinstance(valor, float) and not valor.is_integer():
+        return None
+    n = int(valor)
+    return n if n >= minimo else None
+
+
+def a_fecha(valor: Any) -> str | None:
+    """Devuelve la fecha como *YYYY-MM-DD* (celdas fecha de Excel o texto) o ``None``."""
+    if isinstance(valor, datetime):
+        return valor.date().isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    texto = str(valor or "").strip()
+    return texto if is_valid_date(texto) else None
+
+
+def _normalizar(encabezados: Iterable[Any]) -> list[str]:
+    return [str(h or "").strip().lower() for h in encabezados]
+
+
+def leer_filas(path: str, requeridas: Iterable[str]) -> Iterator[tuple[int, dict[str, Any]]]:
+    """Recorre las filas de datos de un CSV o XLSX sin cargarlo completo.
+
+    El encabezado se valida al llamar; las filas se leen al iterar.
+
+    Args:
+        path: Archivo ``.csv`` (UTF-8, separador ``,`` o ``;``) o ``.xlsx``
+            (primera hoja).
+        requeridas: Columnas que deben estar en el encabezado.
+
+    Returns:
+        Iterador de ``(fila, valores)``; las filas completamente vacías se omiten.
+
+    Raises:
+        ArchivoInvalido: Si la extensión no es soportada o faltan columnas.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in EXTENSIONES:
+        raise ArchivoInvalido(f"Formato no soportado: {ext or path!r} (usar {', '.join(EXTENSIONES)})")
+    filas = _filas_csv(path) if ext == ".csv" else _filas_xlsx(path)
+    try:
+        encabezados = _normalizar(next(filas))
+    except StopIteration:
+        raise ArchivoInvalido("El archivo está vacío") from None
+    faltan = [c for c in requeridas if c not in encabezados]
+    if faltan:
+        filas.close()
+        raise ArchivoInvalido(f"Faltan columnas: {', '.join(faltan)}")
+    return _datos(encabezados, filas)
+
+
+def _datos(encabezados: list[str], filas: Iterator[Any]) -> Iterator[tuple[int, dict[str, Any]]]:
+    for n, fila in enumerate(filas, start=2):
+        if all(v is None or str(v).strip() == "" for v in fila):
+            continue
+        yield n, dict(zip(encabezados, fila))
+
+
+def _filas_csv(path: str) -> Iterator[list[str]]:
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        muestra = f.read(4096)
+        f.seek(0)
+        try:
+            dialecto: Any = csv.Sniffer().sniff(muestra, delimiters=",;")
+        except csv.Error:
+            dialecto = csv.excel
+        yield from csv.reader(f, dialecto)
+
+
+def _filas_xlsx(path: str) -> Iterator[tuple[Any, ...]]:
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from wb.worksheets[0].iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+# -------------------------------------------------------------------------
+# CLI
+# -------------------------------------------------------------------------
+def main(argv: Sequence[str] | None = None) -> int:
+    """Punto de entrada de ``python -m services.importacion``; devuelve el código de salida."""
+    parser = argparse.ArgumentParser(prog="python -m services.importacion", description="Importación masiva desde CSV / XLSX")
+    parser.add_argument("tipo", choices=["productos", "ventas"])
+    parser.add_argument("archivo")
+    parser.add_argument("--descontar-stock", action="store_true", help="(ventas) Resta las cantidades del stock")
+    args = parser.parse_args(argv)
+
+    # Import diferido: los servicios dependen de este módulo
+    if args.tipo == "ventas":
+        from services.ventas_service import VentasService
+
+        res = VentasService().importar_ventas(args.archivo, descontar_stock=args.descontar_stock)
+        print(f"{res['ventas']} ventas ({res['lineas']} líneas) importadas")
+    else:
+        from services.producto_service import ProductoService
+
+        res = ProductoService().importar(args.archivo)
+        print(f"{res['insertados']} productos nuevos, {res['actualizados']} actualizados")
+    for e in res["errores"]:
+        print(f"fila {e['fila']}: {e['error']}")
+    print(f"{len(res['errores'])} errores")
+    return 1 if res["errores"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,7 +2,54 @@
 
 from __future__ import annotations
 
+from typing import Any, Iterator
+
 from repository import producto_repo
+from repository.streaming import Progreso
+from services import report_cache
+from services.catalogo import catalogo
+from services.importacion import a_entero, leer_filas
+
+
+def validar_filas_productos(filas: Iterator[tuple[int, dict[str, Any]]], errores: list[dict[str, Any]]) -> Iterator[tuple[str, int, int]]:
+    """Filtra las filas válidas de una importación de productos.
+
+    Reglas: ``nombre`` no vacío y no repetido en el archivo; ``precio`` y
+    ``stock`` enteros no negativos (ver `services.importacion.a_entero`).
+
+    Args:
+        filas: ``(fila, valores)`` como las entrega `services.importacion.leer_filas`.
+        errores: Lista donde se agregan ``{"fila", "nombre", "error"}`` por
+            cada fila descartada.
+
+    Yields:
+        ``(nombre, precio, stock)`` de las filas válidas.
+    """
+    vistos: dict[str, int] = {}
+    for n, valores in filas:
+        nombre = str(valores.get("nombre") or "").strip()
+        problemas = []
+        if not nombre:
+            problemas.append("nombre vacío")
+        elif nombre in vistos:
+            problemas.append(f"nombre repetido (fila {vistos[nombre]})")
+        precio = a_entero(valores.get("precio"))
+        if precio is None:
+            problemas.append(f"precio inválido: {valores.get('precio')!r}")
+        stock = a_entero(valores.get("stock"))
+        if stock is None:
+            problemas.append(f"stock inválido: {valores.get('stock')!r}")
+        if problemas:
+            errores.append({"fila": n, "nombre": nombre, "error": "; ".join(problemas)})
+            continue
+        vistos[nombre] = n
+        yield nombre, precio, stock  # type: ignore[misc]
+
+
+def _normalizar_codigo(codigo: str | None) -> str | None:
+    """Quita espacios extremos; un código vacío equivale a no tenerlo."""
+    codigo = (codigo or "").strip()
+    return codigo or None
 
 
 class ProductoService:
@@ -16,31 +63,119 @@ class ProductoService:
     def listar(self, *, stock_bajo: bool = False, sin_precio: bool = False) -> list[dict[str, int | str]]:
         """Devuelve productos según filtros.
 
+        Con el catálogo en memoria al día (ver `services.catalogo`) no se
+        consulta la BD.
+
         Args:
-            stock_bajo: Solo productos con stock ≤ 30.
+            stock_bajo: Solo productos con stock ≤ ``producto_repo.STOCK_BAJO``.
             sin_precio: Solo productos sin precio asignado.
 
         Returns:
-            Lista de diccionarios con ``id``, ``nombre``, ``precio`` y ``stock``.
+            Lista de diccionarios con ``id``, ``nombre``, ``precio`` (``None``
+            si no tiene), ``stock`` y ``codigo``.
+        """
+        if not catalogo.al_dia:
+            return self.repo.listar(stock_bajo=stock_bajo, sin_precio=sin_precio)
+        productos = catalogo.productos()
+        if stock_bajo:
+            productos = [p for p in productos if p.stock <= self.repo.STOCK_BAJO]
+        elif sin_precio:
+            productos = [p for p in productos if p.precio is None]
+        return [p.como_dict() for p in productos]
+
+    def buscar(self, texto: str, *, limite: int = 50, offset: int = 0) -> list[dict[str, Any]]:
+        """Busca productos por nombre, los más relevantes primero (ver `producto_repo.buscar`).
+
+        Args:
+            texto: Texto a buscar (prefijo, parte del nombre o con errores de tipeo).
+            limite: Tamaño de página.
+            offset: Resultados a saltar.
         """
-        return self.repo.listar(stock_bajo=stock_bajo, sin_precio=sin_precio)
+        return self.repo.buscar(texto, limite=limite, offset=offset)
+
+    def alta(self, nombre: str, precio: int, stock: int, codigo: str | None = None) -> None:
+        """Crea un producto nuevo, opcionalmente con código de barras.
 
-    def alta(self, nombre: str, precio: int, stock: int) -> None:
-        """Crea un producto nuevo."""
-        self.repo.crear(nombre, precio, stock)
+        Raises:
+            repository.producto_repo.CodigoDuplicado: Si el código ya existe.
+        """
+        codigo = _normalizar_codigo(codigo)
+        self.repo.crear(nombre, precio, stock, codigo)
+        if catalogo.cargado:
+            catalogo.refrescar()
 
     def baja(self, id_prod: int) -> None:
         """Elimina un producto por ID (cascada borra el precio)."""
         self.repo.eliminar(id_prod)
+        catalogo.quitar(id_prod)
 
-    def modificar(self, id_prod: int, precio: int, stock: int) -> None:
-        """Actualiza precio y stock de un producto existente."""
-        self.repo.actualizar(id_prod, precio, stock)
+    def asignar_codigo(self, id_prod: int, codigo: str | None) -> None:
+        """Asigna el código de barras / SKU de un producto (vacío lo quita).
 
-    def exportar_excel(self) -> str:
-        """Genera un archivo Excel con el inventario.
+        Raises:
+            repository.producto_repo.CodigoDuplicado: Si otro producto lo usa.
+        """
+        self.repo.asignar_codigo(id_prod, _normalizar_codigo(codigo))
+        if catalogo.cargado:
+            catalogo.actualizar([id_prod])
+
+    def modificar(self, id_prod: int, precio: int, stock: int, codigo: str | None = producto_repo.SIN_CAMBIO) -> None:
+        """Actualiza precio, stock y, si se indica, el código (vacío lo quita), todo o nada.
+
+        Los reportes valorizan con el precio vigente, así que se invalida
+        toda la caché de reportes.
+
+        Raises:
+            repository.producto_repo.CodigoDuplicado: Si otro producto usa
+                *codigo*; en ese caso tampoco cambian precio ni stock.
+        """
+        if codigo is not producto_repo.SIN_CAMBIO:
+            codigo = _normalizar_codigo(codigo)
+        self.repo.actualizar(id_prod, precio, stock, codigo)
+        report_cache.invalidar()
+        if catalogo.cargado:
+            catalogo.actualizar([id_prod])
+
+    def importar(self, path: str) -> dict[str, Any]:
+        """Importa productos en bloque desde un CSV o XLSX.
+
+        El archivo debe tener las columnas ``nombre``, ``precio`` y ``stock``
+        (otras se ignoran, así un inventario exportado puede reimportarse).
+        Los productos existentes (mismo nombre) actualizan precio y stock;
+        los nuevos se crean. Las filas inválidas no se cargan y se informan.
+
+        Returns:
+            Dict con ``insertados``, ``actualizados`` y ``errores`` (lista de
+            ``{"fila", "nombre", "error"}``).
+
+        Raises:
+            services.importacion.ArchivoInvalido: Formato o encabezados inválidos.
+        """
+        errores: list[dict[str, Any]] = []
+        validas = validar_filas_productos(leer_filas(path, ("nombre", "precio", "stock")), errores)
+        resultado = self.repo.importar_lote(validas)
+        if resultado["insertados"] or resultado["actualizados"]:
+            report_cache.invalidar()
+            if catalogo.cargado:
+                catalogo.refrescar()
+        return {**resultado, "errores": errores}
+
+    def exportar_excel(self, path: str | None = None, *, progreso: Progreso | None = None) -> str:
+        """Genera un archivo Excel con el inventario (en streaming).
+
+        Args:
+            path: Archivo de destino; por defecto el del repositorio.
+            progreso: Callback ``(filas_escritas, total)``.
 
         Returns:
             Ruta absoluta del archivo creado.
         """
-        return self.repo.exportar_excel()
+        return self.repo.exportar_excel(path, progreso=progreso)
+
+    def exportar_csv(self, path: str | None = None) -> str:
+        """Genera un CSV con el inventario vía ``COPY`` y devuelve su ruta."""
+        return self.repo.exportar_csv(path)
+
+    def exportar_parquet(self, path: str | None = None, *, progreso: Progreso | None = None) -> str:
+        """Genera un Parquet con el inventario (requiere *pyarrow*) y devuelve su ruta."""
+        return self.repo.exportar_parquet(path, progreso=progreso)
@@ -0,0 +1,177 @@
+"""Caché LRU de resultados de reportes con invalidación por escrituras.
+
+Cada entrada se identifica por ``(tipo de reporte, desde, hasta, extra)``.
+Las escrituras avisan qué fechas tocaron:
+
+- `VentasService.crear_venta` / ``eliminar_venta*`` → :func:`invalidar` con
+  las fechas de las ventas afectadas: solo caen los rangos que las incluyen.
+- Cambios de precio (`ProductoService.modificar`) → :func:`invalidar` sin
+  fechas: los reportes valorizan con la lista de precios vigente, así que
+  cae todo.
+
+Las escrituras de otras terminales llegan por ``LISTEN/NOTIFY``:
+:func:`escuchar` recibe las fechas de las ventas que tocan (migración
+0008) y `services.catalogo` avisa los cambios de precio.
+
+Los rangos cerrados (``hasta`` anterior a hoy) no caducan por tiempo: solo
+los descarta una invalidación. Los que incluyen hoy o fechas futuras
+caducan a los ``ttl_abierto`` segundos. Quien use la caché sin
+:func:`escuchar` puede darles a los cerrados un ``ttl_cerrado``.
+"""
+
+from __future__ import annotations
+
+import copy
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import date
+from typing import Any, Callable, Hashable, Iterable, TypeVar
+
+from repository.eventos import Escucha
+from repository.ventas_repo import CANAL_VENTAS
+
+T = TypeVar("T")
+
+
+def _as_date(value: date | str) -> date:
+    """Acepta ``date`` o cadena *YYYY-MM-DD*."""
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+class _Entry:
+    __slots__ = ("valor", "desde", "hasta", "expira")
+
+    def __init__(self, valor: Any, desde: date, hasta: date, expira: float | None) -> None:
+        self.valor = valor
+        self.desde = desde
+        self.hasta = hasta
+        self.expira = expira
+
+
+class ReportCache:
+    """Caché LRU acotada y segura entre hilos para resultados de reportes.
+
+    Args:
+        maxsize: Entradas máximas; se descarta la usada hace más tiempo.
+        ttl_abierto: Segundos de vida de rangos que incluyen hoy o el futuro.
+        ttl_cerrado: Segundos de vida de rangos cerrados; ``None`` (por
+            defecto) no caducan. Pensado para usar la caché sin escucha.
+    """
+
+    def __init__(self, maxsize: int = 128, ttl_abierto: float = 60.0, ttl_cerrado: float | None = None) -> None:
+        """Crea una caché vacía."""
+        self.maxsize = maxsize
+        self.ttl_abierto = ttl_abierto
+        self.ttl_cerrado = ttl_cerrado
+        self._data: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = 0
+        # (versión, desde, hasta) de las últimas invalidaciones; None = todo
+        self._eventos: deque[tuple[int, date | None, date | None]] = deque(maxlen=256)
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------ internos
+    def _toca(self, version: int, desde: date, hasta: date) -> bool:
+        """Indica si alguna invalidación posterior a *version* afecta el rango."""
+        if self._eventos and self._eventos[0][0] > version + 1:
+            return True  # el historial ya no cubre desde *version*: asumir que sí
+        return any(v > version and (d is None or (d <= hasta and h >= desde)) for v, d, h in self._eventos)  # type: ignore[operator]
+
+    # ------------------------------------------------------------ API
+    def get_or_compute(self, tipo: str, desde: date | str, hasta: date | str, compute: Callable[[], T], *extra: Hashable) -> T:
+        """Devuelve el resultado cacheado o lo calcula con *compute* y lo guarda.
+
+        Si mientras se calculaba hubo una invalidación que toca el rango, el
+        resultado se devuelve pero no se guarda.
+        """
+        d, h = _as_date(desde), _as_date(hasta)
+        key = (tipo, d, h, *extra)
+        ahora = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and (entry.expira is None or entry.expira > ahora):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry.valor)
+            self.misses += 1
+            version = self._version
+
+        valor = compute()
+
+        with self._lock:
+            if not self._toca(version, d, h):
+                ttl = self.ttl_cerrado if h < date.today() else self.ttl_abierto
+                expira = None if ttl is None else time.monotonic() + ttl
+                self._data[key] = _Entry(copy.deepcopy(valor), d, h, expira)
+                self._data.move_to_end(key)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+        return valor
+
+    def invalidar(self, fechas: Iterable[date | str] | None = None) -> None:
+        """Descarta los rangos que contienen alguna de *fechas* (o todos si es ``None``)."""
+        with self._lock:
+            if fechas is None:
+                self._version += 1
+                self._eventos.append((self._version, None, None))
+                self._data.clear()
+                return
+            for f in {_as_date(f) for f in fechas}:
+                self._version += 1
+                self._eventos.append((self._version, f, f))
+                for key in [k for k, e in self._data.items() if e.desde <= f <= e.hasta]:
+                    del self._data[key]
+
+    def clear(self) -> None:
+        """Vacía la caché sin registrar invalidaciones."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        """Cantidad de entradas vigentes o vencidas aún no descartadas."""
+        return len(self._data)
+
+
+#: Caché compartida por `report_service`.
+cache = ReportCache()
+
+
+_escucha: Escucha | None = None
+
+
+def invalidar(fechas: Iterable[date | str] | None = None) -> None:
+    """Invalida la caché global (ver :meth:`ReportCache.invalidar`)."""
+    cache.invalidar(fechas)
+
+
+def escuchar() -> None:
+    """Invalida la caché global con las ventas de otras terminales (en segundo plano).
+
+    En cada (re)conexión se descarta todo, por los avisos perdidos mientras
+    no hubo escucha.
+    """
+    global _escucha
+    if _escucha is None:
+        _escucha = Escucha(CANAL_VENTAS, _on_lote, on_conectado=cache.invalidar)
+    _escucha.iniciar()
+
+
+def detener() -> None:
+    """Detiene la escucha de ventas."""
+    global _escucha
+    if _escucha is not None:
+        _escucha.detener(timeout=2.0)
+        _escucha = None
+
+
+def _on_lote(payloads: set[str]) -> None:
+    fechas = []
+    for p in payloads:
+        try:
+            fechas.append(date.fromisoformat(p))
+        except ValueError:
+            continue
+    if fechas:
+        cache.invalidar(fechas)
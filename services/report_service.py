@@ -1,20 +1,25 @@
-"""Proporciona utilidades de generación y exportación de informes para la aplicación."""
+"""Proporciona utilidades de generación y exportación de informes para la aplicación.
+
+Los resultados de ``get_*_report`` se guardan en `services.report_cache`
+y se invalidan cuando se registran o eliminan ventas o cambian precios.
+
+*pandas* y *reportlab* se importan recién al exportar: cargarlos al
+arrancar la aplicación cuesta más que todo el resto de la interfaz.
+"""
 
 import os
 from datetime import date, timedelta
 
-import pandas as pd
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import landscape, letter
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
-
 from repository.report_repository import (
+    fetch_period_summaries,
+    fetch_report_bundle,
+    fetch_sales_series,
     fetch_summary,
     fetch_top_profit,
     fetch_top_quantity,
     fetch_top_revenue,
 )
+from services.report_cache import cache
 
 
 class ExportError(Exception):
@@ -23,10 +28,8 @@ class ExportError(Exception):
     pass
 
 
-def get_summary_report(start_date: date, end_date: date) -> dict:
-    """Obtiene los totales de venta, cantidad de ventas y ticket promedio para el rango de fechas indicado."""
-    raw = fetch_summary(start_date, end_date)
-    # Redondear y convertir a entero
+def _round_summary(raw: dict) -> dict:
+    """Redondea a entero los valores de un resumen crudo."""
     return {
         "ventas_netas": int(round(raw["ventas_netas"])),
         "cantidad_ventas": int(raw["cantidad_ventas"]),
@@ -34,30 +37,166 @@ def get_summary_report(start_date: date, end_date: date) -> dict:
     }
 
 
+def _round_items(items: list[dict], key: str) -> list[dict]:
+    """Redondea a entero la métrica *key* de cada fila de un ranking."""
+    return [{"nombre": i["nombre"], key: int(round(i[key]))} for i in items]
+
+
+def get_summary_report(start_date: date, end_date: date) -> dict:
+    """Obtiene los totales de venta, cantidad de ventas y ticket promedio para el rango de fechas indicado."""
+    # Redondear y convertir a entero
+    return cache.get_or_compute("resumen", start_date, end_date, lambda: _round_summary(fetch_summary(start_date, end_date)))
+
+
 def get_top_quantity_report(start_date: date, end_date: date) -> list[dict]:
     """Obtiene los 5 productos con mayor cantidad vendida en el rango de fechas indicado."""
-    items = fetch_top_quantity(start_date, end_date)
-    return [{"nombre": i["nombre"], "total_cantidad": int(i["total_cantidad"])} for i in items]
+    return cache.get_or_compute("top_cantidad", start_date, end_date, lambda: _round_items(fetch_top_quantity(start_date, end_date), "total_cantidad"))
 
 
 def get_top_revenue_report(start_date: date, end_date: date) -> list[dict]:
     """Obtiene los 5 productos que generaron mayores ingresos netos en el rango de fechas indicado."""
-    items = fetch_top_revenue(start_date, end_date)
     # redondear ingresos a entero
-    return [{"nombre": i["nombre"], "total_ingresos": int(round(i["total_ingresos"]))} for i in items]
+    return cache.get_or_compute("top_ingresos", start_date, end_date, lambda: _round_items(fetch_top_revenue(start_date, end_date), "total_ingresos"))
 
 
 def get_top_profit_report(start_date: date, end_date: date) -> list[dict]:
     """Obtiene los productos ordenados por utilidad neta total en el rango de fechas indicado."""
-    items = fetch_top_profit(start_date, end_date)
     # redondear utilidad a entero
-    return [{"nombre": i["nombre"], "utilidad_total": int(round(i["utilidad_total"]))} for i in items]
+    return cache.get_or_compute("top_utilidad", start_date, end_date, lambda: _round_items(fetch_top_profit(start_date, end_date), "utilidad_total"))
+
+
+def get_report_bundle(start_date: date, end_date: date) -> dict:
+    """Obtiene resumen y rankings del rango con una sola consulta.
+
+    Returns:
+        Dict con las claves ``resumen``, ``top_cantidad``, ``top_ingresos`` y
+        ``top_utilidad``, con el mismo formato que las funciones individuales.
+    """
+
+    def compute() -> dict:
+        raw = fetch_report_bundle(start_date, end_date)
+        return {
+            "resumen": _round_summary(raw["resumen"]),
+            "top_cantidad": _round_items(raw["top_cantidad"], "total_cantidad"),
+            "top_ingresos": _round_items(raw["top_ingresos"], "total_ingresos"),
+            "top_utilidad": _round_items(raw["top_utilidad"], "utilidad_total"),
+        }
+
+    return cache.get_or_compute("bundle", start_date, end_date, compute)
+
+
+def get_sales_series(start_date: date, end_date: date, bucket: str = "day") -> list[dict]:
+    """Obtiene la serie de ventas por día, semana o mes con los huecos en cero.
+
+    Args:
+        start_date: Fecha inicial (inclusive).
+        end_date: Fecha final (inclusive).
+        bucket: ``"day"``, ``"week"`` o ``"month"``.
+
+    Returns:
+        Una fila por periodo con ``periodo`` (*YYYY-MM-DD* del primer día),
+        ``ventas_netas``, ``unidades``, ``utilidad``, ``cantidad_ventas`` y
+        ``ticket_promedio`` redondeados a entero.
+
+    Raises:
+        ValueError: Si *bucket* no es una granularidad soportada.
+    """
+
+    def compute() -> list[dict]:
+        return [
+            {
+                "periodo": r["periodo"].isoformat(),
+                "ventas_netas": int(round(r["ventas_netas"])),
+                "unidades": int(r["unidades"]),
+                "utilidad": int(round(r["utilidad"])),
+                "cantidad_ventas": int(r["cantidad_ventas"]),
+                "ticket_promedio": int(round(r["ticket_promedio"])),
+            }
+            for r in fetch_sales_series(start_date, end_date, bucket)
+        ]
+
+    return cache.get_or_compute("serie", start_date, end_date, compute, bucket)
+
+
+def _variacion(actual: dict, anterior: dict) -> dict:
+    """Variación porcentual por métrica: (actual - anterior) / anterior."""
+    variacion = {}
+    for key in actual:
+        prev = anterior.get(key, 0)
+        curr = actual.get(key, 0)
+        if prev:
+            variacion[key] = (curr - prev) / prev
+        else:
+            variacion[key] = 1.0 if curr else 0.0
+    return variacion
+
+
+def get_period_summaries(periods: list[tuple[date, date]]) -> list[dict]:
+    """Obtiene el resumen redondeado de cada periodo con una sola consulta.
+
+    Args:
+        periods: Pares ``(desde, hasta)`` inclusivos.
+
+    Returns:
+        Un dict por periodo, en el mismo orden, con el formato de
+        `get_summary_report`.
+    """
+    if not periods:
+        return []
+    periods = [(d, h) for d, h in periods]
+    desde = min(d for d, _ in periods)
+    hasta = max(h for _, h in periods)
+    return cache.get_or_compute(
+        "periodos",
+        desde,
+        hasta,
+        lambda: [_round_summary(r) for r in fetch_period_summaries(periods)],
+        tuple(periods),
+    )
+
+
+def month_periods(end_date: date, months: int) -> list[tuple[date, date]]:
+    """Arma los últimos *months* meses calendario hasta *end_date*, del más antiguo al más reciente.
+
+    El último periodo va del primer día del mes de *end_date* hasta
+    *end_date* (mes en curso parcial).
+    """
+    periods = []
+    year, month = end_date.year, end_date.month
+    for _ in range(months):
+        first = date(year, month, 1)
+        nxt = date(year + month // 12, month % 12 + 1, 1)
+        periods.append((first, min(nxt - timedelta(days=1), end_date)))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return periods[::-1]
+
+
+def get_multi_period_report(periods: list[tuple[date, date]]) -> list[dict]:
+    """Obtiene un comparativo de N periodos lado a lado (p. ej. los últimos 12 meses).
+
+    Args:
+        periods: Pares ``(desde, hasta)`` del más antiguo al más reciente;
+            ver `month_periods`.
+
+    Returns:
+        Una fila por periodo con ``desde``, ``hasta``, las métricas de
+        `get_summary_report` y ``variacion`` respecto del periodo anterior
+        de la lista (vacía en el primero).
+    """
+    resumenes = get_period_summaries(periods)
+    filas = []
+    for i, ((desde, hasta), resumen) in enumerate(zip(periods, resumenes)):
+        variacion = _variacion(resumen, resumenes[i - 1]) if i else {}
+        filas.append({"desde": desde, "hasta": hasta, **resumen, "variacion": variacion})
+    return filas
 
 
 def get_comparison_report(start_date: date, end_date: date, days: int) -> dict:
     """
     Obtiene un comparativo entre el periodo actual y el periodo anterior.
 
+    Ambos periodos se resumen con una sola consulta (`get_period_summaries`).
+
     Args:
         start_date: Fecha de inicio del periodo actual.
         end_date:   Fecha de fin del periodo actual.
@@ -73,19 +212,8 @@ def get_comparison_report(start_date: date, end_date: date, days: int) -> dict:
     # Definir rango anterior: termina justo un día antes del inicio actual
     prev_end = start_date - timedelta(days=1)
     prev_start = prev_end - timedelta(days=days - 1)
-    # Resúmenes ya redondeados e formateados por get_summary_report
-    actual = get_summary_report(start_date, end_date)
-    anterior = get_summary_report(prev_start, prev_end)
-    # Calcular variaciones porcentuales
-    variacion = {}
-    for key in actual:
-        prev = anterior.get(key, 0)
-        curr = actual.get(key, 0)
-        if prev:
-            variacion[key] = (curr - prev) / prev
-        else:
-            variacion[key] = 1.0 if curr else 0.0
-    return {"actual": actual, "anterior": anterior, "variacion": variacion}
+    actual, anterior = get_period_summaries([(start_date, end_date), (prev_start, prev_end)])
+    return {"actual": actual, "anterior": anterior, "variacion": _variacion(actual, anterior)}
 
 
 def export_report(report_data: dict, format: str, destination_path: str) -> str:
@@ -93,7 +221,8 @@ def export_report(report_data: dict, format: str, destination_path: str) -> str:
     Genera un archivo (Excel o PDF) con los datos de report data.
 
     Args:
-        report_data: Diccionario con claves de pestañas y valores dict o list.
+        report_data: Diccionario con claves de pestañas y valores dict o list
+            (p. ej. ``"Serie"`` con la lista de `get_sales_series`).
         format: 'excel' o 'pdf'.
         destination_path: Ruta completa donde guardar el archivo.
 
@@ -121,6 +250,8 @@ def export_report(report_data: dict, format: str, destination_path: str) -> str:
 
 def _export_to_excel(report_data: dict, path: str):
     """H interno: escribe report data a un Excel con una hoja por sección."""
+    import pandas as pd
+
     with pd.ExcelWriter(path, engine="xlsxwriter") as writer:
         for sheet_name, data in report_data.items():
             if sheet_name == "Comparativo":
@@ -144,6 +275,11 @@ def _export_to_excel(report_data: dict, path: str):
 
 def _export_to_pdf(report_data: dict, path: str):
     """H interno: escribe report data a un PDF con tablas y títulos."""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import landscape, letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
     doc = SimpleDocTemplate(path, pagesize=landscape(letter), title="Reporte de Ventas")
     styles = getSampleStyleSheet()
     story = []
@@ -170,7 +306,8 @@ def _export_to_pdf(report_data: dict, path: str):
                 rows = [list(item.values()) for item in data]
 
         table_data = [cols] + rows
-        tbl = Table(table_data, hAlign="CENTER")
+        # repeatRows: las tablas largas (p. ej. "Serie") repiten el encabezado en cada página
+        tbl = Table(table_data, hAlign="CENTER", repeatRows=1)
         tbl.setStyle(
             TableStyle(
                 [
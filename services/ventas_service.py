@@ -3,13 +3,72 @@
 from __future__ import annotations
 
 from decimal import ROUND_HALF_UP, Decimal
-from typing import Dict, Sequence
+from typing import Any, Dict, Iterator, Sequence
 
 from repository import producto_repo, ventas_repo
+from repository.streaming import Progreso
+from repository.ventas_repo import StockInsuficiente
+from services import report_cache
+from services.catalogo import catalogo
+from services.importacion import a_entero, a_fecha, leer_filas
 
 
 class StockError(Exception):
-    """Se lanza si la cantidad solicitada supera el stock disponible."""
+    """Se lanza si la cantidad solicitada supera el stock disponible.
+
+    Attributes:
+        faltantes: Detalle por producto (``id_producto``, ``nombre``,
+            ``solicitado``, ``disponible``) cuando lo informa la BD.
+    """
+
+    def __init__(self, msg: str, faltantes: list[Dict] | None = None) -> None:
+        """Guarda el mensaje y el detalle de faltantes."""
+        super().__init__(msg)
+        self.faltantes = faltantes or []
+
+
+def validar_filas_ventas(
+    filas: Iterator[tuple[int, dict[str, Any]]],
+    errores: list[dict[str, Any]],
+    excluir: set[str],
+) -> Iterator[tuple[int, str, str, str | None, str, int, int | None]]:
+    """Filtra las líneas válidas de una importación de ventas.
+
+    Reglas: ``venta`` (clave que agrupa líneas) y ``producto`` no vacíos,
+    ``fecha`` *YYYY-MM-DD* (`utils.validation_utils.is_valid_date`),
+    ``cantidad`` entera positiva y ``monto`` (opcional) entero no negativo.
+    Una línea inválida invalida toda su venta: su clave se agrega a
+    *excluir* para que el repositorio descarte también las demás líneas.
+
+    Yields:
+        ``(fila, clave, fecha, forma_pago, producto, cantidad, monto)``.
+    """
+    for n, valores in filas:
+        clave = str(valores.get("venta") or "").strip()
+        producto = str(valores.get("producto") or "").strip()
+        fecha = a_fecha(valores.get("fecha"))
+        cantidad = a_entero(valores.get("cantidad"), minimo=1)
+        monto_crudo = valores.get("monto")
+        monto = None if monto_crudo is None or str(monto_crudo).strip() == "" else a_entero(monto_crudo)
+
+        problemas = []
+        if not clave:
+            problemas.append("venta vacía")
+        if not producto:
+            problemas.append("producto vacío")
+        if fecha is None:
+            problemas.append(f"fecha inválida: {valores.get('fecha')!r}")
+        if cantidad is None:
+            problemas.append(f"cantidad inválida: {valores.get('cantidad')!r}")
+        if monto is None and monto_crudo is not None and str(monto_crudo).strip() != "":
+            problemas.append(f"monto inválido: {monto_crudo!r}")
+        if problemas:
+            errores.append({"fila": n, "clave": clave, "error": "; ".join(problemas)})
+            if clave:
+                excluir.add(clave)
+            continue
+        forma = str(valores.get("forma_pago") or "").strip() or None
+        yield n, clave, fecha, forma, producto, cantidad, monto  # type: ignore[misc]
 
 
 class VentasService:
@@ -34,7 +93,7 @@ class VentasService:
         Raises:
             StockError: Si se intenta vender más unidades de las disponibles.
         """
-        items: list[Dict] = []
+        pedidos: list[tuple[int, Dict, int]] = []
         for id_prod, datos in cantidades.items():
             try:
                 cantidad = int(datos["var"].get())
@@ -46,8 +105,18 @@ class VentasService:
             stock_disponible = datos["stock"]
             if cantidad > stock_disponible:
                 raise StockError(f"No hay suficiente stock de {datos['nombre']}")
+            pedidos.append((id_prod, datos, cantidad))
 
-            precio_neto = self.producto_repo.obtener_precio(id_prod)
+        # Del catálogo en memoria; lo que falte, en una sola consulta (o ninguna, si está en caché)
+        ids = [id_prod for id_prod, _, _ in pedidos]
+        precios = catalogo.precios(ids)
+        faltantes = [i for i in ids if i not in precios]
+        if faltantes:
+            precios.update(self.producto_repo.obtener_precios(faltantes))
+
+        items: list[Dict] = []
+        for id_prod, datos, cantidad in pedidos:
+            precio_neto = precios.get(id_prod, 0)
             monto = int(Decimal(precio_neto * 1.19 * cantidad).quantize(0, ROUND_HALF_UP))
 
             items.append(
@@ -64,6 +133,9 @@ class VentasService:
     def crear_venta(self, *, fecha: str, forma_pago: str, items: Sequence[Dict]) -> int:
         """Create a sale record and deduct stock.
 
+        Cabecera, detalle y descuento de stock se escriben en una sola
+        transacción (ver `ventas_repo.insertar_venta`).
+
         Args:
             fecha: `YYYY-MM-DD`.
             forma_pago: cadena libre ("efectivo", "tarjeta", etc.).
@@ -71,37 +143,128 @@ class VentasService:
 
         Returns:
             id_venta generado.
+
+        Raises:
+            StockError: Si otra terminal dejó sin stock algún producto; trae
+                el detalle en ``faltantes`` y no se registra nada.
         """
         total_prod = sum(i["cantidad"] for i in items)
         total_monto = sum(i["monto_producto"] for i in items)
 
-        id_venta = ventas_repo.insertar_venta(
-            {
-                "fecha": fecha,
-                "forma_pago": forma_pago,
-                "monto_total": total_monto,
-                "total_productos": total_prod,
-            },
-            items,
-        )
-
-        for it in items:
-            self.producto_repo.descontar_stock(it["id_producto"], it["cantidad"])
-
+        try:
+            id_venta = ventas_repo.insertar_venta(
+                {
+                    "fecha": fecha,
+                    "forma_pago": forma_pago,
+                    "monto_total": total_monto,
+                    "total_productos": total_prod,
+                },
+                items,
+            )
+        except StockInsuficiente as exc:
+            raise StockError(str(exc), exc.faltantes) from exc
+        report_cache.invalidar([fecha])
+        vendidos: dict[int, int] = {}
+        for i in items:
+            vendidos[i["id_producto"]] = vendidos.get(i["id_producto"], 0) + i["cantidad"]
+        catalogo.descontar(vendidos)
         return id_venta
 
     def eliminar_venta(self, id_venta: int) -> None:
         """Elimina una venta y restaura el stock asociado."""
-        ventas_repo.eliminar_venta(id_venta)
+        fechas = ventas_repo.eliminar_venta(id_venta)
+        report_cache.invalidar(f for f in fechas if f is not None)
+        self._refrescar_catalogo()
 
-    def obtener_ventas(self, rango: tuple[str, str] | None = None):
-        """Lista ventas (opcionalmente acotadas por fechas)."""
-        return ventas_repo.listar(rango)
+    def eliminar_ventas(self, ids: Sequence[int] | None = None, *, rango: tuple[str, str] | None = None) -> int:
+        """Elimina en bloque ventas por IDs y/o rango de fechas restaurando el stock.
+
+        Returns:
+            Cantidad de ventas eliminadas.
+        """
+        fechas = ventas_repo.eliminar_ventas(ids, rango=rango)
+        report_cache.invalidar(f for f in fechas if f is not None)
+        if fechas:
+            self._refrescar_catalogo()
+        return len(fechas)
+
+    def importar_ventas(self, path: str, *, descontar_stock: bool = False) -> dict[str, Any]:
+        """Importa ventas históricas desde un CSV o XLSX (una fila por línea de venta).
+
+        Columnas: ``venta`` (clave que agrupa las líneas de una venta),
+        ``fecha``, ``producto`` (nombre) y ``cantidad``; opcionales
+        ``forma_pago`` y ``monto`` (si falta, precio vigente + IVA). Una venta
+        con alguna línea inválida o producto inexistente se descarta entera.
+
+        Args:
+            path: Archivo a importar.
+            descontar_stock: Si es ``True`` descuenta las cantidades del stock.
+
+        Returns:
+            Dict con ``ventas`` y ``lineas`` importadas y ``errores``
+            (``{"fila", "clave", "error"}``, ordenados por fila).
+
+        Raises:
+            services.importacion.ArchivoInvalido: Formato o encabezados inválidos.
+        """
+        errores: list[dict[str, Any]] = []
+        excluir: set[str] = set()
+        validas = validar_filas_ventas(leer_filas(path, ("venta", "fecha", "producto", "cantidad")), errores, excluir)
+        res = ventas_repo.importar_lote(validas, excluir=excluir, descontar_stock=descontar_stock)
+        report_cache.invalidar(res["fechas"])
+        if descontar_stock and res["ventas"]:
+            self._refrescar_catalogo()
+        errores = sorted(errores + res["errores"], key=lambda e: e["fila"])
+        return {"ventas": res["ventas"], "lineas": res["lineas"], "errores": errores}
+
+    @staticmethod
+    def _refrescar_catalogo() -> None:
+        """Trae al catálogo en memoria el stock restaurado o descontado en la BD.
+
+        Los triggers marcan ``modificado`` en cada producto tocado, así que
+        basta un refresco incremental (ver `Catalogo.refrescar`).
+        """
+        if catalogo.cargado:
+            catalogo.refrescar()
+
+    def obtener_ventas(
+        self,
+        rango: tuple[str, str] | None = None,
+        *,
+        limite: int | None = None,
+        despues: tuple[Any, int] | None = None,
+    ):
+        """Lista ventas (opcionalmente acotadas por fechas), paginadas si se indica *limite*.
+
+        Ver `ventas_repo.listar` para la paginación con *despues*.
+        """
+        return ventas_repo.listar(rango, limite=limite, despues=despues)
 
     def ver_detalle_venta(self, id_venta: int):
         """Devuelve el detalle de productos vendidos en una venta."""
         return ventas_repo.detalle(id_venta)
 
-    def exportar_ventas_excel(self) -> str:
-        """Exporta las ventas a Excel y devuelve la ruta del archivo."""
-        return ventas_repo.exportar_excel()
+    def exportar_ventas_excel(
+        self,
+        path: str | None = None,
+        *,
+        rango: tuple[str, str] | None = None,
+        progreso: Progreso | None = None,
+    ) -> str:
+        """Exporta las ventas (opcionalmente acotadas por fechas) a Excel y devuelve la ruta del archivo."""
+        return ventas_repo.exportar_excel(path, rango=rango, progreso=progreso)
+
+    def exportar_ventas_csv(self, path: str | None = None, *, tabla: str = "ventas", rango: tuple[str, str] | None = None) -> str:
+        """Exporta ventas (``tabla="ventas"``) o su detalle (``"detalle"``) a CSV vía ``COPY``."""
+        return ventas_repo.exportar_csv(path, tabla=tabla, rango=rango)
+
+    def exportar_ventas_parquet(
+        self,
+        path: str | None = None,
+        *,
+        tabla: str = "ventas",
+        rango: tuple[str, str] | None = None,
+        progreso: Progreso | None = None,
+    ) -> str:
+        """Exporta ventas o su detalle a Parquet (requiere *pyarrow*)."""
+        return ventas_repo.exportar_parquet(path, tabla=tabla, rango=rango, progreso=progreso)
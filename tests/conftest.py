@@ -5,6 +5,9 @@ import os
 import pytest
 
 import repository.db as db_mod
+from repository import migrations, producto_repo
+from services import report_cache
+from services.catalogo import catalogo
 
 pytest_plugins = ["pytest_postgresql"]
 
@@ -17,17 +20,20 @@ def postgres_db(postgresql):
     reinicia el pool y carga el esquema.
     """
     # 1) Leer datos de conexión
-    dsn = postgresql.dsn()
+    info = postgresql.info
 
     # 2) Poner en env vars para decouple
-    os.environ["DB_NAME"] = dsn["dbname"]
-    os.environ["DB_USER"] = dsn["user"]
-    os.environ["DB_PASSWORD"] = dsn.get("password", "")
-    os.environ["DB_HOST"] = dsn.get("host", "localhost")
-    os.environ["DB_PORT"] = str(dsn["port"])
-
-    # 3) Forzar recreación del pool con la nueva config
-    db_mod._pool = None
+    os.environ["DB_NAME"] = info.dbname
+    os.environ["DB_USER"] = info.user
+    os.environ["DB_PASSWORD"] = info.password or ""
+    os.environ["DB_HOST"] = info.host or "localhost"
+    os.environ["DB_PORT"] = str(info.port)
+
+    # 3) Forzar recreación del pool con la nueva config (olvida lo sabido del
+    #    servidor, p. ej. si tiene pg_trgm; ver `al_cerrar_pool`) y vaciar cachés
+    db_mod.close_pool()
+    producto_repo.invalidar_precios()
+    catalogo.clear()
 
     # 4) Cargar tu esquema SQL
     schema = open("db/schema.sql", encoding="utf-8").read()
@@ -37,5 +43,13 @@ def postgres_db(postgresql):
     conn.commit()
     cur.close()
 
+    # 5) Aplicar las migraciones versionadas sobre el esquema base
+    migrations.aplicar()
+
     yield postgresql
-    # teardown automático del fixture postgresql
+    # teardown: soltar la escucha y cerrar el pool antes de que se elimine la BD de prueba
+    catalogo.detener()
+    catalogo.clear()
+    report_cache.detener()
+    report_cache.cache.clear()
+    db_mod.close_pool()
@@ -0,0 +1,53 @@
+"""Integration tests for cancelling in-flight queries via repository.db.CancelToken."""
+
+import sys
+import threading
+import time
+
+import pytest
+from psycopg2.extensions import QueryCanceledError
+
+from repository.db import CancelToken, cancel_scope, get_conn
+
+if sys.platform.startswith("win"):
+    pytest.skip(
+        "Tests de integración con PostgreSQL sólo en entornos POSIX (Linux/CI)",
+        allow_module_level=True,
+    )
+
+
+@pytest.mark.integration
+def test_cancel_token_aborta_consulta_en_curso(postgres_db):
+    """cancel() desde otro hilo corta la consulta en el servidor y el pool sigue usable."""
+    token = CancelToken()
+    resultado = {}
+
+    def consulta_lenta():
+        try:
+            with cancel_scope(token), get_conn() as conn, conn.cursor() as cur:
+                resultado["conn"] = conn
+                cur.execute("SELECT pg_sleep(30)")
+        except Exception as exc:  # noqa: BLE001 - se inspecciona abajo
+            resultado["exc"] = exc
+
+    hilo = threading.Thread(target=consulta_lenta)
+    inicio = time.monotonic()
+    hilo.start()
+    time.sleep(0.3)
+    token.cancel()
+    hilo.join(5)
+
+    assert not hilo.is_alive()
+    assert time.monotonic() - inicio < 5
+    assert isinstance(resultado.get("exc"), QueryCanceledError)
+    # La conexión cancelada se cierra en lugar de volver al pool
+    assert resultado["conn"].closed
+
+    # Un token ya cancelado no entrega más conexiones
+    with pytest.raises(QueryCanceledError), cancel_scope(token), get_conn():
+        pass
+
+    # Fuera del scope el pool sigue sirviendo consultas normales
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("SELECT 1")
+        assert cur.fetchone() == (1,)
@@ -0,0 +1,57 @@
+"""Integration tests for the LISTEN/NOTIFY listener."""
+
+import queue
+import sys
+
+import pytest
+
+from repository import producto_repo
+from repository.db import get_conn
+from repository.eventos import Escucha
+
+if sys.platform.startswith("win"):
+    pytest.skip(
+        "Tests de integración con PostgreSQL sólo en entornos POSIX (Linux/CI)",
+        allow_module_level=True,
+    )
+
+
+@pytest.fixture
+def escucha(postgres_db):
+    """Escucha del canal de productos que anota conexiones y lotes recibidos."""
+    eventos: queue.Queue = queue.Queue()
+    e = Escucha(
+        producto_repo.CANAL_PRODUCTOS,
+        lambda lote: eventos.put(("lote", lote)),
+        on_conectado=lambda: eventos.put(("conectado", None)),
+        reintento=0.1,
+    )
+    e.iniciar()
+    assert eventos.get(timeout=5) == ("conectado", None)
+    yield e, eventos
+    e.detener(timeout=5)
+
+
+@pytest.mark.integration
+def test_triggers_avisan_por_producto_y_transaccion(escucha):
+    """Cada transacción llega como un lote con los ids tocados, sin repetidos."""
+    _, eventos = escucha
+    producto_repo.crear("Martillo", precio=5000, stock=3)  # productos + precios
+    (id_prod, _, _), = producto_repo.obtener_productos()
+    assert eventos.get(timeout=5) == ("lote", {str(id_prod)})
+
+    producto_repo.eliminar(id_prod)
+    assert eventos.get(timeout=5) == ("lote", {str(id_prod)})
+
+
+@pytest.mark.integration
+def test_reconecta_y_avisa_para_resincronizar(escucha):
+    """Si el servidor corta la conexión, se reconecta y vuelve a llamar a ``on_conectado``."""
+    e, eventos = escucha
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE query LIKE 'LISTEN%%'")
+    assert eventos.get(timeout=5) == ("conectado", None)
+    assert e.ultimo_error is not None
+
+    producto_repo.crear("Clavo", precio=10, stock=1)
+    assert eventos.get(timeout=5)[0] == "lote"
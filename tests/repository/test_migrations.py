@@ -0,0 +1,80 @@
+"""Tests for the schema migration runner."""
+
+import sys
+
+import pytest
+
+from repository import migrations
+from repository.db import get_conn
+
+
+@pytest.mark.unit
+def test_descubrir_ordena_y_valida(tmp_path):
+    """Descubre pares up/down ordenados por versión y rechaza huecos."""
+    (tmp_path / "0002_b.up.sql").write_text("SELECT 2")
+    (tmp_path / "0001_a.up.sql").write_text("SELECT 1")
+    (tmp_path / "0001_a.down.sql").write_text("SELECT 1")
+    (tmp_path / "notas.txt").write_text("")
+
+    migs = migrations.descubrir(tmp_path)
+    assert [(m.version, m.nombre, m.down is not None) for m in migs] == [(1, "a", True), (2, "b", False)]
+
+    (tmp_path / "0003_c.down.sql").write_text("SELECT 3")
+    with pytest.raises(ValueError):
+        migrations.descubrir(tmp_path)
+
+
+def _indices() -> set[str]:
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("SELECT indexname FROM pg_indexes WHERE schemaname = 'public'")
+        return {r[0] for r in cur.fetchall()}
+
+
+def _plan(sql: str, params=()) -> str:
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("EXPLAIN " + sql, params)
+        return "\n".join(r[0] for r in cur.fetchall())
+
+
+@pytest.mark.integration
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="Integración solo en POSIX")
+def test_aplicar_y_revertir(postgres_db):
+    """El fixture deja todo aplicado; rollback y apply son idempotentes."""
+    assert all(m["aplicada"] for m in migrations.estado())
+    assert migrations.aplicar() == []
+    assert "idx_ventas_fecha" in _indices()
+
+    ultima = migrations.descubrir()[-1].version
+    assert migrations.revertir() == [ultima]
+    assert migrations.aplicar() == [ultima]
+
+    assert migrations.revertir(pasos=99)[-1] == 1
+    assert "idx_ventas_fecha" not in _indices()
+    migrations.aplicar()
+    assert "idx_ventas_fecha" in _indices()
+
+
+@pytest.mark.integration
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="Integración solo en POSIX")
+def test_planner_usa_indices(postgres_db):
+    """Con historial voluminoso, rango de fechas y detalle usan los índices nuevos."""
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("INSERT INTO productos (nombre, stock) SELECT 'P' || g, 0 FROM generate_series(1, 200) g")
+        cur.execute("INSERT INTO ventas (fecha) SELECT DATE '2020-01-01' + (g % 1500) FROM generate_series(1, 30000) g")
+        cur.execute(
+            """
+            INSERT INTO ventas_producto (id_venta, id_producto, cantidad, monto_producto)
+            SELECT v.id_venta, 1 + (v.id_venta * k) % 200, 1, 100
+            FROM ventas v, generate_series(1, 3) k
+            """
+        )
+        cur.execute("ANALYZE")
+
+    plan = _plan("SELECT * FROM ventas WHERE fecha BETWEEN %s AND %s", ("2021-01-01", "2021-01-07"))
+    assert "idx_ventas_fecha" in plan
+
+    plan = _plan("SELECT * FROM ventas_producto WHERE id_venta = %s", (1234,))
+    assert "idx_ventas_producto_id_venta" in plan
+
+    plan = _plan("SELECT SUM(cantidad) FROM ventas_producto WHERE id_producto = %s", (7,))
+    assert "idx_ventas_producto_id_producto" in plan
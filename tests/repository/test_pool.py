@@ -0,0 +1,215 @@
+"""Unit tests for the thread-safe ConnectionPool (sin base de datos)."""
+
+import threading
+import time
+
+import pytest
+from psycopg2 import extensions
+
+from repository.pool import ConnectionPool, PoolError, PoolExhausted, PoolTimeout
+
+
+class FakeInfo:
+    transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def execute(self, sql, params=None):
+        """Falla si la conexión simulada está marcada como rota."""
+        if self._conn.broken:
+            raise RuntimeError("server closed the connection")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class FakeConn:
+    """Conexión psycopg2 simulada con el mínimo que usa el pool."""
+
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.info = FakeInfo()
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def opened():
+    """Registra cada conexión creada por el pool."""
+    return []
+
+
+def make_pool(opened, **kw):
+    def connect():
+        conn = FakeConn()
+        opened.append(conn)
+        return conn
+
+    return ConnectionPool(connect, **kw)
+
+
+@pytest.mark.unit
+def test_reuses_connections(opened):
+    """Una conexión devuelta se vuelve a entregar sin abrir otra."""
+    pool = make_pool(opened, minconn=1, maxconn=2)
+    c1 = pool.getconn()
+    pool.putconn(c1)
+    assert pool.getconn() is c1
+    assert len(opened) == 1
+
+
+@pytest.mark.unit
+def test_waits_for_free_connection(opened):
+    """Con el pool lleno, el solicitante espera en vez de fallar."""
+    pool = make_pool(opened, minconn=0, maxconn=1, timeout=2)
+    held = pool.getconn()
+    got = []
+
+    t = threading.Thread(target=lambda: got.append(pool.getconn()))
+    t.start()
+    while pool.stats()["waiters"] == 0:
+        time.sleep(0.001)
+    pool.putconn(held)
+    t.join(2)
+
+    assert got == [held]
+    assert pool.stats()["acquired"] == 2
+
+
+@pytest.mark.unit
+def test_timeout_and_bounded_queue(opened):
+    """Lanza PoolTimeout al vencer el plazo y PoolExhausted si la cola está llena."""
+    pool = make_pool(opened, minconn=0, maxconn=1, max_waiters=0)
+    pool.getconn()
+    with pytest.raises(PoolExhausted):
+        pool.getconn(timeout=0.01)
+
+    pool.max_waiters = 1
+    with pytest.raises(PoolTimeout):
+        pool.getconn(timeout=0.01)
+    stats = pool.stats()
+    assert stats["timeouts"] == 1 and stats["rejected"] == 1
+
+
+@pytest.mark.unit
+def test_recycles_by_uses_and_idle(opened):
+    """Recicla conexiones que superan max_uses o max_idle."""
+    pool = make_pool(opened, minconn=0, maxconn=1, max_uses=2, max_idle=60)
+    c1 = pool.getconn()
+    pool.putconn(c1)
+    pool.putconn(pool.getconn())
+    c2 = pool.getconn()  # tercer préstamo → c1 reciclada
+    assert c2 is not c1 and c1.closed
+    pool.putconn(c2)
+
+    pool.max_idle = 0
+    time.sleep(0.01)
+    c3 = pool.getconn()
+    assert c3 is not c2 and c2.closed
+    assert pool.stats()["recycled"] == 2
+
+
+@pytest.mark.unit
+def test_health_check_discards_broken(opened):
+    """Una conexión que falla el SELECT 1 se descarta y se abre otra."""
+    pool = make_pool(opened, minconn=1, maxconn=1, check_after=0)
+    opened[0].broken = True
+    time.sleep(0.001)
+    conn = pool.getconn()
+    assert conn is not opened[0] and opened[0].closed
+    assert pool.stats()["broken"] == 1
+
+
+@pytest.mark.unit
+def test_stats_under_concurrency(opened):
+    """Muchos hilos comparten el pool sin exceder maxconn."""
+    pool = make_pool(opened, minconn=0, maxconn=3, timeout=5)
+    peak = []
+
+    def worker():
+        for _ in range(20):
+            c = pool.getconn()
+            peak.append(pool.stats()["in_use"])
+            pool.putconn(c)
+
+    threads = [threading.Thread(target=worker) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = pool.stats()
+    assert max(peak) <= 3 and len(opened) <= 3
+    assert stats["in_use"] == 0 and stats["acquired"] == 200
+    assert sum(stats["acquire_ms"].values()) == 200
+
+
+
+@pytest.mark.unit
+def test_validacion_no_excede_maxconn(opened, monkeypatch):
+    """Con ``check_after=0`` las conexiones en validación cuentan: nunca hay más de maxconn."""
+    pool = make_pool(opened, minconn=2, maxconn=2, timeout=5, check_after=0)
+    # El SELECT 1 tarda: ventana para que otro hilo abra conexiones de más
+    monkeypatch.setattr(FakeCursor, "execute", lambda self, sql, params=None: time.sleep(0.002))
+    abiertas = []
+
+    def worker():
+        for _ in range(20):
+            c = pool.getconn()
+            st = pool.stats()
+            abiertas.append(st["in_use"] + st["idle"] + st["opening"] + st["checking"])
+            pool.putconn(c)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert max(abiertas) <= 2
+    assert len(opened) == 2
+
+
+@pytest.mark.unit
+def test_closeall_durante_validacion(opened, monkeypatch):
+    """Una conexión que se validaba cuando se cerró el pool se descarta y no queda en uso."""
+    pool = make_pool(opened, minconn=1, maxconn=1, check_after=0)
+    entro, seguir = threading.Event(), threading.Event()
+
+    def execute(self, sql, params=None):
+        entro.set()
+        seguir.wait(5)
+
+    monkeypatch.setattr(FakeCursor, "execute", execute)
+    errores = []
+
+    def pedir():
+        try:
+            pool.getconn()
+        except PoolError as exc:
+            errores.append(exc)
+
+    time.sleep(0.001)
+    hilo = threading.Thread(target=pedir)
+    hilo.start()
+    assert entro.wait(5)
+    pool.closeall()
+    seguir.set()
+    hilo.join(5)
+
+    assert len(errores) == 1
+    assert opened[0].closed and pool.stats()["in_use"] == 0
@@ -1,15 +1,19 @@
 """Integration tests for the producto_repo module."""
 
+import itertools
 import sys
 
 import pytest
 
+from repository import producto_repo
+from repository.db import close_pool
 from repository.producto_repo import (
     actualizar,
     crear,
     eliminar,
     listar,
     obtener_precio,
+    obtener_precios,
     obtener_productos,
     obtener_stock,
 )
@@ -47,3 +51,136 @@ def test_producto_crud(postgres_db):
     # 5) Eliminar y verificar que ya no está
     eliminar(idp)
     assert listar() == []
+
+
+@pytest.mark.integration
+def test_obtener_precios_lote_y_cache(postgres_db, monkeypatch):
+    """Resuelve varios precios en una consulta, los cachea y los invalida al actualizar."""
+    crear("A", precio=100, stock=1)
+    crear("B", precio=250, stock=1)
+    (ida, _, _), (idb, _, _) = obtener_productos()
+
+    consultas = []
+    fetch = producto_repo._fetch_all
+    monkeypatch.setattr(producto_repo, "_fetch_all", lambda sql, params=(): consultas.append(sql) or fetch(sql, params))
+
+    assert obtener_precios([ida, idb, 9999]) == {ida: 100, idb: 250, 9999: 0}
+    assert obtener_precios([idb, ida]) == {ida: 100, idb: 250}
+    assert len(consultas) == 1
+
+    actualizar(idb, precio=300, stock=1)
+    assert obtener_precios([ida, idb]) == {ida: 100, idb: 300}
+    assert len(consultas) == 2
+
+
+@pytest.mark.integration
+def test_importar_lote_upsert_por_nombre(postgres_db):
+    """importar_lote crea los nuevos y actualiza precio y stock de los existentes en un solo paso."""
+    crear("Existente", precio=100, stock=1)
+    id_existente = obtener_productos()[0][0]
+    assert obtener_precio(id_existente) == 100  # deja el precio en caché
+
+    filas = (("Nuevo %d" % i, 10 * i, i) for i in range(1, 5001))
+    res = producto_repo.importar_lote(itertools.chain([("Existente", 250, 9)], filas))
+
+    assert res == {"insertados": 5000, "actualizados": 1}
+    assert obtener_precio(id_existente) == 250  # la caché se invalidó
+    assert obtener_stock(id_existente) == 9
+    prods = {p["nombre"]: p for p in listar()}
+    assert len(prods) == 5001
+    assert prods["Nuevo 42"]["precio"] == 420 and prods["Nuevo 42"]["stock"] == 42
+
+
+@pytest.mark.integration
+def test_codigos_y_cambios_incrementales(postgres_db):
+    """Crea con código, lo busca, rechaza duplicados y lee solo los productos modificados."""
+    crear("Martillo", precio=5000, stock=3, codigo="7801234")
+    crear("Clavo", precio=10, stock=100)
+    (idm, _, _), (idc, _, _) = sorted(obtener_productos())
+
+    assert producto_repo.buscar_por_codigo("7801234") == {
+        "id": idm, "codigo": "7801234", "nombre": "Martillo", "precio": 5000, "stock": 3,
+    }
+    assert producto_repo.buscar_por_codigo("nada") is None
+
+    with pytest.raises(producto_repo.CodigoDuplicado):
+        crear("Otro", precio=1, stock=1, codigo="7801234")
+    with pytest.raises(producto_repo.CodigoDuplicado):
+        producto_repo.asignar_codigo(idc, "7801234")
+
+    # Carga completa: todos los productos
+    filas, marca = producto_repo.productos_modificados()
+    assert sorted(f[0] for f in filas) == [idm, idc]
+
+    # Sin cambios no viaja nada; un cambio de precio (trigger en precios) sí
+    assert producto_repo.productos_modificados(marca)[0] == []
+    actualizar(idm, precio=5500, stock=2)
+    filas, marca = producto_repo.productos_modificados(marca)
+    assert filas == [(idm, "7801234", "Martillo", 5500, 2)]
+    assert producto_repo.productos_por_id([idm, 9999]) == filas
+
+    # Quitar el código también se informa (para sacarlo del mapa)
+    producto_repo.asignar_codigo(idm, None)
+    filas, _ = producto_repo.productos_modificados(marca)
+    assert filas == [(idm, None, "Martillo", 5500, 2)]
+
+    # Precio, stock y código en una transacción: un código repetido no aplica nada
+    actualizar(idc, precio=20, stock=50, codigo="555")
+    assert producto_repo.productos_por_id([idc]) == [(idc, "555", "Clavo", 20, 50)]
+    with pytest.raises(producto_repo.CodigoDuplicado):
+        actualizar(idm, precio=1, stock=1, codigo="555")
+    assert producto_repo.productos_por_id([idm]) == [(idm, None, "Martillo", 5500, 2)]
+
+
+@pytest.mark.integration
+def test_buscar_prefijo_subcadena_y_paginas(postgres_db):
+    """Ordena por relevancia sin distinguir mayúsculas y pagina con limite/offset."""
+    for nombre in ("Tuerca M8", "tornillo 3/8", "Arandela para tornillo", "Clavo", "Tornillo 1/2", "50% off"):
+        crear(nombre, precio=10, stock=1)
+
+    nombres = [p["nombre"] for p in producto_repo.buscar(" TORN")]
+    assert nombres == ["Tornillo 1/2", "tornillo 3/8", "Arandela para tornillo"]
+
+    # Menos de MIN_TRIGRAMA caracteres: solo prefijo
+    assert [p["nombre"] for p in producto_repo.buscar("to")] == ["Tornillo 1/2", "tornillo 3/8"]
+
+    # Vacío lista todo por nombre; las páginas no se solapan
+    primera = producto_repo.buscar("", limite=4)
+    segunda = producto_repo.buscar("", limite=4, offset=4)
+    assert len(primera) == 4 and len(segunda) == 2
+    assert {p["id"] for p in primera}.isdisjoint(p["id"] for p in segunda)
+    assert primera[0]["nombre"] == "50% off" and primera[0]["precio"] == 10
+
+    # Los comodines de LIKE se buscan literalmente
+    assert [p["nombre"] for p in producto_repo.buscar("0% o")] == ["50% off"]
+    assert producto_repo.buscar("a_a") == []
+
+
+@pytest.mark.integration
+def test_deteccion_de_trigramas_por_pool(postgres_db, monkeypatch):
+    """Cerrar el pool olvida si hay pg_trgm; si se lo quitaron, la búsqueda vuelve a LIKE."""
+    monkeypatch.setattr(producto_repo, "_trigramas", True)
+    close_pool()
+    assert producto_repo._trigramas is None
+
+    cur = postgres_db.cursor()
+    cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+    if cur.fetchone() is not None:
+        cur.execute("DROP EXTENSION pg_trgm CASCADE")
+        postgres_db.commit()
+    crear("Tornillo 3/8", precio=10, stock=1)
+    monkeypatch.setattr(producto_repo, "_trigramas", True)  # lo que se sabía antes de quitarla
+    assert [p["nombre"] for p in producto_repo.buscar("tornillo")] == ["Tornillo 3/8"]
+    assert producto_repo._trigramas is None
+
+
+@pytest.mark.integration
+def test_buscar_tolera_errores_de_tipeo(postgres_db):
+    """Con pg_trgm, un nombre mal escrito encuentra el producto."""
+    cur = postgres_db.cursor()
+    cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+    if cur.fetchone() is None:
+        pytest.skip("El servidor de pruebas no tiene pg_trgm")
+    crear("Tornillo 3/8", precio=10, stock=1)
+    crear("Clavo", precio=10, stock=1)
+    assert [p["nombre"] for p in producto_repo.buscar("tornilo")] == ["Tornillo 3/8"]
@@ -1,3 +1,4 @@
+import sys
 from datetime import date
 
 import pytest
@@ -81,3 +82,118 @@ def test_fetch_top_revenue_returns_list(fake_list_conn):
 def test_fetch_top_profit_returns_list(fake_list_conn):
     res = report_repository.fetch_top_profit(date(2025, 5, 1), date(2025, 5, 2))
     assert res == fake_list_conn
+
+
+def test_fetch_report_bundle_returns_json(monkeypatch):
+    """fetch_report_bundle devuelve el objeto JSON de la única fila."""
+    bundle = {"resumen": {}, "top_cantidad": [], "top_ingresos": [], "top_utilidad": []}
+    monkeypatch.setattr(report_repository, "get_conn", lambda: FakeConn(FakeCursor(one=(bundle,))))
+    assert report_repository.fetch_report_bundle(date(2025, 5, 1), date(2025, 5, 2)) == bundle
+
+
+@pytest.mark.integration
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="Integración solo en POSIX")
+@pytest.mark.parametrize("use_rollup", [True, False])
+def test_bundle_coincide_con_consultas_individuales(postgres_db, monkeypatch, use_rollup):
+    """El bundle de un solo viaje da lo mismo que las cuatro consultas separadas."""
+    from repository import rollup
+    from repository.db import get_conn
+
+    monkeypatch.setattr(report_repository, "USE_ROLLUP", use_rollup)
+
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("INSERT INTO productos (nombre, stock) SELECT 'P' || g, 100 FROM generate_series(1, 8) g")
+        cur.execute("INSERT INTO precios SELECT id_producto, 100 * id_producto, 60 * id_producto, 40 * id_producto FROM productos WHERE id_producto <= 7")
+        cur.execute("INSERT INTO ventas (fecha) SELECT DATE '2025-01-01' + (g % 20) FROM generate_series(1, 60) g")
+        cur.execute("INSERT INTO ventas_producto SELECT id_venta, 1 + id_venta % 8, 1 + id_venta % 3, 0 FROM ventas WHERE id_venta % 10 <> 0")
+    rollup.reconstruir()
+
+    start, end = date(2025, 1, 3), date(2025, 1, 15)
+    bundle = report_repository.fetch_report_bundle(start, end)
+    summary = report_repository.fetch_summary(start, end)
+
+    assert bundle["resumen"]["cantidad_ventas"] == summary["cantidad_ventas"] > 0
+    assert float(bundle["resumen"]["ventas_netas"]) == pytest.approx(float(summary["ventas_netas"]))
+    assert float(bundle["resumen"]["ticket_promedio"]) == pytest.approx(float(summary["ticket_promedio"]))
+
+    def norm(rows, key):
+        return [(r["nombre"], float(r[key])) for r in rows]
+
+    assert norm(bundle["top_cantidad"], "total_cantidad") == norm(report_repository.fetch_top_quantity(start, end), "total_cantidad")
+    assert norm(bundle["top_ingresos"], "total_ingresos") == norm(report_repository.fetch_top_revenue(start, end), "total_ingresos")
+    assert norm(bundle["top_utilidad"], "utilidad_total") == norm(report_repository.fetch_top_profit(start, end), "utilidad_total")
+
+
+@pytest.mark.integration
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="Integración solo en POSIX")
+@pytest.mark.parametrize("use_rollup", [True, False])
+def test_period_summaries_coincide_con_fetch_summary(postgres_db, monkeypatch, use_rollup):
+    """Los N periodos de una sola consulta dan lo mismo que N llamadas a fetch_summary."""
+    from repository import rollup
+    from repository.db import get_conn
+
+    monkeypatch.setattr(report_repository, "USE_ROLLUP", use_rollup)
+
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("INSERT INTO productos (nombre, stock) SELECT 'P' || g, 100 FROM generate_series(1, 5) g")
+        cur.execute("INSERT INTO precios SELECT id_producto, 100 * id_producto, 60 * id_producto, 40 * id_producto FROM productos WHERE id_producto <= 4")
+        cur.execute("INSERT INTO ventas (fecha) SELECT DATE '2025-01-01' + (g % 40) FROM generate_series(1, 80) g")
+        cur.execute("INSERT INTO ventas_producto SELECT id_venta, 1 + id_venta % 5, 1 + id_venta % 3, 0 FROM ventas WHERE id_venta % 7 <> 0")
+    rollup.reconstruir()
+
+    periods = [
+        (date(2025, 1, 1), date(2025, 1, 10)),
+        (date(2025, 1, 5), date(2025, 1, 20)),
+        (date(2025, 2, 1), date(2025, 2, 28)),
+        (date(2024, 6, 1), date(2024, 6, 30)),
+    ]
+    res = report_repository.fetch_period_summaries(periods)
+    assert len(res) == len(periods)
+    for (d, h), r in zip(periods, res):
+        esperado = report_repository.fetch_summary(d, h)
+        assert r["cantidad_ventas"] == esperado["cantidad_ventas"]
+        assert float(r["ventas_netas"]) == pytest.approx(float(esperado["ventas_netas"]))
+        assert float(r["ticket_promedio"]) == pytest.approx(float(esperado["ticket_promedio"]))
+    assert res[3]["cantidad_ventas"] == 0
+    assert report_repository.fetch_period_summaries([]) == []
+
+
+@pytest.mark.integration
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="Integración solo en POSIX")
+@pytest.mark.parametrize("use_rollup", [True, False])
+def test_sales_series_rellena_huecos(postgres_db, monkeypatch, use_rollup):
+    """La serie incluye periodos sin ventas en cero y agrupa por día, semana y mes."""
+    from repository import rollup
+    from repository.db import get_conn
+
+    monkeypatch.setattr(report_repository, "USE_ROLLUP", use_rollup)
+
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("INSERT INTO productos (nombre, stock) VALUES ('A', 100), ('B', 100) RETURNING id_producto")
+        ida, idb = (r[0] for r in cur.fetchall())
+        cur.execute("INSERT INTO precios VALUES (%s, 100, 60, 40), (%s, 50, 30, 20)", (ida, idb))
+        for fecha, lineas in [("2025-01-02", [(ida, 2)]), ("2025-01-02", [(idb, 4)]), ("2025-01-06", [(ida, 1), (idb, 1)]), ("2025-02-15", [(ida, 3)])]:
+            cur.execute("INSERT INTO ventas (fecha) VALUES (%s) RETURNING id_venta", (fecha,))
+            idv = cur.fetchone()[0]
+            for idp, cant in lineas:
+                cur.execute("INSERT INTO ventas_producto VALUES (%s, %s, %s, 0)", (idv, idp, cant))
+    rollup.reconstruir()
+
+    dias = report_repository.fetch_sales_series(date(2025, 1, 1), date(2025, 1, 7), "day")
+    assert [r["periodo"] for r in dias] == [date(2025, 1, d) for d in range(1, 8)]
+    por_dia = {r["periodo"].day: r for r in dias}
+    assert por_dia[1]["cantidad_ventas"] == 0 and float(por_dia[1]["ventas_netas"]) == 0
+    assert por_dia[2]["cantidad_ventas"] == 2 and por_dia[2]["unidades"] == 6
+    assert float(por_dia[2]["ventas_netas"]) == 400 and float(por_dia[2]["utilidad"]) == 160
+    assert float(por_dia[2]["ticket_promedio"]) == 200
+
+    semanas = report_repository.fetch_sales_series(date(2025, 1, 1), date(2025, 1, 31), "week")
+    assert semanas[0]["periodo"] == date(2024, 12, 30)  # lunes de la semana del 1/1
+    assert semanas[0]["cantidad_ventas"] == 2 and semanas[1]["cantidad_ventas"] == 1
+    assert len(semanas) == 5
+
+    meses = report_repository.fetch_sales_series(date(2024, 12, 1), date(2025, 3, 31), "month")
+    assert [(r["periodo"].month, r["cantidad_ventas"], r["unidades"]) for r in meses] == [(12, 0, 0), (1, 3, 8), (2, 1, 3), (3, 0, 0)]
+
+    with pytest.raises(ValueError):
+        report_repository.fetch_sales_series(date(2025, 1, 1), date(2025, 1, 2), "year")
@@ -0,0 +1,80 @@
+"""Integration tests for the incrementally maintained daily sales rollup."""
+
+import sys
+from datetime import date
+
+import pytest
+
+from repository import report_repository, rollup
+from repository.db import get_conn
+from repository.producto_repo import actualizar, crear, obtener_productos
+from repository.ventas_repo import eliminar_venta, eliminar_ventas, insertar_venta
+
+if sys.platform.startswith("win"):
+    pytest.skip(
+        "Tests de integración con PostgreSQL sólo en entornos POSIX (Linux/CI)",
+        allow_module_level=True,
+    )
+
+
+def _vender(fecha, lineas):
+    venta = {"fecha": fecha, "forma_pago": "efectivo", "monto_total": 0, "total_productos": 0}
+    return insertar_venta(venta, [{"id_producto": i, "cantidad": c, "monto_producto": 10 * c} for i, c in lineas])
+
+
+def _reportes(monkeypatch, use_rollup):
+    monkeypatch.setattr(report_repository, "USE_ROLLUP", use_rollup)
+    rango = (date(2025, 1, 1), date(2025, 1, 31))
+    return (
+        report_repository.fetch_summary(*rango),
+        report_repository.fetch_top_quantity(*rango),
+        report_repository.fetch_top_revenue(*rango),
+        report_repository.fetch_top_profit(*rango),
+        report_repository.fetch_report_bundle(*rango),
+    )
+
+
+@pytest.mark.integration
+def test_rollup_incremental_coincide_con_crudo(postgres_db, monkeypatch):
+    """Insertar, eliminar y cambiar precios mantiene el resumen igual a las tablas crudas."""
+    for n in "ABC":
+        crear(n, precio=100, stock=1000)
+    a, b, c = (p[0] for p in obtener_productos())
+
+    v1 = _vender("2025-01-05", [(a, 2), (b, 1), (a, 1)])
+    _vender("2025-01-05", [(b, 4)])
+    v3 = _vender("2025-01-20", [(c, 7), (a, 1)])
+    _vender("2025-02-01", [(c, 1)])
+    eliminar_venta(v1)
+    eliminar_ventas(rango=("2025-02-01", "2025-02-28"))
+    actualizar(c, precio=300, stock=1000)
+
+    assert rollup.verificar() == []
+    assert _reportes(monkeypatch, True) == _reportes(monkeypatch, False)
+
+    eliminar_ventas([v3])
+    assert rollup.verificar() == []
+    assert _reportes(monkeypatch, True) == _reportes(monkeypatch, False)
+
+
+@pytest.mark.integration
+def test_verificar_y_reconstruir(postgres_db):
+    """verificar() detecta desvíos y reconstruir() los repara en el rango pedido."""
+    crear("A", precio=100, stock=100)
+    a = obtener_productos()[0][0]
+    _vender("2025-03-01", [(a, 2)])
+    _vender("2025-03-02", [(a, 3)])
+
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("UPDATE ventas_diarias_producto SET unidades = 99 WHERE fecha = '2025-03-02'")
+        cur.execute("DELETE FROM ventas_diarias WHERE fecha = '2025-03-01'")
+
+    difs = rollup.verificar()
+    assert {(str(d["fecha"]), d["id_producto"]) for d in difs} == {("2025-03-01", None), ("2025-03-02", a)}
+    assert rollup.main(["check"]) == 1
+
+    rollup.reconstruir("2025-03-02", "2025-03-02")
+    assert [str(d["fecha"]) for d in rollup.verificar()] == ["2025-03-01"]
+    rollup.reconstruir()
+    assert rollup.verificar() == []
+    assert rollup.main(["check"]) == 0
@@ -0,0 +1,125 @@
+"""Integration tests for chunked server-side reads and streaming Excel export."""
+
+import csv
+import datetime
+import sys
+
+import openpyxl
+import pytest
+
+from repository import streaming
+from repository.db import get_conn
+from repository.producto_repo import exportar_excel as exportar_inventario
+from repository.ventas_repo import exportar_csv as exportar_ventas_csv
+from repository.ventas_repo import exportar_excel as exportar_ventas
+
+if sys.platform.startswith("win"):
+    pytest.skip(
+        "Tests de integración con PostgreSQL sólo en entornos POSIX (Linux/CI)",
+        allow_module_level=True,
+    )
+
+
+@pytest.fixture
+def muchas_ventas(postgres_db):
+    """3000 ventas repartidas en 30 días de enero/febrero 2025."""
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO ventas (fecha, forma_pago, total_productos, monto_total)
+            SELECT DATE '2025-01-01' + (g % 30), 'Efectivo', 1, g FROM generate_series(1, 3000) g
+            """
+        )
+    return 3000
+
+
+@pytest.mark.integration
+def test_iter_chunks_respeta_tamano(muchas_ventas):
+    """El cursor del servidor entrega bloques del tamaño pedido."""
+    tamanos = [len(b) for b in streaming.iter_chunks("SELECT id_venta FROM ventas ORDER BY id_venta", chunk_size=700)]
+    assert tamanos == [700, 700, 700, 700, 200]
+
+
+@pytest.mark.integration
+def test_exportar_xlsx_en_bloques_con_progreso(muchas_ventas, tmp_path):
+    """Todas las filas llegan al archivo y el progreso avanza por bloque hasta el total."""
+    avances = []
+    path = tmp_path / "ventas.xlsx"
+    n = streaming.exportar_xlsx(
+        str(path),
+        ["id", "fecha", "monto"],
+        "SELECT id_venta, fecha, monto_total FROM ventas ORDER BY id_venta",
+        progreso=lambda hechas, total: avances.append((hechas, total)),
+        chunk_size=1000,
+    )
+    assert n == muchas_ventas
+    assert avances == [(1000, 3000), (2000, 3000), (3000, 3000)]
+
+    ws = openpyxl.load_workbook(path, read_only=True).active
+    filas = list(ws.iter_rows(values_only=True))
+    assert filas[0] == ("id", "fecha", "monto")
+    assert len(filas) == muchas_ventas + 1
+    assert filas[1][1].date() == datetime.date(2025, 1, 2)
+
+
+@pytest.mark.integration
+def test_exportar_ventas_con_rango_e_inventario(muchas_ventas, tmp_path):
+    """ventas_repo filtra por fechas y producto_repo exporta con precio 0 si falta."""
+    path = exportar_ventas(str(tmp_path / "v.xlsx"), rango=("2025-01-01", "2025-01-10"))
+    ws = openpyxl.load_workbook(path, read_only=True).active
+    filas = list(ws.iter_rows(values_only=True))
+    assert filas[0] == ("id", "fecha", "forma", "total_prod", "monto")
+    assert len(filas) - 1 == 1000  # 10 de 30 días
+    fechas = [f[1] for f in filas[1:]]
+    assert fechas == sorted(fechas, reverse=True)
+
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("INSERT INTO productos (nombre, stock) VALUES ('Sin precio', 4)")
+    path = exportar_inventario(str(tmp_path / "inv.xlsx"))
+    filas = list(openpyxl.load_workbook(path, read_only=True).active.iter_rows(values_only=True))
+    assert filas == [("id", "nombre", "precio", "stock"), (filas[1][0], "Sin precio", 0, 4)]
+
+
+@pytest.mark.integration
+def test_exportar_csv_via_copy(muchas_ventas, tmp_path):
+    """COPY escribe encabezado y filas filtradas; el detalle incluye el nombre del producto."""
+    path = exportar_ventas_csv(str(tmp_path / "v.csv"), rango=("2025-01-01", "2025-01-10"))
+    with open(path, encoding="utf-8") as f:
+        filas = list(csv.reader(f))
+    assert filas[0] == ["id", "fecha", "forma", "total_prod", "monto"]
+    assert len(filas) - 1 == 1000
+
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("INSERT INTO productos (nombre, stock) VALUES ('Clavo, 2\"', 10) RETURNING id_producto")
+        idp = cur.fetchone()[0]
+        cur.execute("INSERT INTO ventas_producto VALUES (1, %s, 3, 300)", (idp,))
+    path = exportar_ventas_csv(str(tmp_path / "d.csv"), tabla="detalle")
+    with open(path, encoding="utf-8") as f:
+        filas = list(csv.DictReader(f))
+    assert filas == [{"id_venta": "1", "fecha": "2025-01-02", "id_producto": str(idp), "nombre": 'Clavo, 2"', "cantidad": "3", "monto": "300"}]
+
+    with pytest.raises(ValueError):
+        exportar_ventas_csv(str(tmp_path / "x.csv"), tabla="otra")
+
+
+@pytest.mark.integration
+def test_exportar_parquet_en_row_groups(muchas_ventas, tmp_path):
+    """Cada bloque del cursor queda como un row group con tipos según la columna."""
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    avances = []
+    path = tmp_path / "v.parquet"
+    n = streaming.exportar_parquet(
+        str(path),
+        "SELECT id_venta AS id, fecha, forma_pago AS forma, monto_total::numeric AS monto FROM ventas ORDER BY id_venta",
+        progreso=lambda hechas, total: avances.append(hechas),
+        chunk_size=1200,
+    )
+    assert n == muchas_ventas and avances == [1200, 2400, 3000]
+
+    archivo = pq.ParquetFile(path)
+    assert archivo.metadata.num_row_groups == 3
+    tabla = archivo.read()
+    assert [str(t) for t in tabla.schema.types] == ["int64", "date32[day]", "string", "double"]
+    assert tabla.column("fecha")[0].as_py() == datetime.date(2025, 1, 2)
+    assert tabla.num_rows == muchas_ventas
@@ -4,13 +4,15 @@
 
 import datetime
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 
+from repository import rollup
 from repository.producto_repo import crear as crear_prod
 from repository.producto_repo import obtener_productos, obtener_stock
 from repository.ventas_repo import detalle as detalle_venta
-from repository.ventas_repo import eliminar_venta, insertar_venta
+from repository.ventas_repo import StockInsuficiente, eliminar_venta, eliminar_ventas, importar_lote, insertar_venta
 from repository.ventas_repo import listar as listar_ventas
 
 if sys.platform.startswith("win"):
@@ -66,3 +68,170 @@ def test_ventas_crud(postgres_db):
     eliminar_venta(id_venta)
     assert obtener_stock(idp) == stock_inicial
     assert all(v["id"] != id_venta for v in listar_ventas())
+
+
+@pytest.mark.integration
+def test_insertar_venta_multilinea_atomica(postgres_db):
+    """Varias líneas (con producto repetido) descuentan stock agregado; un fallo no deja cambios."""
+    crear_prod("A", precio=10, stock=10)
+    crear_prod("B", precio=20, stock=10)
+    (ida, _, _), (idb, _, _) = obtener_productos()
+
+    venta = {"fecha": "2025-05-01", "forma_pago": "efectivo", "monto_total": 0, "total_productos": 6}
+    items = [
+        {"id_producto": ida, "cantidad": 1, "monto_producto": 10},
+        {"id_producto": idb, "cantidad": 3, "monto_producto": 60},
+        {"id_producto": ida, "cantidad": 2, "monto_producto": 20},
+    ]
+    id_venta = insertar_venta(venta, items)
+    assert len(detalle_venta(id_venta)) == 3
+    assert obtener_stock(ida) == 7
+    assert obtener_stock(idb) == 7
+
+    # Producto inexistente → FK falla y no queda ni cabecera ni stock descontado
+    malos = [{"id_producto": ida, "cantidad": 1, "monto_producto": 10}, {"id_producto": 9999, "cantidad": 1, "monto_producto": 1}]
+    with pytest.raises(Exception):
+        insertar_venta(venta, malos)
+    assert obtener_stock(ida) == 7
+    assert [v["id"] for v in listar_ventas()] == [id_venta]
+
+
+@pytest.mark.integration
+def test_insertar_venta_sin_stock_reporta_faltantes(postgres_db):
+    """Una venta que supera el stock real no escribe nada y detalla los faltantes."""
+    crear_prod("A", precio=10, stock=2)
+    crear_prod("B", precio=10, stock=5)
+    (ida, _, _), (idb, _, _) = obtener_productos()
+
+    venta = {"fecha": "2025-05-01", "forma_pago": "efectivo", "monto_total": 0, "total_productos": 0}
+    items = [
+        {"id_producto": idb, "cantidad": 1, "monto_producto": 0},
+        {"id_producto": ida, "cantidad": 2, "monto_producto": 0},
+        {"id_producto": ida, "cantidad": 1, "monto_producto": 0},
+    ]
+    with pytest.raises(StockInsuficiente) as info:
+        insertar_venta(venta, items)
+    assert info.value.faltantes == [{"id_producto": ida, "nombre": "A", "solicitado": 3, "disponible": 2}]
+    assert obtener_stock(ida) == 2 and obtener_stock(idb) == 5
+    assert listar_ventas() == []
+
+
+@pytest.mark.integration
+def test_insertar_venta_concurrente_sin_sobreventa(postgres_db):
+    """Decenas de terminales vendiendo a la vez nunca dejan stock negativo ni se bloquean."""
+    stock = 40
+    crear_prod("A", precio=10, stock=stock)
+    crear_prod("B", precio=10, stock=stock)
+    (ida, _, _), (idb, _, _) = obtener_productos()
+    venta = {"fecha": "2025-05-01", "forma_pago": "efectivo", "monto_total": 0, "total_productos": 2}
+
+    def terminal(n):
+        # Mitad de las terminales listan los productos en orden inverso
+        orden = [ida, idb] if n % 2 else [idb, ida]
+        vendidas = 0
+        for _ in range(10):
+            try:
+                insertar_venta(venta, [{"id_producto": i, "cantidad": 1, "monto_producto": 0} for i in orden])
+                vendidas += 1
+            except StockInsuficiente:
+                pass
+        return vendidas
+
+    with ThreadPoolExecutor(max_workers=30) as pool:
+        total = sum(pool.map(terminal, range(30)))
+
+    assert total == stock
+    assert obtener_stock(ida) == 0 and obtener_stock(idb) == 0
+    assert len(listar_ventas()) == stock
+
+
+@pytest.mark.integration
+def test_eliminar_ventas_en_bloque(postgres_db):
+    """Anula ventas por IDs y por rango de fechas restaurando el stock agregado."""
+    crear_prod("A", precio=10, stock=100)
+    crear_prod("B", precio=10, stock=100)
+    (ida, _, _), (idb, _, _) = obtener_productos()
+
+    def vender(fecha, cant):
+        venta = {"fecha": fecha, "forma_pago": "efectivo", "monto_total": 0, "total_productos": 2 * cant}
+        lineas = [{"id_producto": ida, "cantidad": cant, "monto_producto": 0}, {"id_producto": idb, "cantidad": cant, "monto_producto": 0}]
+        return insertar_venta(venta, lineas)
+
+    v1 = vender("2025-01-10", 1)
+    v2 = vender("2025-01-20", 2)
+    v3 = vender("2025-02-05", 3)
+    v4 = vender("2025-03-01", 4)
+    assert obtener_stock(ida) == 90
+
+    assert sorted(eliminar_ventas([v1, v3, 9999])) == [datetime.date(2025, 1, 10), datetime.date(2025, 2, 5)]
+    assert obtener_stock(ida) == 94 and obtener_stock(idb) == 94
+
+    assert len(eliminar_ventas(rango=("2025-01-01", "2025-02-28"))) == 1
+    assert obtener_stock(ida) == 96
+    assert [v["id"] for v in listar_ventas()] == [v4]
+    assert detalle_venta(v2) == []
+
+    assert eliminar_ventas([v4], rango=("2024-01-01", "2024-12-31")) == []
+    with pytest.raises(ValueError):
+        eliminar_ventas()
+
+
+@pytest.mark.integration
+def test_importar_lote_ventas_historicas(postgres_db):
+    """importar_lote agrupa líneas por clave, descarta ventas con errores y mantiene el resumen diario."""
+    crear_prod("A", precio=100, stock=50)
+    crear_prod("B", precio=10, stock=50)
+    (ida, _, _), (idb, _, _) = obtener_productos()
+    previa = insertar_venta({"fecha": "2024-01-01", "forma_pago": "efectivo", "monto_total": 119, "total_productos": 1}, [{"id_producto": ida, "cantidad": 1, "monto_producto": 119}])
+
+    lineas = [
+        (2, "v1", "2024-02-01", "efectivo", "A", 2, None),
+        (3, "v2", "2024-02-02", "tarjeta", "B", 5, 40),
+        (4, "v1", "2024-02-01", "efectivo", "B", 1, 12),
+        (5, "v3", "2024-02-03", None, "Inexistente", 1, None),
+        (6, "v3", "2024-02-03", None, "A", 1, None),
+        (7, "v4", "2024-02-04", None, "A", 3, None),
+    ]
+    res = importar_lote(iter(lineas), excluir={"v4"})
+
+    assert (res["ventas"], res["lineas"]) == (2, 3)
+    assert res["fechas"] == [datetime.date(2024, 2, 1), datetime.date(2024, 2, 2)]
+    assert [(e["fila"], e["clave"]) for e in res["errores"]] == [(5, "v3"), (6, "v3"), (7, "v4")]
+    assert "Inexistente" in res["errores"][0]["error"]
+
+    importadas = sorted((v for v in listar_ventas() if v["id"] != previa), key=lambda v: v["id"])
+    # ids consecutivos de la secuencia, en el orden del archivo
+    assert [v["id"] for v in importadas] == [previa + 1, previa + 2]
+    assert (importadas[0]["monto"], importadas[0]["total_prod"], importadas[0]["forma"]) == (round(100 * 1.19 * 2) + 12, 3, "efectivo")
+    assert importadas[1]["monto"] == 40
+    assert obtener_stock(ida) == 49 and obtener_stock(idb) == 50
+    assert rollup.verificar() == []
+
+    importar_lote([(2, "x", "2024-03-01", None, "B", 4, 10)], descontar_stock=True)
+    assert obtener_stock(idb) == 46
+    assert rollup.verificar() == []
+
+
+@pytest.mark.integration
+def test_listar_paginado_por_keyset(postgres_db):
+    """listar(limite, despues) recorre todas las ventas sin repetir ni saltar filas."""
+    crear_prod("A", precio=10, stock=100)
+    ida = obtener_productos()[0][0]
+    for dia in (3, 1, 3, 2, 3, 1, 2):
+        insertar_venta({"fecha": f"2025-01-0{dia}", "forma_pago": "efectivo", "monto_total": 0, "total_productos": 1}, [{"id_producto": ida, "cantidad": 1, "monto_producto": 0}])
+
+    todas = [(v["fecha"], v["id"]) for v in listar_ventas()]
+    assert todas == sorted(todas, reverse=True)
+
+    paginas, despues = [], None
+    while True:
+        pagina = listar_ventas(limite=3, despues=despues)
+        if not pagina:
+            break
+        paginas.append([(v["fecha"], v["id"]) for v in pagina])
+        despues = paginas[-1][-1]
+    assert [len(p) for p in paginas] == [3, 3, 1]
+    assert sum(paginas, []) == todas
+
+    rango = listar_ventas(("2025-01-02", "2025-01-03"), limite=2, despues=todas[1])
+    assert [(v["fecha"], v["id"]) for v in rango] == todas[2:4]
@@ -0,0 +1,175 @@
+"""Tests for the in-memory product catalog."""
+
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from repository import producto_repo
+from services.catalogo import Catalogo, catalogo
+from services.producto_service import ProductoService
+from services.ventas_service import VentasService
+
+T0 = datetime(2024, 1, 1, 12, 0)
+
+
+@pytest.fixture
+def respuestas(monkeypatch):
+    """Encola las respuestas de `productos_modificados` y registra los ``desde`` pedidos."""
+    cola: list[list[tuple]] = []
+    pedidos: list[datetime | None] = []
+
+    def falso(desde=None):
+        pedidos.append(desde)
+        return cola.pop(0), T0 + timedelta(minutes=len(pedidos))
+
+    monkeypatch.setattr(producto_repo, "productos_modificados", falso)
+    return cola, pedidos
+
+
+class Valor:
+    """Sustituto mínimo de ``tk.StringVar`` (sin display)."""
+
+    def __init__(self, valor):
+        """Guarda el valor a devolver."""
+        self.valor = valor
+
+    def get(self):
+        """Devuelve el valor guardado."""
+        return self.valor
+
+
+def esperar(condicion, timeout=5.0):
+    """Espera hasta que *condicion()* sea verdadera (o falla por timeout)."""
+    limite = time.monotonic() + timeout
+    while not condicion():
+        assert time.monotonic() < limite, "timeout esperando al catálogo"
+        time.sleep(0.02)
+
+
+@pytest.mark.unit
+def test_carga_completa_y_busqueda(respuestas):
+    """La primera carga trae todo; se busca por id y por código (sin espacios extremos)."""
+    cola, pedidos = respuestas
+    cola.append([(1, "780", "Martillo", 5000, 3), (2, None, "Clavo", None, 100)])
+    c = Catalogo()
+    assert not c.cargado
+    assert c.refrescar() == 2
+    assert pedidos == [None] and c.cargado and len(c) == 2
+    assert c.por_codigo(" 780\n").nombre == "Martillo"
+    assert c.por_codigo("999") is None
+    assert c.producto(2).como_dict() == {"id": 2, "nombre": "Clavo", "precio": None, "stock": 100, "codigo": None}
+
+
+@pytest.mark.unit
+def test_incremental_relee_el_margen_y_aplica_cambios(respuestas):
+    """Los refrescos piden desde la marca anterior menos el margen y reemplazan registros."""
+    cola, pedidos = respuestas
+    cola.append([(1, "780", "Martillo", 5000, 3), (2, "781", "Clavo", 10, 100)])
+    c = Catalogo(margen=30)
+    c.refrescar()
+    version = c.version
+
+    # El código 780 pasa al producto 2 y el 1 queda sin código
+    cola.append([(2, "780", "Clavo", 12, 100), (1, None, "Martillo", 5000, 3)])
+    c.refrescar()
+    assert pedidos[1] == T0 + timedelta(minutes=1) - timedelta(seconds=30)
+    assert c.por_codigo("780").id == 2 and c.por_codigo("780").precio == 12
+    assert c.por_codigo("781") is None and len(c) == 2
+    assert c.version > version
+
+
+@pytest.mark.unit
+def test_recarga_completa_descarta_bajas(respuestas):
+    """Una recarga completa saca los productos eliminados en otras terminales."""
+    cola, pedidos = respuestas
+    cola.append([(1, "780", "Martillo", 5000, 3)])
+    c = Catalogo()
+    c.refrescar()
+    cola.append([])
+    c.refrescar(completo=True)
+    assert pedidos == [None, None] and len(c) == 0
+
+
+@pytest.mark.unit
+def test_actualizar_relee_y_quita_inexistentes(respuestas, monkeypatch):
+    """`actualizar` reemplaza los productos leídos y quita los que ya no existen."""
+    cola, _ = respuestas
+    cola.append([(1, "780", "Martillo", 5000, 3), (2, "781", "Clavo", 10, 100)])
+    c = Catalogo()
+    c.refrescar()
+    monkeypatch.setattr(producto_repo, "productos_por_id", lambda ids: [(1, "780", "Martillo", 5000, 1)])
+    c.actualizar([1, 2])
+    assert c.producto(1).stock == 1
+    assert c.producto(2) is None and c.por_codigo("781") is None
+
+
+@pytest.mark.unit
+def test_descontar_y_quitar_sin_escucha(respuestas):
+    """Sin escucha, las ventas locales restan stock en memoria y los precios no se sirven."""
+    cola, _ = respuestas
+    cola.append([(1, "780", "Martillo", 5000, 3)])
+    c = Catalogo()
+    c.refrescar()
+    c.descontar({1: 2, 99: 1})
+    assert c.por_codigo("780").stock == 1
+    assert c.precios([1]) == {}
+    c.quitar(1)
+    assert c.por_codigo("780") is None
+
+
+@pytest.mark.unit
+def test_avisos_con_cambio_de_precio_invalidan_reportes(respuestas, monkeypatch):
+    """Un aviso que solo cambia stock no toca la caché de reportes; uno con precio nuevo sí."""
+    cola, _ = respuestas
+    cola.append([(1, "780", "Martillo", 5000, 3)])
+    c = Catalogo()
+    c.refrescar()
+    invalidaciones = []
+    monkeypatch.setattr("services.catalogo.report_cache.invalidar", lambda fechas=None: invalidaciones.append(fechas))
+
+    monkeypatch.setattr(producto_repo, "productos_por_id", lambda ids: [(1, "780", "Martillo", 5000, 2)])
+    c._on_lote({"1"})
+    assert invalidaciones == []
+    monkeypatch.setattr(producto_repo, "productos_por_id", lambda ids: [(1, "780", "Martillo", 5500, 2)])
+    c._on_lote({"1"})
+    assert invalidaciones == [None]
+
+
+@pytest.mark.integration
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="PostgreSQL de prueba sólo en POSIX")
+def test_escucha_aplica_cambios_de_la_bd(postgres_db):
+    """Con LISTEN/NOTIFY el catálogo ve altas, cambios y bajas sin consultar a mano."""
+    producto_repo.crear("Martillo", precio=5000, stock=3, codigo="780")
+    catalogo.escuchar()
+    esperar(lambda: catalogo.al_dia)
+    id_prod = catalogo.por_codigo("780").id
+
+    # Cambios hechos directo en la BD (como desde otra terminal)
+    producto_repo.actualizar(id_prod, precio=5500, stock=1)
+    esperar(lambda: catalogo.producto(id_prod).stock == 1)
+    assert catalogo.precios([id_prod]) == {id_prod: 5500}
+    assert ProductoService().listar(stock_bajo=True)[0]["precio"] == 5500
+
+    producto_repo.crear("Clavo", precio=10, stock=100)
+    esperar(lambda: len(catalogo) == 2)
+    assert [p["nombre"] for p in ProductoService().listar(stock_bajo=True)] == ["Martillo"]
+
+    producto_repo.eliminar(id_prod)
+    esperar(lambda: catalogo.producto(id_prod) is None)
+    assert catalogo.por_codigo("780") is None
+
+
+@pytest.mark.integration
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="PostgreSQL de prueba sólo en POSIX")
+def test_preparar_venta_con_precios_del_catalogo(postgres_db):
+    """Con el catálogo al día los precios salen de memoria como ``int`` y se calcula el monto."""
+    producto_repo.crear("Martillo", precio=5000, stock=3, codigo="780")
+    catalogo.escuchar()
+    esperar(lambda: catalogo.al_dia)
+    id_prod = catalogo.por_codigo("780").id
+    assert type(catalogo.producto(id_prod).precio) is int
+
+    items = VentasService().preparar_items_venta({id_prod: {"var": Valor("2"), "nombre": "Martillo", "stock": 3}})
+    assert items[0]["monto_producto"] == 11900
@@ -2,6 +2,8 @@
 
 import pytest
 
+from repository import producto_repo
+from services.importacion import ArchivoInvalido
 from services.producto_service import ProductoService
 
 
@@ -16,26 +18,31 @@ class DummyRepo:
         self.listar_called = False
         self.export_path = "/tmp/inv.xlsx"
 
-    def crear(self, nombre, precio, stock):
+    def crear(self, nombre, precio, stock, codigo=None):
         """Registra los parámetros recibidos para crear un producto."""
-        self.crear_args = (nombre, precio, stock)
+        self.crear_args = (nombre, precio, stock) if codigo is None else (nombre, precio, stock, codigo)
 
     def eliminar(self, id_prod):
         """Registra el ID del producto a eliminar."""
         self.eliminar_args = id_prod
 
-    def actualizar(self, id_prod, precio, stock):
+    def actualizar(self, id_prod, precio, stock, codigo=producto_repo.SIN_CAMBIO):
         """Registra los parámetros para actualizar un producto."""
-        self.actualizar_args = (id_prod, precio, stock)
+        self.actualizar_args = (id_prod, precio, stock) if codigo is producto_repo.SIN_CAMBIO else (id_prod, precio, stock, codigo)
 
     def listar(self, *, stock_bajo=False, sin_precio=False):
         """Devuelve una lista de productos de ejemplo para pruebas."""
         self.listar_called = True
         return [{"id": 1, "nombre": "A", "precio": 10, "stock": 5}]
 
-    def exportar_excel(self):
+    def importar_lote(self, filas):
+        """Consume las filas validadas y las registra."""
+        self.importadas = list(filas)
+        return {"insertados": len(self.importadas), "actualizados": 0}
+
+    def exportar_excel(self, path=None, *, progreso=None):
         """Simula la exportación a Excel devolviendo una ruta ficticia."""
-        return self.export_path
+        return path or self.export_path
 
 
 @pytest.fixture
@@ -75,6 +82,8 @@ def test_modificar_delegacion(svc):
     srv, rep = svc
     srv.modificar(7, 55, 11)
     assert rep.actualizar_args == (7, 55, 11)
+    srv.modificar(7, 55, 11, codigo="  ")
+    assert rep.actualizar_args == (7, 55, 11, None)
 
 
 def test_exportar_excel(svc):
@@ -82,3 +91,47 @@ def test_exportar_excel(svc):
     srv, rep = svc
     path = srv.exportar_excel()
     assert path == rep.export_path
+
+
+def test_importar_valida_filas_y_reporta_errores(svc, tmp_path):
+    """Solo las filas válidas llegan al repo; el resto se informa con su número de fila."""
+    srv, rep = svc
+    archivo = tmp_path / "productos.csv"
+    archivo.write_text(
+        "Nombre;Precio;Stock;id\n"
+        "Clavo;100;5;1\n"
+        ";100;5;\n"
+        "Tornillo;abc;-1;\n"
+        "\n"
+        "Clavo;120;7;\n"
+        "Martillo;2500;0;\n",
+        encoding="utf-8",
+    )
+    res = srv.importar(str(archivo))
+
+    assert rep.importadas == [("Clavo", 100, 5), ("Martillo", 2500, 0)]
+    assert res["insertados"] == 2
+    assert [(e["fila"], e["nombre"]) for e in res["errores"]] == [(3, ""), (4, "Tornillo"), (6, "Clavo")]
+    assert "precio inválido" in res["errores"][1]["error"] and "stock inválido" in res["errores"][1]["error"]
+    assert "repetido (fila 2)" in res["errores"][2]["error"]
+
+
+def test_importar_xlsx_y_encabezados_faltantes(svc, tmp_path):
+    """Lee la primera hoja de un XLSX y rechaza archivos sin las columnas requeridas."""
+    from openpyxl import Workbook
+
+    srv, rep = svc
+    wb = Workbook()
+    wb.active.append(["nombre", "precio", "stock"])
+    wb.active.append(["Pala", 3000.0, 4])
+    wb.active.append(["Balde", 10.5, 1])
+    wb.save(tmp_path / "p.xlsx")
+    res = srv.importar(str(tmp_path / "p.xlsx"))
+    assert rep.importadas == [("Pala", 3000, 4)]
+    assert res["errores"][0]["fila"] == 3
+
+    (tmp_path / "malo.csv").write_text("nombre,stock\nX,1\n", encoding="utf-8")
+    with pytest.raises(ArchivoInvalido, match="precio"):
+        srv.importar(str(tmp_path / "malo.csv"))
+    with pytest.raises(ArchivoInvalido):
+        srv.importar(str(tmp_path / "p.txt"))
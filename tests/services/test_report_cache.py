@@ -0,0 +1,130 @@
+"""Unit tests for the report result cache."""
+
+import sys
+import time
+from datetime import date, timedelta
+
+import pytest
+
+from repository.ventas_repo import insertar_venta
+from services import report_cache
+from services.report_cache import ReportCache
+
+PASADO = (date(2024, 1, 1), date(2024, 1, 31))
+
+
+def contador():
+    """Devuelve una función de cálculo que cuenta sus invocaciones."""
+    n = []
+
+    def compute():
+        n.append(1)
+        return {"n": len(n)}
+
+    return compute, n
+
+
+@pytest.mark.unit
+def test_hit_y_copia_defensiva():
+    """El segundo acceso es un hit y mutar el resultado no altera la caché."""
+    c = ReportCache()
+    compute, n = contador()
+    r1 = c.get_or_compute("resumen", *PASADO, compute)
+    r1["n"] = 99
+    assert c.get_or_compute("resumen", *PASADO, compute) == {"n": 1}
+    assert len(n) == 1 and c.hits == 1 and c.misses == 1
+
+
+@pytest.mark.unit
+def test_invalidacion_precisa_por_fecha():
+    """Solo caen los rangos que contienen la fecha invalidada."""
+    c = ReportCache()
+    compute, n = contador()
+    c.get_or_compute("resumen", *PASADO, compute)
+    c.get_or_compute("resumen", date(2024, 2, 1), date(2024, 2, 29), compute)
+
+    c.invalidar(["2024-02-10"])
+    assert len(c) == 1
+    c.get_or_compute("resumen", *PASADO, compute)
+    assert len(n) == 2
+
+    c.invalidar()
+    assert len(c) == 0
+
+
+@pytest.mark.unit
+def test_lru_acotada():
+    """Con maxsize alcanzado se descarta la entrada usada hace más tiempo."""
+    c = ReportCache(maxsize=2)
+    compute, _ = contador()
+    c.get_or_compute("a", *PASADO, compute)
+    c.get_or_compute("b", *PASADO, compute)
+    c.get_or_compute("a", *PASADO, compute)  # "a" pasa a ser la más reciente
+    c.get_or_compute("c", *PASADO, compute)
+    hits = c.hits
+    c.get_or_compute("a", *PASADO, compute)
+    assert c.hits == hits + 1
+    c.get_or_compute("b", *PASADO, compute)
+    assert c.hits == hits + 1
+
+
+@pytest.mark.unit
+def test_rango_abierto_caduca():
+    """Un rango que incluye hoy caduca por ``ttl_abierto``; uno cerrado no, salvo con ``ttl_cerrado``."""
+    c = ReportCache(ttl_abierto=0)
+    compute, n = contador()
+    hoy = date.today()
+    c.get_or_compute("resumen", hoy - timedelta(days=7), hoy, compute)
+    c.get_or_compute("resumen", hoy - timedelta(days=7), hoy, compute)
+    assert len(n) == 2
+
+    c.get_or_compute("resumen", *PASADO, compute)
+    c.get_or_compute("resumen", *PASADO, compute)
+    assert len(n) == 3
+
+    # Opcional (caché sin escucha): los cerrados caducan a los ``ttl_cerrado`` segundos
+    c = ReportCache(ttl_cerrado=0)
+    c.get_or_compute("resumen", *PASADO, compute)
+    c.get_or_compute("resumen", *PASADO, compute)
+    assert len(n) == 5
+
+
+@pytest.mark.unit
+def test_no_guarda_si_se_invalido_durante_el_calculo():
+    """Un resultado calculado mientras se invalidaba su rango no se guarda."""
+    c = ReportCache()
+
+    def compute():
+        c.invalidar(["2024-01-15"])
+        return {"viejo": True}
+
+    assert c.get_or_compute("resumen", *PASADO, compute) == {"viejo": True}
+    assert len(c) == 0
+
+    def compute_otro():
+        c.invalidar(["2025-01-15"])
+        return {"ok": True}
+
+    c.get_or_compute("resumen", *PASADO, compute_otro)
+    assert len(c) == 1
+
+
+@pytest.mark.integration
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="PostgreSQL de prueba sólo en POSIX")
+def test_escucha_invalida_las_fechas_de_ventas_ajenas(postgres_db):
+    """Una venta registrada directo en la BD (otra terminal) invalida solo los rangos que la incluyen."""
+    report_cache.escuchar()
+    limite = time.monotonic() + 5
+    while not report_cache._escucha.conectado:
+        assert time.monotonic() < limite, "timeout esperando la escucha"
+        time.sleep(0.02)
+
+    compute, _ = contador()
+    report_cache.cache.get_or_compute("resumen", *PASADO, compute)
+    report_cache.cache.get_or_compute("resumen", date(2024, 2, 1), date(2024, 2, 29), compute)
+    insertar_venta({"fecha": "2024-01-15", "forma_pago": "efectivo", "monto_total": 0, "total_productos": 0}, [])
+
+    limite = time.monotonic() + 5
+    while len(report_cache.cache) != 1:
+        assert time.monotonic() < limite, "timeout esperando la invalidación"
+        time.sleep(0.02)
@@ -4,6 +4,15 @@ import pandas as pd
 import pytest
 
 from services import report_service
+from services.report_cache import cache
+
+
+@pytest.fixture(autouse=True)
+def _cache_vacia():
+    """Cada test parte con la caché de reportes vacía."""
+    cache.clear()
+    yield
+    cache.clear()
 
 
 def test_get_summary_report_rounding(monkeypatch):
@@ -15,6 +24,25 @@ def test_get_summary_report_rounding(monkeypatch):
     assert out == {"ventas_netas": 124, "cantidad_ventas": 2, "ticket_promedio": 61}
 
 
+def test_get_summary_report_usa_cache(monkeypatch):
+    """Repetir el mismo rango no vuelve a consultar; invalidar una fecha del rango sí."""
+    llamadas = []
+    raw = {"ventas_netas": 10, "cantidad_ventas": 1, "ticket_promedio": 10}
+    monkeypatch.setattr(report_service, "fetch_summary", lambda s, e: llamadas.append((s, e)) or raw)
+
+    rango = (date(2024, 5, 1), date(2024, 5, 31))
+    assert report_service.get_summary_report(*rango) == report_service.get_summary_report(*rango)
+    assert len(llamadas) == 1
+
+    cache.invalidar(["2024-06-01"])
+    report_service.get_summary_report(*rango)
+    assert len(llamadas) == 1
+
+    cache.invalidar(["2024-05-15"])
+    report_service.get_summary_report(*rango)
+    assert len(llamadas) == 2
+
+
 def test_get_top_reports_rounding(monkeypatch):
     raw_q = [{"nombre": "A", "total_cantidad": 5.0}]
     raw_r = [{"nombre": "A", "total_ingresos": 250.7}]
@@ -32,6 +60,44 @@ def test_get_top_reports_rounding(monkeypatch):
     assert p == [{"nombre": "A", "utilidad_total": 80}]
 
 
+def test_get_report_bundle_rounding(monkeypatch):
+    """get_report_bundle aplica el mismo redondeo que los reportes individuales."""
+    raw = {
+        "resumen": {"ventas_netas": 123.6, "cantidad_ventas": 2, "ticket_promedio": 61.8},
+        "top_cantidad": [{"nombre": "A", "total_cantidad": 5}],
+        "top_ingresos": [{"nombre": "A", "total_ingresos": 250.7}],
+        "top_utilidad": [{"nombre": "A", "utilidad_total": 80.2}],
+    }
+    monkeypatch.setattr(report_service, "fetch_report_bundle", lambda s, e: raw)
+    out = report_service.get_report_bundle(date(2025, 5, 1), date(2025, 5, 2))
+    assert out == {
+        "resumen": {"ventas_netas": 124, "cantidad_ventas": 2, "ticket_promedio": 62},
+        "top_cantidad": [{"nombre": "A", "total_cantidad": 5}],
+        "top_ingresos": [{"nombre": "A", "total_ingresos": 251}],
+        "top_utilidad": [{"nombre": "A", "utilidad_total": 80}],
+    }
+
+
+def test_get_sales_series_rounding_y_hoja_serie(monkeypatch, tmp_path):
+    """get_sales_series redondea y su resultado se exporta como hoja "Serie"."""
+    raw = [
+        {"periodo": date(2025, 5, 1), "ventas_netas": 100.6, "unidades": 3, "utilidad": 40.4, "cantidad_ventas": 2, "ticket_promedio": 50.3},
+        {"periodo": date(2025, 5, 2), "ventas_netas": 0, "unidades": 0, "utilidad": 0, "cantidad_ventas": 0, "ticket_promedio": 0},
+    ]
+    monkeypatch.setattr(report_service, "fetch_sales_series", lambda s, e, b: raw if b == "day" else [])
+    serie = report_service.get_sales_series(date(2025, 5, 1), date(2025, 5, 2))
+    assert serie[0] == {"periodo": "2025-05-01", "ventas_netas": 101, "unidades": 3, "utilidad": 40, "cantidad_ventas": 2, "ticket_promedio": 50}
+    assert serie[1]["ventas_netas"] == 0
+    # La granularidad forma parte de la clave de caché
+    assert report_service.get_sales_series(date(2025, 5, 1), date(2025, 5, 2), "month") == []
+
+    out = tmp_path / "serie.xlsx"
+    report_service.export_report({"Serie": serie}, "excel", str(out))
+    df = pd.read_excel(out, sheet_name="Serie")
+    assert list(df.columns) == ["Periodo", "Ventas Netas", "Unidades", "Utilidad", "Cantidad Ventas", "Ticket Promedio"]
+    assert len(df) == 2
+
+
 def test_export_report_excel(tmp_path):
     """Genera un Excel y comprueba su contenido."""
     data = {"Resumen": {"ventas_netas": 1000, "cantidad_ventas": 3, "ticket_promedio": 333}}
@@ -64,17 +130,17 @@ def test_get_comparison_report_nonzero(monkeypatch):
     prev_end = start - timedelta(days=1)
     prev_start = prev_end - timedelta(days=days - 1)
 
-    def fake_get_summary(s, e):
-        if s == start and e == end:
-            return actual
-        elif s == prev_start and e == prev_end:
-            return anterior
-        else:
-            pytest.skip(f"Called with unexpected dates: {s}–{e}")
+    llamadas = []
 
-    monkeypatch.setattr(report_service, "get_summary_report", fake_get_summary)
+    def fake_fetch_periods(periods):
+        llamadas.append(periods)
+        assert periods == [(start, end), (prev_start, prev_end)]
+        return [actual, anterior]
+
+    monkeypatch.setattr(report_service, "fetch_period_summaries", fake_fetch_periods)
 
     comp = report_service.get_comparison_report(start, end, days)
+    assert len(llamadas) == 1  # ambos periodos en una sola consulta
     assert comp["actual"] == actual
     assert comp["anterior"] == anterior
 
@@ -95,11 +161,11 @@ def test_get_comparison_report_zero_previous(monkeypatch):
     prev_end = start - timedelta(days=1)
     prev_start = prev_end - timedelta(days=days - 1)
 
-    def fake_get_summary(s, e):
-        # siempre devolvemos el mismo dict mockeado
-        return actual if (s == start and e == end) else anterior
+    def fake_fetch_periods(periods):
+        assert periods == [(start, end), (prev_start, prev_end)]
+        return [actual, anterior]
 
-    monkeypatch.setattr(report_service, "get_summary_report", fake_get_summary)
+    monkeypatch.setattr(report_service, "fetch_period_summaries", fake_fetch_periods)
 
     comp = report_service.get_comparison_report(start, end, days)
     assert comp["actual"] == actual
@@ -109,3 +175,30 @@ def test_get_comparison_report_zero_previous(monkeypatch):
     # - si actual > 0 variación = 1.0, pero aquí actual es cero → variación = 0.0
     for key, val in comp["variacion"].items():
         assert val == 0.0
+
+
+def test_month_periods_y_multi_period(monkeypatch):
+    """Los últimos N meses se resumen con una consulta y cada uno se compara con el previo."""
+    periods = report_service.month_periods(date(2025, 3, 10), 3)
+    assert periods == [
+        (date(2025, 1, 1), date(2025, 1, 31)),
+        (date(2025, 2, 1), date(2025, 2, 28)),
+        (date(2025, 3, 1), date(2025, 3, 10)),
+    ]
+    assert report_service.month_periods(date(2025, 1, 31), 2)[0] == (date(2024, 12, 1), date(2024, 12, 31))
+
+    llamadas = []
+    raws = [
+        {"ventas_netas": 100, "cantidad_ventas": 2, "ticket_promedio": 50},
+        {"ventas_netas": 150.4, "cantidad_ventas": 3, "ticket_promedio": 50.1},
+        {"ventas_netas": 0, "cantidad_ventas": 0, "ticket_promedio": 0},
+    ]
+    monkeypatch.setattr(report_service, "fetch_period_summaries", lambda p: llamadas.append(p) or raws)
+
+    filas = report_service.get_multi_period_report(periods)
+    assert len(llamadas) == 1
+    assert [(f["desde"], f["hasta"]) for f in filas] == periods
+    assert filas[1]["ventas_netas"] == 150
+    assert filas[0]["variacion"] == {}
+    assert filas[1]["variacion"]["ventas_netas"] == pytest.approx(0.5)
+    assert filas[2]["variacion"]["cantidad_ventas"] == pytest.approx(-1.0)
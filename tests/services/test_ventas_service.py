@@ -4,6 +4,7 @@ from decimal import ROUND_HALF_UP, Decimal
 
 import pytest
 
+from repository.ventas_repo import StockInsuficiente
 from services.ventas_service import StockError, VentasService
 
 
@@ -23,6 +24,12 @@ class DummyRepoVenta:
     def eliminar_venta(self, id_venta):
         """Simula la eliminación de una venta registrando el id."""
         self.deleted = id_venta
+        return ["2025-01-02"]
+
+    def eliminar_ventas(self, ids=None, *, rango=None):
+        """Simula la eliminación en bloque registrando los filtros."""
+        self.deleted = (ids, rango)
+        return ["2025-01-02", "2025-01-03", "2025-01-03"]
 
 
 class DummyRepoProd:
@@ -31,16 +38,30 @@ class DummyRepoProd:
     def __init__(self):
         """Inicializa las estructuras de control de DummyRepoProd."""
         self.descontados = []
+        self.consultas_precio = 0
 
     def obtener_precio(self, id_prod):
         """Devuelve un precio fijo (200) para cualquier producto."""
         return 200
 
+    def obtener_precios(self, ids):
+        """Devuelve el precio fijo (200) para cada id y cuenta las llamadas."""
+        self.consultas_precio += 1
+        return {i: 200 for i in ids}
+
     def descontar_stock(self, id_prod, cantidad):
         """Simula el descuento de stock almacenando la llamada."""
         self.descontados.append((id_prod, cantidad))
 
 
+@pytest.fixture
+def invalidaciones(monkeypatch):
+    """Registra las fechas que VentasService invalida en la caché de reportes."""
+    llamadas = []
+    monkeypatch.setattr("services.ventas_service.report_cache.invalidar", lambda fechas=None: llamadas.append(None if fechas is None else list(fechas)))
+    return llamadas
+
+
 @pytest.fixture
 def svc(monkeypatch):
     """Provee un VentasService parcheado con repositorios DummyRepoProd y DummyRepoVenta."""
@@ -85,8 +106,17 @@ def test_preparar_items_correcto(svc):
     assert it["monto_producto"] == esperado
 
 
-def test_crear_venta_invoca_repos(svc):
-    """Crea una venta, delega en el repo y descuenta stock en producto_repo."""
+def test_preparar_items_una_consulta_de_precios(svc):
+    """Un carrito grande resuelve todos sus precios con una sola llamada al repo."""
+    srv, repoP, _ = svc
+    cantidades = {i: {"var": type("V", (), {"get": lambda self: "1"})(), "nombre": f"P{i}", "stock": 5} for i in range(1, 51)}
+    items = srv.preparar_items_venta(cantidades)
+    assert len(items) == 50
+    assert repoP.consultas_precio == 1
+
+
+def test_crear_venta_invoca_repos(svc, invalidaciones):
+    """Crea una venta delegando todo (incluido el stock) en una sola llamada al repo."""
     srv, repoP, repoV = svc
     items = [
         {"id_producto": 1, "cantidad": 1, "monto_producto": 238},
@@ -101,5 +131,97 @@ def test_crear_venta_invoca_repos(svc):
     assert venta_dict["monto_total"] == 238 + 476
     assert venta_dict["total_productos"] == 1 + 2
 
-    # Verifica que descontó stock sobre producto_repo
-    assert set(repoP.descontados) == {(1, 1), (3, 2)}
+    assert passed_items == items
+    # El stock se descuenta dentro de la misma transacción de insertar_venta
+    assert repoP.descontados == []
+    assert invalidaciones == [["2025-05-02"]]
+
+
+def test_crear_venta_sin_stock_en_bd(svc, monkeypatch):
+    """Si la BD rechaza la venta por stock, se propaga StockError con el detalle."""
+    srv, _, repoV = svc
+    faltantes = [{"id_producto": 1, "nombre": "X", "solicitado": 3, "disponible": 1}]
+
+    def sin_stock(venta, items):
+        raise StockInsuficiente(faltantes)
+
+    monkeypatch.setattr(repoV, "insertar_venta", sin_stock)
+    with pytest.raises(StockError) as info:
+        srv.crear_venta(fecha="2025-05-02", forma_pago="efectivo", items=[{"id_producto": 1, "cantidad": 3, "monto_producto": 1}])
+    assert info.value.faltantes == faltantes
+
+
+def test_eliminar_ventas_delegacion(svc, invalidaciones):
+    """eliminar_ventas() delega ids y rango en el repositorio, devuelve el conteo e invalida esas fechas."""
+    srv, _, repoV = svc
+    assert srv.eliminar_ventas([1, 2], rango=("2025-01-01", "2025-01-31")) == 3
+    assert repoV.deleted == ([1, 2], ("2025-01-01", "2025-01-31"))
+    assert invalidaciones == [["2025-01-02", "2025-01-03", "2025-01-03"]]
+
+
+def test_eliminar_refresca_catalogo_cargado(svc, invalidaciones, monkeypatch):
+    """Eliminar ventas restaura stock en la BD: el catálogo en memoria (si está cargado) se refresca."""
+    srv, _, _ = svc
+
+    class FakeCatalogo:
+        cargado = True
+        refrescos = 0
+
+        def refrescar(self):
+            self.refrescos += 1
+
+    fake = FakeCatalogo()
+    monkeypatch.setattr("services.ventas_service.catalogo", fake)
+    srv.eliminar_venta(5)
+    srv.eliminar_ventas([1, 2])
+    assert fake.refrescos == 2
+
+    fake.cargado = False
+    srv.eliminar_venta(5)
+    assert fake.refrescos == 2
+
+
+def test_importar_ventas_valida_y_descarta_venta_completa(svc, invalidaciones, monkeypatch, tmp_path):
+    """Una línea inválida descarta toda su venta; los errores se combinan con los del repo."""
+    srv, _, repoV = svc
+    recibido = {}
+
+    def importar_lote(lineas, *, excluir=(), descontar_stock=False):
+        recibido["lineas"] = list(lineas)
+        recibido["excluir"] = set(excluir)
+        recibido["descontar_stock"] = descontar_stock
+        return {"ventas": 1, "lineas": 2, "fechas": ["2024-03-01"], "errores": [{"fila": 3, "clave": "B", "error": "venta descartada por errores en otras filas"}]}
+
+    monkeypatch.setattr(repoV, "importar_lote", importar_lote, raising=False)
+    archivo = tmp_path / "ventas.csv"
+    archivo.write_text(
+        "Venta;Fecha;Forma_pago;Producto;Cantidad;Monto\n"
+        "A;2024-03-01;efectivo;Tornillo;2;500\n"
+        "B;2024-03-02;;Tuerca;1;\n"
+        "A;2024-03-01;efectivo;Tuerca;1;\n"
+        "B;2024-03-02;;Clavo;0;\n"
+        "C;01/03/2024;;Clavo;1;\n",
+        encoding="utf-8",
+    )
+    res = srv.importar_ventas(str(archivo), descontar_stock=True)
+
+    assert recibido["lineas"] == [
+        (2, "A", "2024-03-01", "efectivo", "Tornillo", 2, 500),
+        (3, "B", "2024-03-02", None, "Tuerca", 1, None),
+        (4, "A", "2024-03-01", "efectivo", "Tuerca", 1, None),
+    ]
+    assert recibido["excluir"] == {"B", "C"}
+    assert recibido["descontar_stock"] is True
+    assert [e["fila"] for e in res["errores"]] == [3, 5, 6]
+    assert "cantidad" in res["errores"][1]["error"] and "fecha" in res["errores"][2]["error"]
+    assert (res["ventas"], res["lineas"]) == (1, 2)
+    assert invalidaciones == [["2024-03-01"]]
+
+
+def test_obtener_ventas_paginado(svc, monkeypatch):
+    """obtener_ventas() pasa rango, tamaño de página y clave de continuación al repo."""
+    srv, _, repoV = svc
+    llamadas = []
+    monkeypatch.setattr(repoV, "listar", lambda rango=None, **kw: llamadas.append((rango, kw)) or [], raising=False)
+    srv.obtener_ventas(("2025-01-01", "2025-01-31"), limite=50, despues=("2025-01-20", 7))
+    assert llamadas == [(("2025-01-01", "2025-01-31"), {"limite": 50, "despues": ("2025-01-20", 7)})]
@@ -0,0 +1 @@
+"""Paquete de tests del proyecto."""
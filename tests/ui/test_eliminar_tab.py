@@ -0,0 +1,24 @@
+"""Unit tests for the ID parser of EliminarTab."""
+
+import pytest
+
+from ui.ventas.eliminar_tab import MAX_IDS, _parse_ids
+
+
+@pytest.mark.unit
+def test_parse_ids_listas_y_rangos():
+    """Acepta IDs sueltos y rangos separados por comas, con espacios."""
+    assert _parse_ids(" 3, 7 , 10-12,") == [3, 7, 10, 11, 12]
+    for malo in ("", "a", "5-2", "1-x", "-"):
+        with pytest.raises(ValueError):
+            _parse_ids(malo)
+
+
+@pytest.mark.unit
+def test_parse_ids_rechaza_rangos_gigantes():
+    """Un rango (o la suma de varios) por encima de ``MAX_IDS`` se rechaza sin armar la lista."""
+    assert len(_parse_ids(f"1-{MAX_IDS}")) == MAX_IDS
+    with pytest.raises(ValueError, match="máximo"):
+        _parse_ids("1-999999999999")
+    with pytest.raises(ValueError, match="máximo"):
+        _parse_ids(f"1-{MAX_IDS}, {MAX_IDS + 1}")
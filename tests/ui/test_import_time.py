@@ -0,0 +1,42 @@
+"""Presupuesto de imports al arrancar (``python -X importtime -c "import app.main"``)."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parents[2]
+
+#: Paquetes pesados que solo deben cargarse al exportar o generar reportes.
+PROHIBIDOS = ("pandas", "numpy", "reportlab", "xlsxwriter", "openpyxl", "pyarrow")
+
+#: Tiempo acumulado máximo (µs) de ``import app.main``; holgado para CI lentos.
+PRESUPUESTO_US = 1_500_000
+
+
+def _importtime(modulo: str) -> dict[str, int]:
+    """Devuelve ``{módulo: microsegundos acumulados}`` según ``-X importtime``."""
+    res = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=RAIZ,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    tiempos = {}
+    for linea in res.stderr.splitlines():
+        if not linea.startswith("import time:") or "cumulative" in linea:
+            continue
+        _, acumulado, nombre = linea.split("|")
+        tiempos[nombre.strip()] = int(acumulado)
+    return tiempos
+
+
+@pytest.mark.unit
+def test_arranque_sin_imports_pesados():
+    """Abrir la aplicación no carga pandas/reportlab/xlsxwriter y respeta el presupuesto."""
+    tiempos = _importtime("app.main")
+    cargados = sorted({m.split(".")[0] for m in tiempos} & set(PROHIBIDOS))
+    assert cargados == [], f"Imports pesados al arrancar: {cargados}"
+    assert tiempos["app.main"] < PRESUPUESTO_US, f"import app.main tardó {tiempos['app.main'] / 1000:.0f} ms"
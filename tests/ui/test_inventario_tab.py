@@ -0,0 +1,28 @@
+"""Unit tests for the InventarioTab diff and filter helpers."""
+
+import pytest
+
+from repository.producto_repo import STOCK_BAJO
+from ui.ventas.inventario_tab import FILTROS, diferencias
+
+
+@pytest.mark.unit
+def test_diferencias_por_iid():
+    """Detecta filas quitadas, nuevas (en orden) y modificadas; las iguales no se tocan."""
+    mostradas = {"1": (1, "Martillo", 3), "2": (2, "Clavo", 100), "3": (3, "Tuerca", 5)}
+    nuevas = {"1": (1, "Martillo", 2), "3": (3, "Tuerca", 5), "4": (4, "Perno", 8), "5": (5, "Broca", 1)}
+    assert diferencias(mostradas, nuevas) == (["2"], ["4", "5"], ["1"])
+    assert diferencias(nuevas, nuevas) == ([], [], [])
+
+
+@pytest.mark.unit
+def test_filtros_en_memoria():
+    """Los filtros replican los de `producto_repo.listar`."""
+    prods = [
+        {"id": 1, "stock": STOCK_BAJO, "precio": 100},
+        {"id": 2, "stock": STOCK_BAJO + 1, "precio": None},
+        {"id": 3, "stock": 0, "precio": 0},
+    ]
+    assert [p["id"] for p in prods if FILTROS["todos"](p)] == [1, 2, 3]
+    assert [p["id"] for p in prods if FILTROS["stock_bajo"](p)] == [1, 3]
+    assert [p["id"] for p in prods if FILTROS["sin_precio"](p)] == [2]
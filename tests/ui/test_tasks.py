@@ -0,0 +1,108 @@
+"""Unit tests for the UI background task runner (sin display: ``after`` simulado)."""
+
+import threading
+from concurrent.futures import wait
+
+import pytest
+
+from ui.tasks import TaskRunner
+
+
+class FakeWidget:
+    """Widget mínimo: ``after`` encola callbacks y ``state`` se guarda en un dict."""
+
+    def __init__(self):
+        """Inicializa la cola de callbacks y las opciones."""
+        self.pendientes = []
+        self.opciones = {"state": "normal", "cursor": ""}
+
+    def after(self, _ms, fn, *args):
+        """Encola *fn* en lugar de programarla en el loop de Tk."""
+        self.pendientes.append((fn, args))
+
+    def cget(self, opcion):
+        """Devuelve una opción."""
+        return self.opciones[opcion]
+
+    def configure(self, **kw):
+        """Actualiza opciones."""
+        self.opciones.update(kw)
+
+
+def _drenar(widget, runner):
+    """Corre los sondeos hasta que no quedan trabajos (como haría el loop de Tk)."""
+    while widget.pendientes:
+        fn, args = widget.pendientes.pop(0)
+        wait([t.future for t in runner._tareas.values()], timeout=5)
+        fn(*args)
+
+
+@pytest.mark.unit
+def test_entrega_resultado_y_marca_ocupado():
+    """El resultado llega por on_done y el widget queda deshabilitado solo mientras corre."""
+    w, boton = FakeWidget(), FakeWidget()
+    runner = TaskRunner(w)
+    resultados = []
+    runner.submit("suma", lambda a, b=0: a + b, 2, b=3, on_done=resultados.append, busy=(boton,))
+    assert boton.opciones == {"state": "disabled", "cursor": "watch"}
+    assert runner.running("suma")
+
+    _drenar(w, runner)
+    assert resultados == [5]
+    assert boton.opciones == {"state": "normal", "cursor": ""}
+    assert not runner.running("suma")
+
+
+@pytest.mark.unit
+def test_pedido_nuevo_descarta_el_anterior():
+    """Un trabajo reemplazado no entrega su resultado aunque termine después."""
+    w = FakeWidget()
+    runner = TaskRunner(w)
+    liberar = threading.Event()
+    resultados = []
+
+    runner.submit("tabla", lambda: liberar.wait(5) and "viejo", on_done=resultados.append)
+    runner.submit("tabla", lambda: "nuevo", on_done=resultados.append)
+    liberar.set()
+    _drenar(w, runner)
+    assert resultados == ["nuevo"]
+
+
+@pytest.mark.unit
+def test_errores_y_cancelacion():
+    """Las excepciones van a on_error; cancel() descarta y restaura el widget."""
+    w, boton = FakeWidget(), FakeWidget()
+    boton.opciones["state"] = "disabled"  # ya deshabilitado: debe quedar así
+    runner = TaskRunner(w)
+    errores, resultados = [], []
+
+    def falla():
+        raise ValueError("boom")
+
+    runner.submit("a", falla, on_error=errores.append)
+    runner.submit("b", lambda: 1, on_done=resultados.append, busy=(boton,))
+    runner.cancel("b")
+    _drenar(w, runner)
+
+    assert [str(e) for e in errores] == ["boom"]
+    assert resultados == []
+    assert boton.opciones["state"] == "disabled"
+
+
+@pytest.mark.unit
+def test_escrituras_no_se_cancelan_ni_reemplazan():
+    """Dos escrituras con la misma clave corren ambas y cancel() no las toca."""
+    w = FakeWidget()
+    runner = TaskRunner(w)
+    liberar = threading.Event()
+    resultados = []
+
+    runner.submit("alta", lambda: liberar.wait(5) and "primera", on_done=resultados.append, escritura=True)
+    runner.submit("alta", lambda: "segunda", on_done=resultados.append, escritura=True)
+    runner.cancel()
+    runner.cancel("alta")
+    assert runner.running("alta")
+    liberar.set()
+    _drenar(w, runner)
+    assert sorted(resultados) == ["primera", "segunda"]
+    assert not runner.running("alta")
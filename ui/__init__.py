@@ -1,5 +1,6 @@
 """Package utils."""
 
 from .ui_utils import clear_frame, popup_error, popup_success
+from .tasks import TaskRunner
 
-__all__ = ["popup_error", "popup_success", "clear_frame"]
+__all__ = ["popup_error", "popup_success", "clear_frame", "TaskRunner"]
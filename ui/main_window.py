@@ -2,19 +2,35 @@
 
 from __future__ import annotations
 
+import logging
+import time
 import tkinter as tk
 from tkinter import ttk
 
 from app import __version__
+from services import report_cache
+from services.catalogo import catalogo
 from ui.ventas.eliminar_tab import EliminarTab
 from ui.ventas.historial_tab import HistorialTab
 from ui.ventas.ingreso_tab import IngresoTab
 from ui.ventas.inventario_tab import InventarioTab
 from ui.ventas.reportes_tab import ReportesTab
 
+logger = logging.getLogger(__name__)
+
+#: Espera (ms) entre pestañas precargadas, para no trabar la interacción.
+PRECARGA_MS = 150
+
 
 class MainWindow(tk.Tk):
-    """Contenedor raíz con todas las pestañas."""
+    """Contenedor raíz con todas las pestañas.
+
+    Las pestañas se construyen la primera vez que se seleccionan: al abrir
+    solo se arma la visible. Tras el primer frame se precargan, de a una,
+    las de ``PRECARGA`` (las que se suelen abrir a continuación) y el
+    catálogo de productos y la caché de reportes empiezan a escuchar
+    cambios en segundo plano.
+    """
 
     #: Mapa *Etiqueta → Clase de pestaña*
     TABS = {
@@ -25,17 +41,28 @@ class MainWindow(tk.Tk):
         " Eliminar Ventas ": EliminarTab,
     }
 
-    def __init__(self) -> None:
-        """Inicializa la ventana y construye los widgets."""
+    #: Pestañas que se construyen en segundo plano después del primer frame.
+    PRECARGA = (" Historial de Ventas ", " Control de Inventario ")
+
+    def __init__(self, inicio: float | None = None) -> None:
+        """Inicializa la ventana y construye los widgets.
+
+        Args:
+            inicio: ``time.perf_counter()`` del inicio del proceso (ver
+                ``app.main``); por defecto, el momento de crear la ventana.
+        """
+        self._inicio = time.perf_counter() if inicio is None else inicio
         super().__init__()
         self.title(f"Matex v{__version__} — Administrador de Ventas")
         self.geometry("900x600")
+        #: Milisegundos desde *inicio* hasta el primer frame dibujado.
+        self.arranque_ms: float | None = None
         self._build_ui()
 
     # ------------------------------------------------------------------ UI
     def _build_ui(self) -> None:
-        """Crea el Notebook y añade cada pestaña declarada en ``TABS``."""
-        notebook = ttk.Notebook(self)
+        """Crea el Notebook con un contenedor vacío por pestaña declarada en ``TABS``."""
+        self.notebook = notebook = ttk.Notebook(self)
         notebook.pack(fill="both", expand=True)
 
         # Barra de estado con la versión
@@ -48,7 +75,52 @@ class MainWindow(tk.Tk):
         )
         status.pack(fill="x", side="bottom")
 
-        # Cargar dinámicamente las pestañas
-        for label, TabClass in self.TABS.items():
-            frame = TabClass(notebook)  # Cada Tab hereda de ttk.Frame
+        # Contenedores vacíos; cada pestaña se arma al seleccionarla
+        self._contenedores: dict[str, ttk.Frame] = {}
+        self.tabs: dict[str, ttk.Frame] = {}
+        for label in self.TABS:
+            frame = ttk.Frame(notebook)
             notebook.add(frame, text=label)
+            self._contenedores[label] = frame
+
+        notebook.bind("<<NotebookTabChanged>>", self._on_tab_changed)
+        self._on_tab_changed()
+        # El primer <Expose> programa el dibujo del Notebook como tarea ociosa:
+        # un after_idle encolado después corre con la ventana ya pintada
+        self._expose = notebook.bind("<Expose>", self._on_expuesto)
+
+    def _on_expuesto(self, _evt) -> None:
+        self.notebook.unbind("<Expose>", self._expose)
+        self.after_idle(self._primer_frame)
+
+    def _on_tab_changed(self, _evt=None) -> None:
+        """Construye la pestaña seleccionada si todavía no existe."""
+        self._construir(self.notebook.tab(self.notebook.select(), "text"))
+
+    def _construir(self, label: str) -> None:
+        if label in self.tabs:
+            return
+        tab = self.TABS[label](self._contenedores[label])  # Cada Tab hereda de ttk.Frame
+        tab.pack(fill="both", expand=True)
+        self.tabs[label] = tab
+
+    def _primer_frame(self) -> None:
+        """Registra el tiempo de arranque, empieza la precarga y las escuchas de cambios."""
+        self.arranque_ms = (time.perf_counter() - self._inicio) * 1000
+        logger.info("Primer frame en %.0f ms", self.arranque_ms)
+        catalogo.escuchar()
+        report_cache.escuchar()
+        self.after(PRECARGA_MS, self._precargar, list(self.PRECARGA))
+
+    def destroy(self) -> None:
+        """Detiene las escuchas de cambios y cierra la ventana."""
+        catalogo.detener()
+        report_cache.detener()
+        super().destroy()
+
+    def _precargar(self, pendientes: list[str]) -> None:
+        """Construye la siguiente pestaña de *pendientes* y reprograma el resto."""
+        if not pendientes:
+            return
+        self._construir(pendientes.pop(0))
+        self.after(PRECARGA_MS, self._precargar, pendientes)
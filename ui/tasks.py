@@ -0,0 +1,184 @@
+"""Ejecución de llamadas a servicios en segundo plano para la interfaz.
+
+Tk no es *thread-safe*: los trabajos corren en un pool de hilos compartido
+por todas las pestañas y sus resultados se entregan en el hilo de Tk
+sondeando con ``after()``.
+
+Cada trabajo se identifica con una *clave* por pestaña (p. ej. ``"tabla"``):
+enviar otro con la misma clave cancela el anterior en el servidor (ver
+`repository.db.CancelToken`) y descarta su resultado aunque ya haya
+terminado, así una respuesta vieja nunca pisa a una más nueva. Eso vale
+solo para lecturas: las escrituras (``escritura=True``) nunca se cancelan
+ni se reemplazan, cada envío corre hasta el final y entrega su resultado.
+"""
+
+from __future__ import annotations
+
+import itertools
+import tkinter as tk
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from tkinter import ttk
+from typing import Any, Callable, Sequence
+
+from repository.db import CancelToken, cancel_scope
+from ui.ui_utils import popup_error
+
+#: Intervalo (ms) con que el hilo de Tk revisa los trabajos en curso.
+POLL_MS = 50
+
+# Hilos compartidos por todas las pestañas (cada uno toma su conexión del pool de BD)
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="ui")
+
+
+def _ejecutar(token: CancelToken, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+    """Corre *fn* en un hilo del pool asociando sus consultas a *token*."""
+    with cancel_scope(token):
+        return fn(*args, **kwargs)
+
+
+@dataclass
+class _Tarea:
+    clave: str
+    escritura: bool
+    future: Future
+    token: CancelToken
+    on_done: Callable[[Any], None] | None
+    on_error: Callable[[BaseException], None]
+    busy: Sequence[tk.Misc]
+
+
+class TaskRunner:
+    """Envía llamadas al pool y devuelve sus resultados en el hilo de Tk.
+
+    Args:
+        widget: Widget cuyo ``after()`` se usa para sondear (normalmente la
+            pestaña dueña de los trabajos).
+        poll_ms: Intervalo de sondeo en milisegundos.
+    """
+
+    def __init__(self, widget: tk.Misc, *, poll_ms: int = POLL_MS) -> None:
+        """Initialize the runner bound to *widget*."""
+        self.widget = widget
+        self.poll_ms = poll_ms
+        # Lecturas por clave; las escrituras con una clave interna única
+        self._tareas: dict[str, _Tarea] = {}
+        self._escrituras = itertools.count(1)
+        # Trabajos que marcan cada widget y su estado previo (para restaurarlo)
+        self._ocupados: dict[tk.Misc, int] = {}
+        self._previos: dict[tk.Misc, Any] = {}
+        self._sondeando = False
+
+    # ---------------------------------------------------------------- API
+    def submit(
+        self,
+        clave: str,
+        fn: Callable[..., Any],
+        *args: Any,
+        on_done: Callable[[Any], None] | None = None,
+        on_error: Callable[[BaseException], None] | None = None,
+        busy: Sequence[tk.Misc] = (),
+        escritura: bool = False,
+        **kwargs: Any,
+    ) -> Future:
+        """Ejecuta ``fn(*args, **kwargs)`` en segundo plano.
+
+        Args:
+            clave: Identifica el trabajo; una lectura anterior con la misma
+                clave se cancela y su resultado se descarta.
+            fn: Llamada a ejecutar (típicamente un método de servicio).
+            on_done: Recibe el resultado, en el hilo de Tk.
+            on_error: Recibe la excepción, en el hilo de Tk; por defecto se
+                muestra con `popup_error`.
+            busy: Widgets que se deshabilitan (cursor de espera) mientras
+                el trabajo está en curso.
+            escritura: El trabajo modifica datos: no cancela ni reemplaza a
+                otros y :meth:`cancel` no lo afecta.
+
+        Returns:
+            El ``Future`` del trabajo.
+        """
+        if escritura:
+            interna = f"{clave}#{next(self._escrituras)}"
+        else:
+            self.cancel(clave)
+            interna = clave
+        token = CancelToken()
+        future = _executor.submit(_ejecutar, token, fn, args, kwargs)
+        self._tareas[interna] = _Tarea(clave, escritura, future, token, on_done, on_error or _mostrar_error, tuple(busy))
+        self._marcar(busy)
+        if not self._sondeando:
+            self._sondeando = True
+            self.widget.after(self.poll_ms, self._poll)
+        return future
+
+    def cancel(self, clave: str | None = None) -> None:
+        """Cancela la lectura *clave* (o todas si es ``None``) y descarta su resultado.
+
+        Las escrituras en curso no se tocan.
+        """
+        for c in list(self._tareas) if clave is None else [clave]:
+            tarea = self._tareas.get(c)
+            if tarea is not None and not tarea.escritura:
+                del self._tareas[c]
+                tarea.token.cancel()
+                tarea.future.cancel()
+                self._desmarcar(tarea.busy)
+
+    def running(self, clave: str) -> bool:
+        """Indica si hay un trabajo *clave* en curso."""
+        return any(t.clave == clave for t in self._tareas.values())
+
+    # ---------------------------------------------------------------- internos
+    def _poll(self) -> None:
+        """Entrega los trabajos terminados y reprograma el sondeo (hilo de Tk)."""
+        for clave, tarea in [(c, t) for c, t in self._tareas.items() if t.future.done()]:
+            if self._tareas.get(clave) is not tarea:
+                continue  # cancelado o reemplazado por un callback anterior
+            del self._tareas[clave]
+            self._desmarcar(tarea.busy)
+            exc = tarea.future.exception()
+            if exc is not None:
+                tarea.on_error(exc)
+            elif tarea.on_done is not None:
+                tarea.on_done(tarea.future.result())
+
+        if self._tareas:
+            self.widget.after(self.poll_ms, self._poll)
+        else:
+            self._sondeando = False
+
+    def _marcar(self, widgets: Sequence[tk.Misc]) -> None:
+        for w in widgets:
+            self._ocupados[w] = self._ocupados.get(w, 0) + 1
+            if self._ocupados[w] == 1:
+                self._previos[w] = _set_ocupado(w, True)
+
+    def _desmarcar(self, widgets: Sequence[tk.Misc]) -> None:
+        for w in widgets:
+            self._ocupados[w] -= 1
+            if self._ocupados[w] == 0:
+                del self._ocupados[w]
+                _set_ocupado(w, False, self._previos.pop(w))
+
+
+def _set_ocupado(widget: tk.Misc, ocupado: bool, previo: Any = None) -> Any:
+    """Deshabilita (o restaura a *previo*) un widget y devuelve su estado anterior."""
+    try:
+        if isinstance(widget, ttk.Widget):
+            anterior = widget.instate(["disabled"])
+            if ocupado:
+                widget.state(["disabled"])
+            elif not previo:
+                widget.state(["!disabled"])
+        else:
+            anterior = widget.cget("state")
+            widget.configure(state="disabled" if ocupado else previo)
+        widget.configure(cursor="watch" if ocupado else "")
+    except tk.TclError:
+        return previo  # widget destruido o sin opción ``state``
+    return anterior
+
+
+def _mostrar_error(exc: BaseException) -> None:
+    popup_error(str(exc))
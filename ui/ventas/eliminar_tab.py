@@ -3,18 +3,51 @@
 from __future__ import annotations
 
 import tkinter as tk
+from tkinter import messagebox
+
+from tkcalendar import DateEntry
 
 from services.ventas_service import VentasService
-from ui import clear_frame, popup_error, popup_success
+from ui import TaskRunner, clear_frame, popup_error, popup_success
+
+
+#: IDs que se pueden eliminar de una vez (un rango mal tipeado no arma una lista gigante).
+MAX_IDS = 10_000
+
+
+def _parse_ids(texto: str) -> list[int]:
+    """Convierte ``"3, 7, 10-15"`` en la lista de IDs correspondiente.
+
+    Raises:
+        ValueError: Si algún fragmento no es un entero o rango válido, o si
+            en total hay más de ``MAX_IDS`` IDs; el mensaje indica cuál.
+    """
+    ids: list[int] = []
+    for parte in texto.replace(" ", "").split(","):
+        if not parte:
+            continue
+        try:
+            desde, hasta = (int(x) for x in parte.split("-", 1)) if "-" in parte else (int(parte),) * 2
+        except ValueError:
+            raise ValueError(parte) from None
+        if hasta < desde:
+            raise ValueError(parte)
+        if len(ids) + hasta - desde + 1 > MAX_IDS:
+            raise ValueError(f"{parte} (máximo {MAX_IDS} ventas por vez)")
+        ids.extend(range(desde, hasta + 1))
+    if not ids:
+        raise ValueError(texto)
+    return ids
 
 
 class EliminarTab(tk.Frame):
-    """Frame Tkinter que permite eliminar una venta por ID."""
+    """Frame Tkinter que permite eliminar ventas por ID o por rango de fechas."""
 
     def __init__(self, parent: tk.Misc):
         """Initialize the eliminar tab."""
         super().__init__(parent)
         self.service = VentasService()
+        self.tasks = TaskRunner(self)
         self._build_widgets()
 
     # ------------------------------------------------------------------ UI
@@ -22,32 +55,71 @@ class EliminarTab(tk.Frame):
         """Crea los widgets dentro de la pestaña."""
         clear_frame(self)
         tk.Label(self, text="Ingrese el ID de la venta a eliminar:").pack(pady=10)
+        tk.Label(self, text="(varios: 3, 7, 10-15)", fg="gray").pack()
 
         self.id_var = tk.StringVar()
-        tk.Entry(self, textvariable=self.id_var, width=10).pack()
+        tk.Entry(self, textvariable=self.id_var, width=20).pack()
 
-        tk.Button(
+        self.btn_eliminar = tk.Button(
             self,
             text="Eliminar",
             command=self._eliminar,
             bg="red",
             fg="white",
-        ).pack(pady=20)
+        )
+        self.btn_eliminar.pack(pady=20)
+
+        # Eliminación masiva por rango de fechas
+        tk.Label(self, text="O elimine todas las ventas entre dos fechas:").pack(pady=10)
+        fechas = tk.Frame(self)
+        fechas.pack()
+        tk.Label(fechas, text="Desde:").pack(side="left")
+        self.f_desde = DateEntry(fechas, date_pattern="yyyy-mm-dd", width=12)
+        self.f_desde.pack(side="left", padx=5)
+        tk.Label(fechas, text="Hasta:").pack(side="left")
+        self.f_hasta = DateEntry(fechas, date_pattern="yyyy-mm-dd", width=12)
+        self.f_hasta.pack(side="left", padx=5)
+
+        self.btn_eliminar_rango = tk.Button(
+            self,
+            text="Eliminar rango",
+            command=self._eliminar_rango,
+            bg="red",
+            fg="white",
+        )
+        self.btn_eliminar_rango.pack(pady=20)
 
     # ---------------------------------------------------------------- Acciones
     def _eliminar(self) -> None:
-        """Valida el ID y solicita a VentasService que elimine la venta."""
+        """Valida los IDs y solicita a VentasService que elimine las ventas."""
         try:
-            id_venta = int(self.id_var.get())
-        except ValueError:
-            popup_error("ID no válido")
+            ids = _parse_ids(self.id_var.get())
+        except ValueError as exc:
+            popup_error(f"ID no válido: {exc}")
             return
 
-        try:
-            self.service.eliminar_venta(id_venta)
-        except ValueError as exc:
-            popup_error(str(exc))
+        def listo(n):
+            popup_success(f"Venta #{ids[0]} eliminada" if len(ids) == 1 else f"{n} ventas eliminadas")
+            self.id_var.set("")
+
+        fn, args = (self.service.eliminar_venta, ids[:1]) if len(ids) == 1 else (self.service.eliminar_ventas, [ids])
+        self.tasks.submit("eliminar", fn, *args, on_done=listo, busy=(self.btn_eliminar, self.btn_eliminar_rango), escritura=True)
+
+    def _eliminar_rango(self) -> None:
+        """Pide confirmación y elimina todas las ventas del rango elegido."""
+        desde = self.f_desde.get_date()
+        hasta = self.f_hasta.get_date()
+        if hasta < desde:
+            popup_error("La fecha hasta debe ser igual o posterior a la fecha desde.")
+            return
+        if not messagebox.askyesno("Confirmar", f"¿Eliminar TODAS las ventas entre {desde:%Y-%m-%d} y {hasta:%Y-%m-%d}?"):
             return
 
-        popup_success(f"Venta #{id_venta} eliminada")
-        self.id_var.set("")
+        self.tasks.submit(
+            "eliminar",
+            self.service.eliminar_ventas,
+            rango=(desde.strftime("%Y-%m-%d"), hasta.strftime("%Y-%m-%d")),
+            on_done=lambda n: popup_success(f"{n} ventas eliminadas"),
+            busy=(self.btn_eliminar, self.btn_eliminar_rango),
+            escritura=True,
+        )
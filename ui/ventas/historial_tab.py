@@ -4,22 +4,38 @@ from __future__ import annotations
 
 import tkinter as tk
 from tkinter import ttk
-from typing import Tuple
+from typing import Any, Tuple
 
 from tkcalendar import DateEntry
 
 from services.ventas_service import VentasService
-from ui import clear_frame, popup_success
+from ui import TaskRunner, clear_frame, popup_error, popup_success
 from utils.format_utils import format_money
 
 
+#: Ventas pedidas por página al desplazarse.
+PAGE_SIZE = 200
+#: Fracción del scroll a partir de la cual se trae la página siguiente.
+_UMBRAL = 0.9
+
+
 class HistorialTab(ttk.Frame):
-    """Frame con tabla de ventas y filtros por rango de fechas."""
+    """Frame con tabla de ventas y filtros por rango de fechas.
+
+    El historial se carga por páginas a medida que el usuario se acerca al
+    final de la tabla, así abrir la pestaña no depende del total de ventas.
+    """
 
     def __init__(self, parent: ttk.Notebook):
         """Initialize the historial tab."""
         super().__init__(parent)
         self.service = VentasService()
+        self.tasks = TaskRunner(self)
+        # Rango del último filtro aplicado; se respeta al exportar
+        self._rango: Tuple[str, str] | None = None
+        # Clave (fecha, id) de la última fila cargada y si ya no quedan más
+        self._ultima: Tuple[Any, int] | None = None
+        self._agotado = False
         self._build_widgets()
         self._update_table()
 
@@ -42,7 +58,16 @@ class HistorialTab(ttk.Frame):
 
         ttk.Button(filtros, text="Buscar", command=self._buscar).pack(side="left", padx=5)
         ttk.Button(filtros, text="🔄", width=3, command=self._update_table).pack(side="left", padx=5)
-        ttk.Button(filtros, text="Exportar a Excel", command=self._exportar).pack(side="left", padx=5)
+        exportar = ttk.Menubutton(filtros, text="Exportar ▾")
+        menu = tk.Menu(exportar, tearoff=False)
+        menu.add_command(label="Excel", command=self._exportar)
+        menu.add_command(label="CSV (ventas)", command=lambda: self._exportar_como("csv", "ventas"))
+        menu.add_command(label="CSV (detalle)", command=lambda: self._exportar_como("csv", "detalle"))
+        menu.add_command(label="Parquet (ventas)", command=lambda: self._exportar_como("parquet", "ventas"))
+        menu.add_command(label="Parquet (detalle)", command=lambda: self._exportar_como("parquet", "detalle"))
+        exportar["menu"] = menu
+        exportar.pack(side="left", padx=5)
+        self.btn_exportar = exportar
 
         # Tabla
         frame_tabla = ttk.Frame(self)
@@ -57,17 +82,39 @@ class HistorialTab(ttk.Frame):
             self.tree.heading(col, text=col)
             self.tree.column(col, width=w)
 
+        self.scroll = ttk.Scrollbar(frame_tabla, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.scroll.pack(side="right", fill="y")
         self.tree.pack(fill="both", expand=True)
         self.tree.bind("<Double-1>", self._detalle)
 
-        ttk.Scrollbar(frame_tabla, orient="vertical", command=self.tree.yview).pack(side="right", fill="y")
-
     # ---------------------------------------------------------------- Acciones
     def _update_table(self, rango: Tuple[str, str] | None = None) -> None:
-        """Rellena la tabla con el historial; opcionalmente filtra por fechas."""
+        """Reinicia la tabla con la primera página del historial; opcionalmente filtra por fechas."""
+        self._rango = rango
+        self._ultima = None
+        self._agotado = False
+        self.tasks.cancel("pagina")  # una página del filtro anterior ya no sirve
         self.tree.delete(*self.tree.get_children())
+        self._cargar_pagina()
+
+    def _cargar_pagina(self) -> None:
+        """Pide en segundo plano la siguiente página de ventas."""
+        if self._agotado or self.tasks.running("pagina"):
+            return
+        self.tasks.submit(
+            "pagina",
+            self.service.obtener_ventas,
+            self._rango,
+            limite=PAGE_SIZE,
+            despues=self._ultima,
+            on_done=self._agregar_pagina,
+            busy=(self.tree,),
+        )
 
-        for v in self.service.obtener_ventas(rango):
+    def _agregar_pagina(self, ventas: list[dict]) -> None:
+        """Agrega a la tabla una página recibida."""
+        for v in ventas:
             self.tree.insert(
                 "",
                 "end",
@@ -79,6 +126,18 @@ class HistorialTab(ttk.Frame):
                     format_money(v["monto"]),
                 ),
             )
+        if ventas:
+            self._ultima = (ventas[-1]["fecha"], ventas[-1]["id"])
+        self._agotado = len(ventas) < PAGE_SIZE
+        # Si la página no llena la vista, la barra no se mueve: seguir pidiendo
+        self._on_scroll(*self.tree.yview())
+
+    def _on_scroll(self, primero: str | float, ultimo: str | float) -> None:
+        """Actualiza la barra y pide otra página al acercarse al final."""
+        self.scroll.set(primero, ultimo)
+        # Oculta (pestaña no visible) la vista "cabe todo" no significa nada
+        if float(ultimo) >= _UMBRAL and self.tree.winfo_viewable():
+            self._cargar_pagina()
 
     def _buscar(self) -> None:
         rango = (
@@ -93,8 +152,9 @@ class HistorialTab(ttk.Frame):
             return
 
         id_venta = int(self.tree.item(item, "values")[0])
-        productos = self.service.ver_detalle_venta(id_venta)
+        self.tasks.submit("detalle", self.service.ver_detalle_venta, id_venta, on_done=lambda productos: self._mostrar_detalle(id_venta, productos))
 
+    def _mostrar_detalle(self, id_venta: int, productos: list[dict]) -> None:
         win = tk.Toplevel(self)
         win.title(f"Detalle venta #{id_venta}")
 
@@ -111,5 +171,36 @@ class HistorialTab(ttk.Frame):
             )
 
     def _exportar(self) -> None:
-        path = self.service.exportar_ventas_excel()
+        self.tasks.submit(
+            "exportar",
+            self.service.exportar_ventas_excel,
+            rango=self._rango,
+            on_done=self._exportado,
+            busy=(self.btn_exportar,),
+            escritura=True,
+        )
+
+    def _exportar_como(self, formato: str, tabla: str) -> None:
+        """Exporta ventas o su detalle (rango filtrado) a CSV o Parquet."""
+        fn = self.service.exportar_ventas_csv if formato == "csv" else self.service.exportar_ventas_parquet
+        self.tasks.submit(
+            "exportar",
+            fn,
+            tabla=tabla,
+            rango=self._rango,
+            on_done=self._exportado,
+            on_error=self._error_exportar,
+            busy=(self.btn_exportar,),
+            escritura=True,
+        )
+
+    @staticmethod
+    def _exportado(path: str) -> None:
         popup_success(f"Archivo guardado en:\n{path}")
+
+    @staticmethod
+    def _error_exportar(exc: BaseException) -> None:
+        if isinstance(exc, ImportError):
+            popup_error("La exportación a Parquet requiere el paquete 'pyarrow'.")
+        else:
+            popup_error(str(exc))
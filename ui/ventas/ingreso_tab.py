@@ -1,4 +1,10 @@
-"""Pestaña para registrar una nueva venta."""
+"""Pestaña para registrar una nueva venta.
+
+Los productos se eligen en una tabla con búsqueda incremental por nombre y
+se acumulan en un carrito. La búsqueda corre en el servidor
+(`producto_repo.buscar`, con índices) y trae a lo sumo ``MAX_RESULTADOS``
+coincidencias, así ni la consulta ni la tabla crecen con el catálogo.
+"""
 
 from __future__ import annotations
 
@@ -9,19 +15,35 @@ from typing import Dict
 
 from tkcalendar import DateEntry
 
+from services.catalogo import catalogo
 from services.ventas_service import StockError, VentasService
-from ui import clear_frame, popup_error, popup_success
+from ui import TaskRunner, clear_frame, popup_error, popup_success
 from utils.format_utils import format_money
 
+#: Filas de la tabla de productos; si hay más coincidencias se pide afinar la búsqueda.
+MAX_RESULTADOS = 300
+#: Espera (ms) tras la última tecla antes de buscar.
+_DEBOUNCE_MS = 150
+#: Intervalo (ms) entre refrescos del catálogo cuando no hay escucha de cambios.
+REFRESCO_CODIGOS_MS = 15_000
+
 
 class IngresoTab(ttk.Frame):
-    """Formulario de venta con listado de productos y cálculo de totales."""
+    """Formulario de venta con buscador de productos, carrito y cálculo de totales."""
 
     def __init__(self, parent: ttk.Notebook):
         """Initialize the ingreso tab."""
         super().__init__(parent)
         self.service = VentasService()
+        self.tasks = TaskRunner(self)
+        # id_producto → (nombre, stock) de los resultados en pantalla
+        self._productos: Dict[int, tuple[str, int]] = {}
+        # Carrito: id_producto → {"var", "nombre", "stock"} (formato de preparar_items_venta)
+        self.carrito: Dict[int, Dict] = {}
+        self._debounce: str | None = None
+        self._escaneos = 0
         self._build_widgets()
+        self._refrescar_codigos()
 
     # ------------------------------------------------------------------ GUI
     def _build_widgets(self) -> None:
@@ -47,11 +69,12 @@ class IngresoTab(ttk.Frame):
             width=20,
         ).grid(row=1, column=1)
 
-        # Canvas de productos con scroll
-        self._build_canvas()
+        # Buscador + tabla de productos
+        self._build_buscador()
 
-        # Detalles de la venta confirmada
+        # Detalles de la venta confirmada y carrito
         self._build_detalles()
+        self._build_carrito()
 
         # Botones principales
         ttk.Button(
@@ -61,36 +84,57 @@ class IngresoTab(ttk.Frame):
             style="Accent.TButton",
         ).grid(row=4, column=0, columnspan=2, pady=10)
 
-        ttk.Button(self, text="Guardar venta", command=self._guardar).grid(row=5, column=0, columnspan=2, pady=5)
+        self.btn_guardar = ttk.Button(self, text="Guardar venta", command=self._guardar)
+        self.btn_guardar.grid(row=5, column=0, columnspan=2, pady=5)
 
+        self.grid_rowconfigure(3, weight=1)
+        self.grid_columnconfigure(1, weight=1)
         self._cargar_productos()
 
-    def _build_canvas(self) -> None:
-        """Crea el canvas que aloja la lista de productos con scroll."""
-        self.canvas = tk.Canvas(self, height=350, width=400)
-        self.canvas.grid(row=3, column=0, columnspan=2, padx=10, sticky="nsew")
-
-        scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.canvas.yview)
-        scrollbar.grid(row=3, column=2, sticky="ns")
-        self.canvas.configure(yscrollcommand=scrollbar.set)
-
-        self.products_frame = ttk.Frame(self.canvas)
-        self.canvas.create_window((0, 0), window=self.products_frame, anchor="nw")
-        self.products_frame.bind(
-            "<Configure>",
-            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")),
-        )
-
-        # Scroll con rueda del mouse
-        def _on_mousewheel(event):
-            if event.num == 4 or event.delta > 0:
-                self.canvas.yview_scroll(-1, "units")
-            elif event.num == 5 or event.delta < 0:
-                self.canvas.yview_scroll(1, "units")
+    def _build_buscador(self) -> None:
+        """Crea el campo del escáner, el de búsqueda y la tabla de productos."""
+        busqueda = ttk.Frame(self)
+        busqueda.grid(row=2, column=0, columnspan=3, padx=10, sticky="ew")
+        busqueda.grid_columnconfigure(3, weight=1)
+
+        # Modo escáner: el lector tipea el código y Enter
+        ttk.Label(busqueda, text="Código:").grid(row=0, column=0, sticky="w")
+        self.codigo_var = tk.StringVar()
+        self.codigo_entry = ttk.Entry(busqueda, textvariable=self.codigo_var, width=16)
+        self.codigo_entry.grid(row=0, column=1, padx=(5, 15))
+        self.codigo_entry.bind("<Return>", lambda _e: self._escanear())
+
+        ttk.Label(busqueda, text="Buscar producto:").grid(row=0, column=2, sticky="w")
+        self.buscar_var = tk.StringVar()
+        self.buscar_var.trace_add("write", lambda *_: self._programar_filtro())
+        entry = ttk.Entry(busqueda, textvariable=self.buscar_var)
+        entry.grid(row=0, column=3, padx=5, sticky="ew")
+        entry.bind("<Return>", lambda _e: self._agregar_seleccion())
+        entry.bind("<Down>", lambda _e: self._enfocar_tabla())
 
-        self.canvas.bind_all("<MouseWheel>", _on_mousewheel)  # Windows/macOS
-        self.canvas.bind_all("<Button-4>", _on_mousewheel)  # Linux
-        self.canvas.bind_all("<Button-5>", _on_mousewheel)
+        frame = ttk.Frame(self)
+        frame.grid(row=3, column=0, columnspan=3, padx=10, sticky="nsew")
+
+        self.tree = ttk.Treeview(frame, columns=("Producto", "Stock"), show="headings", selectmode="browse", height=14)
+        self.tree.heading("Producto", text="Producto")
+        self.tree.heading("Stock", text="Stock")
+        self.tree.column("Producto", width=300)
+        self.tree.column("Stock", width=70, anchor="e")
+        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        self.tree.pack(fill="both", expand=True)
+        self.tree.bind("<Double-1>", lambda _e: self._agregar_seleccion())
+        self.tree.bind("<Return>", lambda _e: self._agregar_seleccion())
+
+        barra = ttk.Frame(frame)
+        barra.pack(fill="x", pady=5)
+        ttk.Label(barra, text="Cantidad:").pack(side="left")
+        self.cant_var = tk.StringVar(value="1")
+        ttk.Spinbox(barra, from_=1, to=9999, textvariable=self.cant_var, width=6).pack(side="left", padx=5)
+        ttk.Button(barra, text="Agregar ➜", command=self._agregar_seleccion).pack(side="left", padx=5)
+        self.lbl_resultados = ttk.Label(barra, text="", foreground="gray")
+        self.lbl_resultados.pack(side="right")
 
     def _build_detalles(self) -> None:
         frame = ttk.Frame(self)
@@ -101,36 +145,171 @@ class IngresoTab(ttk.Frame):
         self.resumen_lbl = ttk.Label(frame, text="Aquí aparecerán los detalles...", justify="left")
         self.resumen_lbl.pack(anchor="w")
 
-    # ---------------------------------------------------------------- Lógica
+    def _build_carrito(self) -> None:
+        """Crea la tabla del carrito con la acción de quitar ítems."""
+        frame = ttk.Frame(self)
+        frame.grid(row=3, column=3, padx=20, sticky="nsew")
+
+        ttk.Label(frame, text="🛒 Carrito").pack(anchor="w")
+        self.tree_carrito = ttk.Treeview(frame, columns=("Producto", "Cant."), show="headings", height=10)
+        self.tree_carrito.heading("Producto", text="Producto")
+        self.tree_carrito.heading("Cant.", text="Cant.")
+        self.tree_carrito.column("Producto", width=200)
+        self.tree_carrito.column("Cant.", width=60, anchor="e")
+        self.tree_carrito.pack(fill="both", expand=True)
+        self.tree_carrito.bind("<Delete>", lambda _e: self._quitar_seleccion())
+        ttk.Button(frame, text="Quitar", command=self._quitar_seleccion).pack(anchor="e", pady=5)
+
+    # ---------------------------------------------------------------- Productos
     def _refresh(self) -> None:
         """Recarga productos y limpia el formulario."""
         self._cargar_productos()
+        self._vaciar_carrito()
         self.resumen_lbl.config(text="Aquí aparecerán los detalles…")
         if hasattr(self, "items_confirmados"):
             del self.items_confirmados
 
     def _cargar_productos(self) -> None:
-        """Llena el canvas con productos obtenidos del servicio."""
-        self.cantidades: Dict[int, Dict] = {}
-        for w in self.products_frame.winfo_children():
-            w.destroy()
-
-        for i, (id_prod, nombre, stock) in enumerate(self.service.producto_repo.obtener_productos()):
-            ttk.Label(self.products_frame, text=f"{nombre} (Stock: {stock})").grid(row=i, column=0, sticky="w")
-            var = tk.StringVar(value="0")
-            ttk.Entry(self.products_frame, textvariable=var, width=5).grid(row=i, column=1)
-            self.cantidades[id_prod] = {"var": var, "nombre": nombre, "stock": stock}
+        """Busca en segundo plano los productos que coinciden y luego actualiza la tabla."""
+        self._debounce = None
+        self.tasks.submit(
+            "productos",
+            self.service.producto_repo.buscar,
+            self.buscar_var.get(),
+            limite=MAX_RESULTADOS + 1,
+            on_done=self._mostrar_productos,
+        )
 
+    def _mostrar_productos(self, productos: list[dict]) -> None:
+        """Muestra los resultados; si solo cambió el stock, toca únicamente esas filas."""
+        hay_mas = len(productos) > MAX_RESULTADOS
+        productos = productos[:MAX_RESULTADOS]
+        nuevos = {p["id"]: (p["nombre"], p["stock"]) for p in productos}
+        anteriores, self._productos = self._productos, nuevos
+        for id_prod, datos in self.carrito.items():
+            if id_prod in nuevos:
+                datos["stock"] = nuevos[id_prod][1]
+
+        if hay_mas:
+            self.lbl_resultados.config(text=f"Mostrando los primeros {MAX_RESULTADOS}; afine la búsqueda")
+        else:
+            self.lbl_resultados.config(text=f"{len(productos)} productos")
+
+        # Mismos resultados en el mismo orden (p. ej. tras guardar una venta)
+        if list(anteriores) == list(nuevos) and all(anteriores[i][0] == nuevos[i][0] for i in nuevos):
+            for id_prod, (_nombre, stock) in nuevos.items():
+                if anteriores[id_prod][1] != stock:
+                    self.tree.set(str(id_prod), "Stock", stock)
+            return
+        self.tree.delete(*self.tree.get_children())
+        for id_prod, (nombre, stock) in nuevos.items():
+            self.tree.insert("", "end", iid=str(id_prod), values=(nombre, stock))
+        if productos:
+            self.tree.selection_set(str(productos[0]["id"]))
+
+    def _programar_filtro(self) -> None:
+        """Busca cuando el usuario deja de escribir ``_DEBOUNCE_MS``."""
+        if self._debounce is not None:
+            self.after_cancel(self._debounce)
+        self._debounce = self.after(_DEBOUNCE_MS, self._cargar_productos)
+
+    def _enfocar_tabla(self) -> None:
+        hijos = self.tree.get_children()
+        if hijos:
+            self.tree.focus_set()
+            self.tree.focus(self.tree.selection()[0] if self.tree.selection() else hijos[0])
+
+    # ---------------------------------------------------------------- Escáner
+    def _refrescar_codigos(self) -> None:
+        """Sin escucha activa, trae en segundo plano los cambios del catálogo; se reprograma."""
+        if not catalogo.al_dia:
+            self.tasks.submit("codigos", catalogo.refrescar, on_error=lambda _exc: None)
+        self.after(REFRESCO_CODIGOS_MS, self._refrescar_codigos)
+
+    def _escanear(self) -> None:
+        """Agrega una unidad del producto leído por el escáner (desde el catálogo en memoria).
+
+        Si el código no está en memoria y la escucha no está activa, el
+        catálogo puede estar atrasado: se consulta la BD antes de rechazarlo.
+        """
+        codigo = self.codigo_var.get().strip()
+        self.codigo_var.set("")
+        producto = catalogo.por_codigo(codigo)
+        if producto is not None:
+            self._agregar_escaneado(producto.id, producto.nombre, producto.stock)
+        elif codigo and not catalogo.al_dia:
+            self._escaneos += 1
+            self.tasks.submit(
+                f"escaneo:{self._escaneos}",
+                self.service.producto_repo.buscar_por_codigo,
+                codigo,
+                on_done=lambda p: self._escaneado_en_bd(codigo, p),
+            )
+        else:
+            self._codigo_desconocido(codigo)
+
+    def _escaneado_en_bd(self, codigo: str, producto: Dict | None) -> None:
+        if producto is None:
+            self._codigo_desconocido(codigo)
+        else:
+            self._agregar_escaneado(producto["id"], producto["nombre"], producto["stock"])
+
+    def _agregar_escaneado(self, id_prod: int, nombre: str, stock: int) -> None:
+        stock = self._productos.get(id_prod, (nombre, stock))[1]
+        self._sumar_al_carrito(id_prod, nombre, stock, 1)
+        self.lbl_resultados.config(text=f"+1 {nombre}")
+
+    def _codigo_desconocido(self, codigo: str) -> None:
+        self.bell()
+        self.lbl_resultados.config(text=f"Código desconocido: {codigo}")
+
+    # ---------------------------------------------------------------- Carrito
+    def _agregar_seleccion(self) -> None:
+        """Suma al carrito el producto seleccionado con la cantidad indicada."""
+        seleccion = self.tree.selection()
+        if not seleccion:
+            return
+        try:
+            cantidad = int(self.cant_var.get())
+        except ValueError:
+            cantidad = 0
+        if cantidad <= 0:
+            popup_error("La cantidad debe ser un entero positivo")
+            return
+        id_prod = int(seleccion[0])
+        nombre, stock = self._productos[id_prod]
+        self._sumar_al_carrito(id_prod, nombre, stock, cantidad)
+        self.cant_var.set("1")
+
+    def _sumar_al_carrito(self, id_prod: int, nombre: str, stock: int, cantidad: int) -> None:
+        item = self.carrito.get(id_prod)
+        if item is None:
+            item = self.carrito[id_prod] = {"var": tk.StringVar(value="0"), "nombre": nombre, "stock": stock}
+            self.tree_carrito.insert("", "end", iid=str(id_prod), values=(nombre, 0))
+        total = int(item["var"].get()) + cantidad
+        item["var"].set(str(total))
+        self.tree_carrito.set(str(id_prod), "Cant.", total)
+
+    def _quitar_seleccion(self) -> None:
+        for iid in self.tree_carrito.selection():
+            self.carrito.pop(int(iid), None)
+            self.tree_carrito.delete(iid)
+
+    def _vaciar_carrito(self) -> None:
+        self.carrito = {}
+        self.tree_carrito.delete(*self.tree_carrito.get_children())
+
+    # ---------------------------------------------------------------- Venta
     def _confirmar(self) -> None:
         """Valida stock y muestra resumen antes de guardar."""
         try:
-            items = self.service.preparar_items_venta(self.cantidades)
+            items = self.service.preparar_items_venta(self.carrito)
         except StockError as exc:
             popup_error(str(exc))
             return
 
         if not items:
-            popup_error("Debes seleccionar al menos un producto")
+            popup_error("Debes agregar al menos un producto al carrito")
             return
 
         total_prod = sum(i["cantidad"] for i in items)
@@ -152,17 +331,29 @@ class IngresoTab(ttk.Frame):
             popup_error("Confirma la venta antes de guardarla.")
             return
 
-        try:
-            id_venta = self.service.crear_venta(
-                fecha=self.fecha_entry.get_date().strftime("%Y-%m-%d"),
-                forma_pago=self.forma_pago_var.get(),
-                items=self.items_confirmados,
-            )
-        except Exception as exc:  # noqa: BLE001
-            popup_error(f"Ocurrió un error: {exc}")
-            return
+        self.tasks.submit(
+            "guardar",
+            self.service.crear_venta,
+            fecha=self.fecha_entry.get_date().strftime("%Y-%m-%d"),
+            forma_pago=self.forma_pago_var.get(),
+            items=self.items_confirmados,
+            on_done=self._guardada,
+            on_error=self._error_guardar,
+            busy=(self.btn_guardar,),
+            escritura=True,
+        )
 
+    def _guardada(self, id_venta: int) -> None:
         popup_success(f"Venta #{id_venta} registrada correctamente")
         self.resumen_lbl.config(text="Aquí aparecerán los detalles...")
+        self._vaciar_carrito()
         self._cargar_productos()
         del self.items_confirmados
+
+    def _error_guardar(self, exc: BaseException) -> None:
+        if isinstance(exc, StockError):
+            lineas = [f"• {f['nombre']}: pedido {f['solicitado']}, disponible {f['disponible']}" for f in exc.faltantes]
+            popup_error("Otra terminal vendió parte del stock:\n" + "\n".join(lineas) if lineas else str(exc))
+            self._refresh()
+            return
+        popup_error(f"Ocurrió un error: {exc}")
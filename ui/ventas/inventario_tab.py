@@ -1,14 +1,68 @@
-"""Pestaña para visualizar y gestionar el inventario."""
+"""Pestaña para visualizar y gestionar el inventario.
+
+La tabla se actualiza por diferencias: el inventario completo se lee en
+segundo plano (ya formateado), se filtra en memoria y solo se insertan,
+modifican o quitan las filas que cambiaron, identificadas por id. Mientras
+el inventario leído esté fresco, cambiar de filtro no consulta la BD.
+"""
 
 from __future__ import annotations
 
+import time
 import tkinter as tk
-from tkinter import ttk
+from tkinter import filedialog, ttk
+from typing import Any, Callable, Mapping
 
+from repository.producto_repo import STOCK_BAJO
+from services.catalogo import catalogo
 from services.producto_service import ProductoService
-from ui import clear_frame, popup_error, popup_success
+from ui import TaskRunner, clear_frame, popup_error, popup_success
 from utils.format_utils import format_money
 
+#: Resultados por página de la búsqueda por nombre.
+PAGE_SIZE = 200
+#: Fracción del scroll a partir de la cual se trae la página siguiente.
+_UMBRAL = 0.9
+#: Espera (ms) tras la última tecla antes de buscar.
+_DEBOUNCE_MS = 250
+#: Segundos que el inventario leído se considera fresco si el catálogo en
+#: memoria no está escuchando cambios (con escucha, hasta el próximo cambio).
+FRESCO_S = 30.0
+#: Intervalo (ms) con que la pestaña revisa si el catálogo en memoria cambió.
+VIGILAR_MS = 500
+
+#: Filtros de la tabla, aplicados en memoria sobre el inventario completo.
+FILTROS: dict[str, Callable[[dict[str, Any]], bool]] = {
+    "todos": lambda p: True,
+    "stock_bajo": lambda p: p["stock"] <= STOCK_BAJO,
+    "sin_precio": lambda p: p["precio"] is None,
+}
+
+# (producto, iid, valores de la fila) de cada producto del inventario leído
+Fila = tuple[dict[str, Any], str, tuple]
+
+
+def diferencias(mostradas: Mapping[str, tuple], nuevas: Mapping[str, tuple]) -> tuple[list[str], list[str], list[str]]:
+    """Compara las filas en pantalla con las nuevas, por iid.
+
+    Returns:
+        ``(quitar, agregar, cambiar)``: iids que ya no están, los nuevos (en
+        el orden de *nuevas*) y los que siguen pero con otros valores.
+    """
+    quitar = [iid for iid in mostradas if iid not in nuevas]
+    agregar, cambiar = [], []
+    for iid, valores in nuevas.items():
+        previos = mostradas.get(iid)
+        if previos is None:
+            agregar.append(iid)
+        elif previos != valores:
+            cambiar.append(iid)
+    return quitar, agregar, cambiar
+
+
+def _valores(p: dict[str, Any]) -> tuple:
+    return (p["id"], p["codigo"] or "", p["nombre"], format_money(int(p["precio"] or 0)), p["stock"])
+
 
 class InventarioTab(ttk.Frame):
     """Frame con tabla de productos, filtros y acciones CRUD."""
@@ -17,8 +71,22 @@ class InventarioTab(ttk.Frame):
         """Initialize the inventario tab."""
         super().__init__(parent)
         self.service = ProductoService()
+        self.tasks = TaskRunner(self)
+        # Inventario completo leído, cuándo y con qué versión del catálogo
+        self._inventario: list[Fila] | None = None
+        self._leido_en = 0.0
+        self._version = -1
+        # Filtro activo y filas en pantalla (iid → valores, en orden de id)
+        self._filtro = "todos"
+        self._filas: dict[str, tuple] = {}
+        # Búsqueda por nombre en curso ("" = listado por filtros)
+        self._texto = ""
+        self._offset = 0
+        self._agotado = True
+        self._debounce: str | None = None
         self._build_widgets()
         self._update_table()
+        self.after(VIGILAR_MS, self._vigilar)
 
     # ------------------------------------------------------------------ UI
     def _build_widgets(self) -> None:
@@ -32,49 +100,226 @@ class InventarioTab(ttk.Frame):
         ttk.Button(btns, text="Ver todos", command=self._update_table).pack(side="left", padx=5)
         ttk.Button(btns, text="Stock bajo", command=lambda: self._update_table(stock_bajo=True)).pack(side="left", padx=5)
         ttk.Button(btns, text="Sin precio", command=lambda: self._update_table(sin_precio=True)).pack(side="left", padx=5)
-        ttk.Button(btns, text="Exportar a Excel", command=self._exportar).pack(side="left", padx=5)
+        exportar = ttk.Menubutton(btns, text="Exportar ▾")
+        menu = tk.Menu(exportar, tearoff=False)
+        menu.add_command(label="Excel", command=self._exportar)
+        menu.add_command(label="CSV", command=lambda: self._exportar_como("csv"))
+        menu.add_command(label="Parquet", command=lambda: self._exportar_como("parquet"))
+        exportar["menu"] = menu
+        exportar.pack(side="left", padx=5)
+        self.btn_exportar = exportar
         ttk.Button(btns, text="Agregar Producto", command=self._nuevo).pack(side="left", padx=5)
+        self.btn_importar = ttk.Button(btns, text="Importar…", command=self._importar)
+        self.btn_importar.pack(side="left", padx=5)
         ttk.Button(btns, text="Eliminar Producto", command=self._eliminar).pack(side="left", padx=5)
 
+        # Búsqueda por nombre (en el servidor, por páginas)
+        barra = ttk.Frame(self)
+        barra.pack(fill="x", padx=10)
+        ttk.Label(barra, text="Buscar:").pack(side="left")
+        self.buscar_var = tk.StringVar()
+        self.buscar_var.trace_add("write", lambda *_: self._programar_busqueda())
+        ttk.Entry(barra, textvariable=self.buscar_var, width=40).pack(side="left", padx=5)
+
         # Tabla
         frame_tabla = ttk.Frame(self)
         frame_tabla.pack(fill="both", expand=True, padx=10, pady=10)
 
         self.tree = ttk.Treeview(
             frame_tabla,
-            columns=("ID", "Producto", "Precio", "Stock"),
+            columns=("ID", "Código", "Producto", "Precio", "Stock"),
             show="headings",
         )
-        for col, w in zip(("ID", "Producto", "Precio", "Stock"), (50, 250, 100, 100)):
+        for col, w in zip(("ID", "Código", "Producto", "Precio", "Stock"), (50, 120, 250, 100, 100)):
             self.tree.heading(col, text=col)
             self.tree.column(col, width=w)
 
+        self.scroll = ttk.Scrollbar(frame_tabla, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.scroll.pack(side="right", fill="y")
         self.tree.pack(fill="both", expand=True)
         self.tree.bind("<Double-1>", self._editar)
 
-        ttk.Scrollbar(frame_tabla, orient="vertical", command=self.tree.yview).pack(side="right", fill="y")
-
-    # ---------------------------------------------------------------- Acciones
+    # ---------------------------------------------------------------- Tabla
     def _update_table(self, *, stock_bajo: bool = False, sin_precio: bool = False):
-        """Refresca la tabla según los filtros activos."""
+        """Muestra el inventario con el filtro pedido (en memoria si lo leído está fresco)."""
+        self._filtro = "stock_bajo" if stock_bajo else "sin_precio" if sin_precio else "todos"
+        # Los filtros reemplazan a la búsqueda por nombre
+        if self._texto:
+            self.tasks.cancel("tabla")
+            self._vaciar()
+        self._texto, self._agotado = "", True
+        self.buscar_var.set("")
+        if self._fresco():
+            self._aplicar_filtro()
+        else:
+            self._recargar()
+
+    def _fresco(self) -> bool:
+        if self._inventario is None:
+            return False
+        if catalogo.al_dia:
+            return catalogo.version == self._version
+        return time.monotonic() - self._leido_en < FRESCO_S
+
+    def _recargar(self, *, busy: bool = True) -> None:
+        """Relee el inventario completo en segundo plano y actualiza la tabla por diferencias."""
+        version = catalogo.version
+        self.tasks.submit(
+            "tabla",
+            self._leer_inventario,
+            on_done=lambda filas: self._inventario_leido(filas, version),
+            busy=(self.tree,) if busy else (),
+        )
+
+    def _leer_inventario(self) -> list[Fila]:
+        # Corre en un hilo del pool: el formateo no ocupa al hilo de Tk
+        return [(p, str(p["id"]), _valores(p)) for p in self.service.listar()]
+
+    def _inventario_leido(self, filas: list[Fila], version: int) -> None:
+        self._inventario, self._version, self._leido_en = filas, version, time.monotonic()
+        if not self._texto:
+            self._aplicar_filtro()
+
+    def _aplicar_filtro(self) -> None:
+        cumple = FILTROS[self._filtro]
+        self._sincronizar({iid: valores for p, iid, valores in self._inventario or () if cumple(p)})
+
+    def _sincronizar(self, filas: dict[str, tuple]) -> None:
+        """Lleva la tabla a *filas* (ordenadas por id) tocando solo las que cambiaron."""
+        quitar, agregar, cambiar = diferencias(self._filas, filas)
+        if quitar:
+            self.tree.delete(*quitar)
+        for iid in cambiar:
+            self.tree.item(iid, values=filas[iid])
+        if agregar:
+            nuevos = set(agregar)
+            # Tras quitar, las filas que quedan ya están en orden: cada nueva va en su posición final
+            for pos, iid in enumerate(filas):
+                if iid in nuevos:
+                    self.tree.insert("", pos, iid=iid, values=filas[iid])
+        self._filas = filas
+
+    def _vaciar(self) -> None:
         self.tree.delete(*self.tree.get_children())
-        prods = self.service.listar(stock_bajo=stock_bajo, sin_precio=sin_precio)
+        self._filas = {}
+
+    def _vigilar(self) -> None:
+        """Trae los cambios del catálogo en memoria (de esta u otra terminal) si la tabla está a la vista."""
+        if (
+            catalogo.al_dia
+            and catalogo.version != self._version
+            and self._inventario is not None
+            and not self._texto
+            and not self.tasks.running("tabla")
+            and self.tree.winfo_viewable()
+        ):
+            self._recargar(busy=False)
+        self.after(VIGILAR_MS, self._vigilar)
+
+    def _refrescar_vista(self) -> None:
+        """Vuelve a leer lo que se está mostrando (búsqueda o inventario filtrado)."""
+        if self._texto:
+            self._texto = ""
+            self._buscar()
+        else:
+            self._recargar()
+
+    def _insertar(self, prods: list[dict]) -> None:
         for p in prods:
-            self.tree.insert(
-                "",
-                "end",
-                values=(
-                    p["id"],
-                    p["nombre"],
-                    format_money(int(p["precio"])),
-                    p["stock"],
-                ),
-            )
+            self.tree.insert("", "end", values=_valores(p))
+
+    def _programar_busqueda(self) -> None:
+        """Busca cuando el usuario deja de escribir ``_DEBOUNCE_MS``."""
+        if self._debounce is not None:
+            self.after_cancel(self._debounce)
+        self._debounce = self.after(_DEBOUNCE_MS, self._buscar)
+
+    def _buscar(self) -> None:
+        """Reinicia la tabla con la primera página de resultados del texto buscado."""
+        self._debounce = None
+        texto = self.buscar_var.get().strip()
+        if texto == self._texto:
+            return
+        if not texto:
+            self._update_table()
+            return
+        self._texto, self._offset, self._agotado = texto, 0, False
+        self.tasks.cancel("tabla")
+        self._vaciar()
+        self._cargar_pagina()
+
+    def _cargar_pagina(self) -> None:
+        """Pide en segundo plano la siguiente página de la búsqueda."""
+        if self._agotado or self.tasks.running("tabla"):
+            return
+        self.tasks.submit(
+            "tabla",
+            self.service.buscar,
+            self._texto,
+            limite=PAGE_SIZE,
+            offset=self._offset,
+            on_done=self._agregar_pagina,
+            busy=(self.tree,),
+        )
+
+    def _agregar_pagina(self, prods: list[dict]) -> None:
+        self._insertar(prods)
+        self._offset += len(prods)
+        self._agotado = len(prods) < PAGE_SIZE
+        # Si la página no llena la vista, la barra no se mueve: seguir pidiendo
+        self._on_scroll(*self.tree.yview())
+
+    def _on_scroll(self, primero: str | float, ultimo: str | float) -> None:
+        """Actualiza la barra y pide otra página al acercarse al final."""
+        self.scroll.set(primero, ultimo)
+        if float(ultimo) >= _UMBRAL and self.tree.winfo_viewable():
+            self._cargar_pagina()
 
     def _exportar(self) -> None:
-        ruta = self.service.exportar_excel()
+        self.tasks.submit("exportar", self.service.exportar_excel, on_done=self._exportado, busy=(self.btn_exportar,), escritura=True)
+
+    def _exportar_como(self, formato: str) -> None:
+        fn = self.service.exportar_csv if formato == "csv" else self.service.exportar_parquet
+        self.tasks.submit("exportar", fn, on_done=self._exportado, on_error=self._error_exportar, busy=(self.btn_exportar,), escritura=True)
+
+    @staticmethod
+    def _exportado(ruta: str) -> None:
         popup_success(f"Inventario exportado a:\n{ruta}")
 
+    @staticmethod
+    def _error_exportar(exc: BaseException) -> None:
+        if isinstance(exc, ImportError):
+            popup_error("La exportación a Parquet requiere el paquete 'pyarrow'.")
+        else:
+            popup_error(str(exc))
+
+    def _importar(self) -> None:
+        """Importa productos desde CSV/XLSX y muestra las filas rechazadas."""
+        path = filedialog.askopenfilename(filetypes=[("Planillas", "*.csv *.xlsx"), ("CSV", "*.csv"), ("Excel", "*.xlsx")])
+        if not path:
+            return
+        self.tasks.submit("importar", self.service.importar, path, on_done=self._importado, busy=(self.btn_importar,), escritura=True)
+
+    def _importado(self, res: dict) -> None:
+        self._refrescar_vista()
+
+        resumen = f"Nuevos: {res['insertados']}   Actualizados: {res['actualizados']}   Rechazados: {len(res['errores'])}"
+        if not res["errores"]:
+            popup_success(resumen)
+            return
+
+        win = tk.Toplevel(self)
+        win.title("Resultado de la importación")
+        ttk.Label(win, text=resumen).pack(padx=10, pady=5)
+        tree = ttk.Treeview(win, columns=("Fila", "Nombre", "Error"), show="headings", height=15)
+        for col, w in zip(("Fila", "Nombre", "Error"), (60, 200, 360)):
+            tree.heading(col, text=col)
+            tree.column(col, width=w)
+        for e in res["errores"]:
+            tree.insert("", "end", values=(e["fila"], e["nombre"], e["error"]))
+        tree.pack(fill="both", expand=True, padx=10, pady=10)
+
     # ------------ CRUD rápido por diálogos ---------------------------
     def _nuevo(self) -> None:
         """Ventana modal para dar de alta un producto."""
@@ -93,17 +338,25 @@ class InventarioTab(ttk.Frame):
         stock = tk.StringVar()
         ttk.Entry(win, textvariable=stock).pack()
 
+        ttk.Label(win, text="Código (opcional):").pack(pady=5)
+        codigo = tk.StringVar()
+        ttk.Entry(win, textvariable=codigo).pack()
+
+        def listo(_):
+            popup_success("Producto agregado")
+            win.destroy()
+            self._refrescar_vista()
+
         def guardar():
             try:
-                self.service.alta(nombre.get(), int(precio.get()), int(stock.get()))
-            except Exception as exc:
+                datos = (nombre.get(), int(precio.get()), int(stock.get()), codigo.get())
+            except ValueError as exc:
                 popup_error(str(exc))
                 return
-            popup_success("Producto agregado")
-            win.destroy()
-            self._update_table()
+            self.tasks.submit("alta", self.service.alta, *datos, on_done=listo, busy=(btn,), escritura=True)
 
-        ttk.Button(win, text="Guardar", command=guardar).pack(pady=10)
+        btn = ttk.Button(win, text="Guardar", command=guardar)
+        btn.pack(pady=10)
 
     def _eliminar(self) -> None:
         item = self.tree.focus()
@@ -111,17 +364,19 @@ class InventarioTab(ttk.Frame):
             popup_error("Selecciona un producto.")
             return
         id_prod = int(self.tree.item(item, "values")[0])
-        self.service.baja(id_prod)
+        self.tasks.submit("baja", self.service.baja, id_prod, on_done=self._eliminado, escritura=True)
+
+    def _eliminado(self, _) -> None:
         popup_success("Producto eliminado")
-        self._update_table()
+        self._refrescar_vista()
 
     def _editar(self, _evt) -> None:
-        """Abre un diálogo para editar precio y stock."""
+        """Abre un diálogo para editar precio, stock y código."""
         item = self.tree.focus()
         if not item:
             return
 
-        id_prod, nombre, precio, stock = self.tree.item(item, "values")  # type: ignore[misc]
+        id_prod, codigo, nombre, precio, stock = self.tree.item(item, "values")  # type: ignore[misc]
 
         win = tk.Toplevel(self)
         win.title(f"Editar: {nombre}")
@@ -136,14 +391,22 @@ class InventarioTab(ttk.Frame):
         stock_var = tk.StringVar(value=str(stock))
         ttk.Entry(win, textvariable=stock_var).pack()
 
+        ttk.Label(win, text="Código:").pack()
+        codigo_var = tk.StringVar(value=str(codigo))
+        ttk.Entry(win, textvariable=codigo_var).pack()
+
+        def listo(_):
+            popup_success("Producto actualizado")
+            win.destroy()
+            self._refrescar_vista()
+
         def confirmar():
             try:
-                self.service.modificar(int(id_prod), int(precio_var.get()), int(stock_var.get()))
-            except Exception as exc:
+                datos = (int(id_prod), int(precio_var.get()), int(stock_var.get()), codigo_var.get())
+            except ValueError as exc:
                 popup_error(str(exc))
                 return
-            popup_success("Producto actualizado")
-            win.destroy()
-            self._update_table()
+            self.tasks.submit("modificar", self.service.modificar, *datos, on_done=listo, busy=(btn,), escritura=True)
 
-        ttk.Button(win, text="Confirmar", command=confirmar).pack(pady=15)
+        btn = ttk.Button(win, text="Confirmar", command=confirmar)
+        btn.pack(pady=15)
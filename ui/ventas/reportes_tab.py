@@ -1,18 +1,28 @@
-"""Proporciona la pestaña de interfaz de usuario para generar y exportar informes de ventas."""
+"""Proporciona la pestaña de interfaz de usuario para generar y exportar informes de ventas.
+
+Los reportes se calculan en paralelo en segundo plano (`ui.TaskRunner`) y
+los resultados se vuelcan a las tablas desde el hilo de Tk.
+"""
 
 from datetime import timedelta
+from functools import partial
 from tkinter import filedialog, messagebox, ttk
 
+from psycopg2.extensions import QueryCanceledError
 from tkcalendar import DateEntry
 
 from services.report_service import (
-    ExportError,
     export_report,
-    get_summary_report,
-    get_top_profit_report,
-    get_top_quantity_report,
-    get_top_revenue_report,
+    get_comparison_report,
+    get_report_bundle,
+    get_sales_series,
 )
+from ui import TaskRunner
+
+# Granularidades de la pestaña "Serie" → bucket de `get_sales_series`
+_BUCKETS = {"Día": "day", "Semana": "week", "Mes": "month"}
+#: Claves (en el `TaskRunner`) de los trabajos que arman un reporte.
+_REPORTES = ("bundle", "serie", "comparativo")
 
 
 class ReportesTab(ttk.Frame):
@@ -42,6 +52,14 @@ class ReportesTab(ttk.Frame):
         self.btn_generar = ttk.Button(self, text="Generar reporte", command=self.on_generate_report)
         self.btn_generar.grid(row=0, column=6, padx=5, pady=5)
 
+        # ─── Progreso y cancelación ───────────────────────────────────────────────
+        self.progress = ttk.Progressbar(self, mode="determinate", length=160)
+        self.progress.grid(row=2, column=0, padx=5, pady=5, sticky="w")
+        self.lbl_estado = ttk.Label(self, text="")
+        self.lbl_estado.grid(row=2, column=1, padx=5, pady=5, sticky="w")
+        self.btn_cancelar = ttk.Button(self, text="Cancelar", command=self.on_cancel, state="disabled")
+        self.btn_cancelar.grid(row=2, column=4, padx=5, pady=5, sticky="w")
+
         # ─── Botones de exportación (inicialmente deshabilitados) ────────────────
         self.btn_export_excel = ttk.Button(self, text="Exportar Excel", command=self.on_export_excel, state="disabled")
         self.btn_export_excel.grid(row=2, column=2, padx=5, pady=5, sticky="e")
@@ -60,6 +78,7 @@ class ReportesTab(ttk.Frame):
             ("Top Ingresos", ["nombre", "total_ingresos"]),
             ("Top Utilidad", ["nombre", "utilidad_total"]),
             ("Comparativo", ["Métrica", "Actual", "Anterior", "Variación"]),
+            ("Serie", ["periodo", "ventas_netas", "unidades", "utilidad", "cantidad_ventas", "ticket_promedio"]),
         ]
 
         for title, cols in tabs:
@@ -81,6 +100,26 @@ class ReportesTab(ttk.Frame):
                 tree.grid(row=1, column=0, sticky="nsew", padx=5, pady=5)
                 frame.grid_rowconfigure(1, weight=1)
                 frame.grid_columnconfigure(0, weight=1)
+            elif title == "Serie":
+                # Selector de granularidad; se aplica al generar el reporte
+                barra = ttk.Frame(frame)
+                barra.grid(row=0, column=0, columnspan=2, sticky="w", padx=5, pady=5)
+                ttk.Label(barra, text="Agrupar por:").pack(side="left")
+                self.cmb_bucket = ttk.Combobox(barra, values=list(_BUCKETS), state="readonly", width=8)
+                self.cmb_bucket.set("Día")
+                self.cmb_bucket.pack(side="left", padx=5)
+
+                tree = ttk.Treeview(frame, columns=cols, show="headings", selectmode="none")
+                for col in cols:
+                    tree.heading(col, text=col.replace("_", " ").title())
+                    tree.column(col, anchor="center")
+                scroll = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
+                tree.configure(yscrollcommand=scroll.set)
+
+                tree.grid(row=1, column=0, sticky="nsew", padx=(5, 0), pady=5)
+                scroll.grid(row=1, column=1, sticky="ns", pady=5)
+                frame.grid_rowconfigure(1, weight=1)
+                frame.grid_columnconfigure(0, weight=1)
             else:
                 # Pestañas normales
                 tree = ttk.Treeview(frame, columns=cols, show="headings", selectmode="none")
@@ -101,9 +140,12 @@ class ReportesTab(ttk.Frame):
 
         # Estado interno para almacenar datos de reporte
         self.report_data = {}
+        # Generación en curso: trabajos en segundo plano y los que faltan
+        self.tasks = TaskRunner(self)
+        self._pendientes: set[str] = set()
 
     def on_generate_report(self):
-        """Generate report data and populate tables based on the selected date range."""
+        """Lanza en segundo plano los reportes del rango seleccionado."""
         start = self.date_inicio.get_date()
         end = self.date_fin.get_date()
 
@@ -112,20 +154,103 @@ class ReportesTab(ttk.Frame):
             return
 
         try:
-            self.report_data["Resumen"] = get_summary_report(start, end)
-            self.report_data["Top Cantidad"] = get_top_quantity_report(start, end)
-            self.report_data["Top Ingresos"] = get_top_revenue_report(start, end)
-            self.report_data["Top Utilidad"] = get_top_profit_report(start, end)
-        except Exception as e:
-            messagebox.showerror("Error al generar reporte", str(e))
+            days = int(self.spin_days.get())
+        except ValueError:
+            days = 0
+
+        # Un reporte nuevo reemplaza al que siga en curso
+        self._cancelar_reporte()
+
+        trabajos = {
+            "bundle": (get_report_bundle, start, end),
+            "serie": (get_sales_series, start, end, _BUCKETS[self.cmb_bucket.get()]),
+        }
+        if days > 0:
+            trabajos["comparativo"] = (get_comparison_report, start, end, days)
+        for nombre, (fn, *args) in trabajos.items():
+            self.tasks.submit(
+                nombre,
+                fn,
+                *args,
+                on_done=partial(self._on_trabajo, nombre, start, end, days),
+                on_error=self._on_error,
+                busy=(self.btn_generar,),
+            )
+        self._pendientes = set(trabajos)
+
+        self.report_data = {}
+        for tree in self.trees.values():
+            tree.delete(*tree.get_children())
+        self.lbl_comparison_period.config(text="")
+        self.progress.configure(maximum=len(trabajos), value=0)
+        self.lbl_estado.config(text="Generando…")
+        self.btn_cancelar.configure(state="normal")
+        self.btn_export_excel.configure(state="disabled")
+        self.btn_export_pdf.configure(state="disabled")
+
+    def on_cancel(self):
+        """Aborta en el servidor las consultas del reporte en curso."""
+        if not self._pendientes:
             return
+        self._cancelar_reporte()
+        self._pendientes.clear()
+        self._finish("Cancelado")
+
+    def _on_trabajo(self, nombre: str, start, end, days: int, resultado):
+        """Vuelca un trabajo terminado y cierra la generación con el último (hilo de Tk)."""
+        if nombre == "bundle":
+            self._apply_bundle(resultado)
+        elif nombre == "serie":
+            self._apply_series(resultado)
+        else:
+            self._apply_comparison(resultado, start, end, days)
+        self._pendientes.discard(nombre)
+        self.progress.configure(value=self.progress["maximum"] - len(self._pendientes))
+        if self._pendientes:
+            return
+        # Mismo orden que las pestañas, para que la exportación sea estable
+        self.report_data = {t: self.report_data[t] for t in self.trees if t in self.report_data}
+        self._finish("Listo")
+        # Habilitar botones de exportación
+        self.btn_export_excel.configure(state="normal")
+        self.btn_export_pdf.configure(state="normal")
 
-        # Limpiamos todas las tablas y rellenamos solo las no-comparativo
-        for title, tree in self.trees.items():
+    def _on_error(self, exc: BaseException):
+        """Aborta el resto de la generación si un trabajo falla."""
+        self._cancelar_reporte()
+        self._pendientes.clear()
+        self._finish("Error")
+        if not isinstance(exc, QueryCanceledError):
+            messagebox.showerror("Error al generar reporte", str(exc))
+
+    def _cancelar_reporte(self):
+        """Cancela la generación en curso (no las exportaciones)."""
+        for clave in _REPORTES:
+            self.tasks.cancel(clave)
+
+    def _finish(self, estado: str):
+        """Restablece los controles al terminar, fallar o cancelar.
+
+        Salvo con ``"Listo"``, descarta el reporte a medio armar para que no
+        pueda exportarse.
+        """
+        self.lbl_estado.config(text=estado)
+        self.btn_cancelar.configure(state="disabled")
+        if estado != "Listo":
+            self.report_data = {}
+            self.progress.configure(value=0)
+
+    def _apply_bundle(self, bundle: dict):
+        """Rellena las tablas de resumen y rankings."""
+        self.report_data["Resumen"] = bundle["resumen"]
+        self.report_data["Top Cantidad"] = bundle["top_cantidad"]
+        self.report_data["Top Ingresos"] = bundle["top_ingresos"]
+        self.report_data["Top Utilidad"] = bundle["top_utilidad"]
+
+        for title in ("Resumen", "Top Cantidad", "Top Ingresos", "Top Utilidad"):
+            tree = self.trees[title]
             tree.delete(*tree.get_children())
-            if title == "Comparativo":
-                continue
-            data = self.report_data.get(title, [])
+            data = self.report_data[title]
             if isinstance(data, dict):
                 vals = [self._fmt_number(v) for v in data.values()]
                 tree.insert("", "end", values=vals)
@@ -134,34 +259,32 @@ class ReportesTab(ttk.Frame):
                     vals = [self._fmt_number(v) if isinstance(v, (int, float)) else v for v in row.values()]
                     tree.insert("", "end", values=vals)
 
-        # ─── Comparativo si days > 0 ───────────────────────────────────────────────
-        try:
-            days = int(self.spin_days.get())
-        except ValueError:
-            days = 0
-        if days > 0:
-            from services.report_service import get_comparison_report
-
-            comp = get_comparison_report(start, end, days)
-            # Mostrar rangos de fechas
-            prev_end = start - timedelta(days=1)
-            prev_start = prev_end - timedelta(days=days - 1)
-            self.lbl_comparison_period.config(
-                text=f"Actual: {start.isoformat()} a {end.isoformat()}    " f"Anterior: {prev_start.isoformat()} a {prev_end.isoformat()}"
-            )
-            self.report_data["Comparativo"] = comp
-            tree = self.trees["Comparativo"]
-            tree.delete(*tree.get_children())
-            for key in comp["actual"]:
-                metric = key.replace("_", " ").title()
-                actual = comp["actual"][key]
-                anterior = comp["anterior"][key]
-                vari = comp["variacion"][key]
-                tree.insert("", "end", values=[metric, self._fmt_number(actual), self._fmt_number(anterior), self._fmt_percent(vari)])
-
-        # Habilitar botones de exportación
-        self.btn_export_excel.configure(state="normal")
-        self.btn_export_pdf.configure(state="normal")
+    def _apply_series(self, serie: list[dict]):
+        """Rellena la tabla de la serie temporal."""
+        self.report_data["Serie"] = serie
+        tree = self.trees["Serie"]
+        tree.delete(*tree.get_children())
+        for row in serie:
+            vals = [self._fmt_number(v) if isinstance(v, (int, float)) else v for v in row.values()]
+            tree.insert("", "end", values=vals)
+
+    def _apply_comparison(self, comp: dict, start, end, days: int):
+        """Rellena la tabla del comparativo con el periodo anterior."""
+        # Mostrar rangos de fechas
+        prev_end = start - timedelta(days=1)
+        prev_start = prev_end - timedelta(days=days - 1)
+        self.lbl_comparison_period.config(
+            text=f"Actual: {start.isoformat()} a {end.isoformat()}    " f"Anterior: {prev_start.isoformat()} a {prev_end.isoformat()}"
+        )
+        self.report_data["Comparativo"] = comp
+        tree = self.trees["Comparativo"]
+        tree.delete(*tree.get_children())
+        for key in comp["actual"]:
+            metric = key.replace("_", " ").title()
+            actual = comp["actual"][key]
+            anterior = comp["anterior"][key]
+            vari = comp["variacion"][key]
+            tree.insert("", "end", values=[metric, self._fmt_number(actual), self._fmt_number(anterior), self._fmt_percent(vari)])
 
     def on_export_excel(self):
         """Export the last generated report to an Excel file chosen by the user."""
@@ -173,11 +296,17 @@ class ReportesTab(ttk.Frame):
         if not path:
             return
 
-        try:
-            export_report(self.report_data, format="excel", destination_path=path)
-            messagebox.showinfo("Éxito", f"Reporte Excel guardado en:\n{path}")
-        except ExportError as e:
-            messagebox.showerror("Error exportando Excel", str(e))
+        self.tasks.submit(
+            "exportar",
+            export_report,
+            self.report_data,
+            format="excel",
+            destination_path=path,
+            on_done=lambda _: messagebox.showinfo("Éxito", f"Reporte Excel guardado en:\n{path}"),
+            on_error=partial(self._on_export_error, "Error exportando Excel"),
+            busy=(self.btn_export_excel, self.btn_export_pdf),
+            escritura=True,
+        )
 
     def on_export_pdf(self):
         """Export the last generated report to a PDF file chosen by the user."""
@@ -189,11 +318,22 @@ class ReportesTab(ttk.Frame):
         if not path:
             return
 
-        try:
-            export_report(self.report_data, format="pdf", destination_path=path)
-            messagebox.showinfo("Éxito", f"Reporte PDF guardado en:\n{path}")
-        except ExportError as e:
-            messagebox.showerror("Error exportando PDF", str(e))
+        self.tasks.submit(
+            "exportar",
+            export_report,
+            self.report_data,
+            format="pdf",
+            destination_path=path,
+            on_done=lambda _: messagebox.showinfo("Éxito", f"Reporte PDF guardado en:\n{path}"),
+            on_error=partial(self._on_export_error, "Error exportando PDF"),
+            busy=(self.btn_export_excel, self.btn_export_pdf),
+            escritura=True,
+        )
+
+    @staticmethod
+    def _on_export_error(titulo: str, exc: BaseException):
+        """Informa un fallo de exportación (``ExportError`` u otro)."""
+        messagebox.showerror(titulo, str(exc))
 
     @staticmethod
     def _fmt_number(value: int | float) -> str: